@@ -4,3 +4,8 @@ from django.apps import AppConfig
 class AccountingConfig(AppConfig):
     default_auto_field = 'django.db.models.BigAutoField'
     name = 'Accounting'
+
+    audited_models = {
+        'Account': (),
+        'Transaction': (),
+    }
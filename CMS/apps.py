@@ -4,3 +4,10 @@ from django.apps import AppConfig
 class CmsConfig(AppConfig):
     default_auto_field = 'django.db.models.BigAutoField'
     name = 'CMS'
+
+    audited_models = {
+        'Page': (),
+        'FAQ': (),
+        'Banner': (),
+        'MetaTag': (),
+    }
@@ -1,6 +1,7 @@
 import uuid
 from django.db import models
 from django.utils.text import slugify
+from MBP.slugs import unique_slug
 from django.utils import timezone
 from ckeditor.fields import RichTextField
 from django.contrib.auth import get_user_model
@@ -21,13 +22,7 @@ class Page(models.Model):
 
     def save(self, *args, **kwargs):
         if not self.slug:
-            base_slug = slugify(self.title)
-            slug = base_slug
-            count = 1
-            while Page.objects.filter(slug=slug).exists():
-                slug = f"{base_slug}-{count}"
-                count += 1
-            self.slug = slug
+            self.slug = unique_slug(self, slugify(self.title))
 
         if self.is_published and not self.publish_date:
             self.publish_date = timezone.now()
@@ -4,3 +4,9 @@ from django.apps import AppConfig
 class CrmConfig(AppConfig):
     default_auto_field = 'django.db.models.BigAutoField'
     name = 'CRM'
+
+    audited_models = {
+        'Lead': (),
+        'Customer': (),
+        'Interaction': (),
+    }
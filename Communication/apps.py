@@ -4,3 +4,9 @@ from django.apps import AppConfig
 class CommunicationConfig(AppConfig):
     default_auto_field = 'django.db.models.BigAutoField'
     name = 'Communication'
+
+    audited_models = {
+        'Notification': (),
+        'Message': (),
+        'Feedback': (),
+    }
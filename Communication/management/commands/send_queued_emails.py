@@ -0,0 +1,15 @@
+from django.core.management.base import BaseCommand
+
+from Communication.outbox import drain_outbox
+
+
+class Command(BaseCommand):
+    help = 'Send due outbox emails now with the configured EMAIL_BACKEND (no Celery needed)'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--batch-size', type=int, default=None)
+        parser.add_argument('--max-batches', type=int, default=20)
+
+    def handle(self, *args, **options):
+        sent, failed = drain_outbox(max_batches=options['max_batches'], batch_size=options['batch_size'])
+        self.stdout.write(self.style.SUCCESS(f"Sent {sent} emails, {failed} failed or deferred."))
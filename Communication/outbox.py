@@ -0,0 +1,185 @@
+import datetime
+import os
+import threading
+
+from django.conf import settings
+from django.core.mail import EmailMessage, get_connection
+from django.db import close_old_connections, transaction
+from django.utils import timezone
+
+from .models import OutboundEmail
+
+MAX_RETRY_DELAY = 6 * 60 * 60
+
+
+def queue_email(subject, message, recipient_list, from_email=None):
+    """
+    Drop-in for send_mail(): stores the message in the outbox as part of the
+    current transaction and wakes the drainer once it commits.
+    """
+    email = OutboundEmail.objects.create(
+        subject=subject,
+        body=message,
+        from_email=from_email or settings.DEFAULT_FROM_EMAIL,
+        to=list(recipient_list),
+    )
+    transaction.on_commit(drainer.wake)
+    return email
+
+
+class OutboxDrainer:
+    """
+    One background thread per worker process, woken after queued emails commit.
+    With CELERY_BROKER_URL set it hands the drain to the Celery worker; without a
+    broker it sends in-process and also wakes every EMAIL_OUTBOX_RETRY_BACKOFF
+    seconds for retries. Either way the request never waits on the broker or SMTP,
+    and a burst of wakes is coalesced into one drain.
+    """
+
+    def __init__(self):
+        self._wake = threading.Event()
+        self._lock = threading.Lock()
+        self._thread = None
+        self._pid = None
+
+    def wake(self):
+        self._ensure_started()
+        self._wake.set()
+
+    def _ensure_started(self):
+        # The pid check restarts the thread in workers forked after it was started
+        if self._thread and self._thread.is_alive() and self._pid == os.getpid():
+            return
+        with self._lock:
+            if self._thread and self._thread.is_alive() and self._pid == os.getpid():
+                return
+            self._pid = os.getpid()
+            self._thread = threading.Thread(target=self._run, name='email-outbox', daemon=True)
+            self._thread.start()
+
+    def _run(self):
+        while True:
+            # With a broker, Celery beat's periodic drain covers retries
+            self._wake.wait(None if settings.CELERY_BROKER_URL else settings.EMAIL_OUTBOX_RETRY_BACKOFF)
+            self._wake.clear()
+            close_old_connections()
+            try:
+                self.drain_once()
+            except Exception as e:
+                print("Email outbox drain failed:", e)
+            finally:
+                close_old_connections()
+
+    def drain_once(self):
+        if settings.CELERY_BROKER_URL:
+            from HMS.celery import app  # noqa: F401 -- binds shared tasks to the Django-configured app
+            from .tasks import drain_email_outbox
+
+            # No publish retries: the periodic drain picks the message up if the broker is down
+            drain_email_outbox.apply_async(retry=False)
+        else:
+            drain_outbox()
+
+
+drainer = OutboxDrainer()
+
+
+def retry_delay(attempts):
+    return min(settings.EMAIL_OUTBOX_RETRY_BACKOFF * 2 ** (attempts - 1), MAX_RETRY_DELAY)
+
+
+def claim_batch(batch_size=None):
+    """
+    Claims up to batch_size due messages in a short transaction and returns them.
+    Claimed rows are marked 'sending' with a lease of EMAIL_OUTBOX_CLAIM_TIMEOUT seconds,
+    so no lock is held while SMTP is talked to; a drainer that dies mid-batch leaves
+    rows that become due again once the lease runs out.
+    """
+    batch_size = batch_size or settings.EMAIL_OUTBOX_BATCH_SIZE
+    now = timezone.now()
+    lease = now + datetime.timedelta(seconds=settings.EMAIL_OUTBOX_CLAIM_TIMEOUT)
+
+    with transaction.atomic():
+        emails = list(
+            OutboundEmail.objects.select_for_update(skip_locked=True)
+            .filter(status__in=('pending', 'sending'), next_attempt_at__lte=now)
+            .order_by('next_attempt_at')[:batch_size]
+        )
+        if emails:
+            OutboundEmail.objects.filter(pk__in=[email.pk for email in emails]).update(
+                status='sending', next_attempt_at=lease
+            )
+    return emails
+
+
+def send_pending_batch(batch_size=None):
+    """
+    Claims one batch of due messages, sends it over a single backend connection outside
+    any transaction, then stores each outcome.
+    Returns (sent, failed) for the batch; (0, 0) when nothing is due.
+    """
+    emails = claim_batch(batch_size)
+    if not emails:
+        return 0, 0
+
+    now = timezone.now()
+    sent = failed = 0
+    connection = get_connection()
+    try:
+        connection.open()
+    except Exception as e:
+        # SMTP unreachable: the whole batch is retried later
+        for email in emails:
+            _mark_failed(email, e, now)
+        failed = len(emails)
+    else:
+        try:
+            for email in emails:
+                try:
+                    EmailMessage(
+                        subject=email.subject,
+                        body=email.body,
+                        from_email=email.from_email,
+                        to=email.to,
+                        connection=connection,
+                    ).send()
+                except Exception as e:
+                    _mark_failed(email, e, now)
+                    failed += 1
+                else:
+                    email.status = 'sent'
+                    email.attempts += 1
+                    email.sent_at = timezone.now()
+                    email.last_error = ''
+                    sent += 1
+        finally:
+            connection.close()
+
+    OutboundEmail.objects.bulk_update(
+        emails, ['status', 'attempts', 'next_attempt_at', 'last_error', 'sent_at']
+    )
+    return sent, failed
+
+
+def _mark_failed(email, error, now):
+    email.attempts += 1
+    email.last_error = str(error)
+    if email.attempts >= settings.EMAIL_OUTBOX_MAX_ATTEMPTS:
+        email.status = 'failed'
+    else:
+        email.status = 'pending'
+        email.next_attempt_at = now + datetime.timedelta(seconds=retry_delay(email.attempts))
+
+
+def drain_outbox(max_batches=20, batch_size=None):
+    """
+    Sends due batches until the outbox is empty or max_batches is reached.
+    """
+    total_sent = total_failed = 0
+    for _ in range(max_batches):
+        sent, failed = send_pending_batch(batch_size)
+        if not sent and not failed:
+            break
+        total_sent += sent
+        total_failed += failed
+    return total_sent, total_failed
@@ -0,0 +1,12 @@
+from celery import shared_task
+
+from .outbox import drain_outbox
+
+
+@shared_task
+def drain_email_outbox():
+    """
+    Sends due outbox emails in batches over a reused connection.
+    """
+    sent, failed = drain_outbox()
+    return f"Outbox drained: {sent} sent, {failed} failed"
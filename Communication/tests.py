@@ -1,3 +1,72 @@
-from django.test import TestCase
+import datetime
+from unittest import mock
 
-# Create your tests here.
+from django.core import mail
+from django.core.mail import EmailMessage
+from django.db import transaction
+from django.test import TestCase, TransactionTestCase, override_settings
+from django.utils import timezone
+
+from .models import OutboundEmail
+from .outbox import drainer, queue_email, send_pending_batch
+
+
+@override_settings(CELERY_BROKER_URL='')
+class OutboxTests(TestCase):
+    def test_queued_email_is_sent_in_process_without_a_broker(self):
+        with self.captureOnCommitCallbacks(execute=False) as callbacks:
+            email = queue_email('Welcome', 'Hello', ['guest@example.com'])
+        self.assertEqual(callbacks, [drainer.wake])
+        self.assertEqual(mail.outbox, [])
+
+        drainer.drain_once()
+
+        email.refresh_from_db()
+        self.assertEqual(email.status, 'sent')
+        self.assertEqual([message.to for message in mail.outbox], [['guest@example.com']])
+
+
+@mock.patch.object(drainer, 'wake')
+class OutboxClaimTests(TransactionTestCase):
+    def test_messages_are_sent_outside_a_transaction_while_claimed(self, wake):
+        email = queue_email('Welcome', 'Hello', ['guest@example.com'])
+        seen = []
+        send = EmailMessage.send
+
+        def checked_send(message, *args, **kwargs):
+            seen.append((
+                transaction.get_connection().in_atomic_block,
+                OutboundEmail.objects.get(pk=email.pk).status,
+            ))
+            return send(message, *args, **kwargs)
+
+        with mock.patch.object(EmailMessage, 'send', checked_send):
+            self.assertEqual(send_pending_batch(), (1, 0))
+
+        self.assertEqual(seen, [(False, 'sending')])
+        email.refresh_from_db()
+        self.assertEqual(email.status, 'sent')
+        self.assertEqual(email.attempts, 1)
+
+    def test_claimed_messages_are_skipped_until_the_claim_expires(self, wake):
+        email = queue_email('Welcome', 'Hello', ['guest@example.com'])
+        OutboundEmail.objects.filter(pk=email.pk).update(
+            status='sending', next_attempt_at=timezone.now() + datetime.timedelta(minutes=5)
+        )
+        self.assertEqual(send_pending_batch(), (0, 0))
+
+        OutboundEmail.objects.filter(pk=email.pk).update(
+            next_attempt_at=timezone.now() - datetime.timedelta(seconds=1)
+        )
+        self.assertEqual(send_pending_batch(), (1, 0))
+        self.assertEqual(len(mail.outbox), 1)
+
+    def test_failed_send_returns_the_message_to_pending(self, wake):
+        email = queue_email('Welcome', 'Hello', ['guest@example.com'])
+        with mock.patch.object(EmailMessage, 'send', side_effect=OSError('refused')):
+            self.assertEqual(send_pending_batch(), (0, 1))
+
+        email.refresh_from_db()
+        self.assertEqual(email.status, 'pending')
+        self.assertEqual(email.last_error, 'refused')
+        self.assertGreater(email.next_attempt_at, timezone.now())
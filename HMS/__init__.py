@@ -0,0 +1,11 @@
+def __getattr__(name):
+    # The Celery app is loaded on first use (workers import HMS.celery directly),
+    # so web processes that never queue a task do not pay for importing Celery
+    if name == 'celery_app':
+        from .celery import app
+
+        return app
+    raise AttributeError(f"module {__name__!r} has no attribute {name!r}")
+
+
+__all__ = ('celery_app',)
@@ -1,6 +1,9 @@
+import os
 from celery import Celery
 from celery.schedules import crontab
 
+os.environ.setdefault('DJANGO_SETTINGS_MODULE', 'HMS.settings')
+
 app = Celery('HMS')
 app.config_from_object('django.conf:settings', namespace='CELERY')
 app.autodiscover_tasks()
@@ -10,4 +13,16 @@ app.conf.beat_schedule = {
         'task': 'attendance.tasks.auto_checkout_and_absent_marking',
         'schedule': crontab(hour=20, minute=0),  # runs daily at 8:00 PM
     },
+    'archive-old-audit-logs-every-night': {
+        'task': 'MBP.tasks.archive_old_audit_logs',
+        'schedule': crontab(hour=2, minute=30),  # runs daily at 2:30 AM
+    },
+    'purge-expired-revoked-tokens-every-night': {
+        'task': 'accounts.tasks.purge_expired_revoked_tokens',
+        'schedule': crontab(hour=3, minute=0),  # runs daily at 3:00 AM
+    },
+    'drain-email-outbox-every-minute': {
+        'task': 'Communication.tasks.drain_email_outbox',
+        'schedule': crontab(),  # catches retries and messages queued while the broker was down
+    },
 }
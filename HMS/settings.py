@@ -77,6 +77,7 @@ INSTALLED_APPS = [
 ]
 
 MIDDLEWARE = [
+    'MBP.middleware.EndpointProfilingMiddleware',
     'django.middleware.security.SecurityMiddleware',
     "whitenoise.middleware.WhiteNoiseMiddleware",
     'django.contrib.sessions.middleware.SessionMiddleware',
@@ -87,6 +88,7 @@ MIDDLEWARE = [
     'django.contrib.messages.middleware.MessageMiddleware',
     'allauth.account.middleware.AccountMiddleware',
     'django.middleware.clickjacking.XFrameOptionsMiddleware',
+    'MBP.middleware.AuditBufferMiddleware',
 ]
 
 ROOT_URLCONF = 'HMS.urls'
@@ -210,7 +212,7 @@ CORS_ALLOWED_ORIGINS = [
 
 REST_FRAMEWORK = {
     'DEFAULT_AUTHENTICATION_CLASSES': [
-        'rest_framework_simplejwt.authentication.JWTAuthentication',
+        'accounts.authentication.CachedJWTAuthentication',
     ],
     'DEFAULT_PERMISSION_CLASSES': [
         'rest_framework.permissions.IsAuthenticated',
@@ -225,6 +227,8 @@ SIMPLE_JWT = {
     'ROTATE_REFRESH_TOKENS': False,
     'BLACKLIST_AFTER_ROTATION': True,
     'AUTH_HEADER_TYPES': ('Bearer',),
+    'TOKEN_OBTAIN_SERIALIZER': 'MBP.tokens.PermissionTokenObtainPairSerializer',
+    'TOKEN_REFRESH_SERIALIZER': 'MBP.tokens.PermissionTokenRefreshSerializer',
 }
 
 import environ
@@ -244,4 +248,81 @@ DEFAULT_FROM_EMAIL = env("DEFAULT_FROM_EMAIL", default="Real Estate <noreply@rea
 
 
 # Gemini API Key
-GEMINI_API_KEY = os.getenv("GEMINI_API_KEY")
\ No newline at end of file
+GEMINI_API_KEY = os.getenv("GEMINI_API_KEY")
+
+
+# Audit log
+# Hand buffered audit rows to the Celery worker instead of inserting them in the request
+AUDIT_LOG_ASYNC = env.bool("AUDIT_LOG_ASYNC", default=False)
+# Store updates as {field: [old, new]} deltas instead of full before/after snapshots
+AUDIT_LOG_DIFF_MODE = env.bool("AUDIT_LOG_DIFF_MODE", default=True)
+# Rows older than this many days are moved to compressed daily archive files
+AUDIT_LOG_RETENTION_DAYS = env.int("AUDIT_LOG_RETENTION_DAYS", default=90)
+AUDIT_LOG_ARCHIVE_BATCH_SIZE = env.int("AUDIT_LOG_ARCHIVE_BATCH_SIZE", default=1000)
+# Kept outside MEDIA_ROOT, which is publicly served
+AUDIT_LOG_ARCHIVE_ROOT = env("AUDIT_LOG_ARCHIVE_ROOT", default=str(BASE_DIR / 'archive' / 'auditlog'))
+
+# Seconds between background system-health samples (per worker process)
+SYSTEM_HEALTH_SAMPLE_INTERVAL = env.int("SYSTEM_HEALTH_SAMPLE_INTERVAL", default=5)
+
+# Permission grids seeded by `populate_app_models --seed-permissions`, e.g. "admin=crud,staff=r"
+DEFAULT_ROLE_PERMISSIONS = env.dict("DEFAULT_ROLE_PERMISSIONS", default={})
+
+# Per-endpoint latency / SQL profiling, browsable by staff at /api/profiling/
+ENDPOINT_PROFILING = env.bool("ENDPOINT_PROFILING", default=False)
+# Flag a SQL pattern repeated this many times in one request (likely an N+1)
+ENDPOINT_PROFILING_DUPLICATE_SQL_THRESHOLD = env.int("ENDPOINT_PROFILING_DUPLICATE_SQL_THRESHOLD", default=3)
+
+# Seconds between rebuilds of each worker's revoked access-token filter
+ACCESS_TOKEN_REVOCATION_REFRESH = env.int("ACCESS_TOKEN_REVOCATION_REFRESH", default=30)
+
+# Celery broker for the worker and beat processes (e.g. redis://redis:6379/0). Without one,
+# the email outbox is drained in-process and AUDIT_LOG_ASYNC writes synchronously.
+CELERY_BROKER_URL = env("CELERY_BROKER_URL", default="")
+
+# Email outbox (Communication.OutboundEmail), drained by Celery or, without a broker, in-process
+EMAIL_OUTBOX_BATCH_SIZE = env.int("EMAIL_OUTBOX_BATCH_SIZE", default=50)
+EMAIL_OUTBOX_MAX_ATTEMPTS = env.int("EMAIL_OUTBOX_MAX_ATTEMPTS", default=5)
+# Seconds before the first retry, doubled on every further attempt
+EMAIL_OUTBOX_RETRY_BACKOFF = env.int("EMAIL_OUTBOX_RETRY_BACKOFF", default=60)
+# Seconds a drainer may hold claimed messages before another one may send them again
+EMAIL_OUTBOX_CLAIM_TIMEOUT = env.int("EMAIL_OUTBOX_CLAIM_TIMEOUT", default=300)
+
+# Text generation (accounts.gemini_utils)
+GEMINI_BACKEND = env("GEMINI_BACKEND", default="accounts.gemini_utils.GeminiBackend")
+GEMINI_CACHE_SIZE = env.int("GEMINI_CACHE_SIZE", default=256)
+GEMINI_CACHE_TTL = env.int("GEMINI_CACHE_TTL", default=60 * 60)
+# Upstream calls in flight per worker process; extra requests wait up to GEMINI_QUEUE_TIMEOUT seconds
+GEMINI_MAX_CONCURRENCY = env.int("GEMINI_MAX_CONCURRENCY", default=4)
+GEMINI_QUEUE_TIMEOUT = env.float("GEMINI_QUEUE_TIMEOUT", default=2.0)
+GEMINI_REQUEST_TIMEOUT = env.float("GEMINI_REQUEST_TIMEOUT", default=20.0)
+# Seconds the StubBackend sleeps per call, to simulate upstream latency
+GEMINI_STUB_DELAY = env.float("GEMINI_STUB_DELAY", default=0.0)
+
+# Bulk user import: rows validated and inserted per batch; hashing pool size (0 = one per CPU)
+BULK_IMPORT_BATCH_SIZE = env.int("BULK_IMPORT_BATCH_SIZE", default=500)
+BULK_IMPORT_HASH_WORKERS = env.int("BULK_IMPORT_HASH_WORKERS", default=0)
+# Rows one POST /api/users/bulk-import/ may send; the view hashes in-process, the pool is import_users only
+BULK_IMPORT_MAX_ROWS = env.int("BULK_IMPORT_MAX_ROWS", default=100)
+
+# Values each worker reserves at once from a business-code sequence (booking_code, table_code)
+SEQUENCE_BLOCK_SIZE = env.int("SEQUENCE_BLOCK_SIZE", default=20)
+# Second connection to the same database: sequence blocks are reserved on it so the counter
+# row is not locked until the caller's transaction commits (unused on SQLite)
+DATABASES["sequences"] = {**DATABASES["default"], "TEST": {"MIRROR": "default"}}
+SEQUENCE_DATABASE = env("SEQUENCE_DATABASE", default="sequences")
+
+# Largest number of rooms one POST /api/bookings/group/ may book
+GROUP_BOOKING_MAX_ROOMS = env.int("GROUP_BOOKING_MAX_ROOMS", default=200)
+
+# Largest number of rooms one POST /api/rooms/bulk-provision/ (or provision_rooms) may create
+ROOM_PROVISIONING_MAX_ROOMS = env.int("ROOM_PROVISIONING_MAX_ROOMS", default=1000)
+
+# Shared by every worker process: the permission matrix version (MBP.permissions), JWT user
+# snapshots and token revocations are only coherent across workers through it.
+# Defaults to the database (python manage.py createcachetable); set CACHE_URL=redis://host:6379/1 for Redis.
+# Request handling reads process-local copies and only goes to it when they expire.
+CACHES = {"default": env.cache_url("CACHE_URL", default="dbcache://hms_cache")}
+# Seconds a worker trusts its copy of a shared version (permissions, revocations, user snapshots)
+# before re-reading the cache: changes made in other workers apply within this interval
+SHARED_VERSION_REFRESH = env.float("SHARED_VERSION_REFRESH", default=5.0)
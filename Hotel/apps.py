@@ -4,6 +4,20 @@ from django.apps import AppConfig
 class HotelConfig(AppConfig):
     default_auto_field = 'django.db.models.BigAutoField'
     name = 'Hotel'
+
+    audited_models = {
+        'Hotel': (),
+        'RoomCategory': (),
+        'Room': (),
+        'RoomMedia': (),
+        'Booking': (),
+        'Guest': (),
+        'RoomServiceRequest': (),
+    }
     
     def ready(self):
         import Hotel.signals
+        from django.db.models.signals import post_migrate
+        from Hotel.booking_engine import install_exclusion_constraint
+
+        post_migrate.connect(install_exclusion_constraint, sender=self)
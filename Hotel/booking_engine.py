@@ -0,0 +1,223 @@
+import logging
+
+from django.db import DatabaseError, IntegrityError, connection, connections, transaction
+from django.db.models import F
+from django.utils.text import slugify
+
+from MBP.sequences import next_after, next_codes
+from MBP.slugs import allocate_slugs
+from .inventory import ACTIVE_BOOKING_STATUSES, booking_nights, free_rooms
+from .models import Booking, Guest, Room, RoomNight
+
+logger = logging.getLogger(__name__)
+
+EXCLUSION_CONSTRAINT = 'hotel_booking_no_overlap'
+
+
+class RoomUnavailable(Exception):
+    """The room already has an active booking overlapping the requested stay."""
+
+
+def lock_rooms(*room_ids):
+    """
+    Serializes booking writes per room until the current transaction ends.
+    SELECT ... FOR UPDATE on PostgreSQL/MySQL; SQLite has no row locks, so a no-op
+    UPDATE takes its database write lock before the overlap check reads anything.
+    Rooms are locked in id order so two multi-room writers cannot deadlock.
+    """
+    room_ids = sorted({str(room_id) for room_id in room_ids if room_id})
+    if connection.features.has_select_for_update:
+        list(Room.objects.select_for_update().filter(pk__in=room_ids).order_by('pk').values_list('pk', flat=True))
+    else:
+        Room.objects.filter(pk__in=room_ids).update(is_available=F('is_available'))
+
+
+def overlapping(room_id, check_in, check_out, exclude_id=None):
+    """
+    Active bookings of the room sharing at least one night with [check_in, check_out).
+    """
+    queryset = Booking.objects.filter(
+        room_id=room_id,
+        status__in=ACTIVE_BOOKING_STATUSES,
+        check_in__lt=check_out,
+        check_out__gt=check_in,
+    )
+    if exclude_id:
+        queryset = queryset.exclude(pk=exclude_id)
+    return queryset
+
+
+def _check_room(booking):
+    if booking.status in ACTIVE_BOOKING_STATUSES and overlapping(
+        booking.room_id, booking.check_in, booking.check_out, exclude_id=booking.pk
+    ).exists():
+        raise RoomUnavailable("This room is already booked for the selected dates.")
+
+
+def _save(booking):
+    try:
+        # Savepoint: the exclusion constraint may still reject a row written outside this engine
+        with transaction.atomic():
+            booking.save()
+    except IntegrityError as e:
+        if EXCLUSION_CONSTRAINT in str(e):
+            raise RoomUnavailable("This room is already booked for the selected dates.") from e
+        raise
+
+
+@transaction.atomic
+def create_booking(guests=(), **fields):
+    """
+    Creates a booking (and its guests) once no active booking of the room overlaps it.
+    Raises RoomUnavailable otherwise.
+    """
+    booking = Booking(**fields)
+    lock_rooms(booking.room_id)
+    _check_room(booking)
+    _save(booking)
+    for guest in guests:
+        Guest.objects.create(booking=booking, **guest)
+    return booking
+
+
+@transaction.atomic
+def update_booking(booking, **fields):
+    """
+    Applies `fields` to a booking under the locks of its old and new room.
+    """
+    previous_room_id = booking.room_id
+    for attr, value in fields.items():
+        setattr(booking, attr, value)
+    lock_rooms(previous_room_id, booking.room_id)
+    _check_room(booking)
+    _save(booking)
+    return booking
+
+
+@transaction.atomic
+def create_group_booking(user, hotel, check_in, check_out, category_counts, guests=(), status='pending'):
+    """
+    Books `category_counts` ({room_category slug: rooms}) in one hotel for one stay, all or nothing.
+    Free rooms are picked in one query and locked. Rooms the locked Booking re-check finds
+    taken (booked meanwhile, or missing from the RoomNight inventory) are dropped and
+    replaced from the remaining candidates. The Booking, RoomNight and Guest rows are then
+    bulk-inserted. Guests are spread round-robin over the rooms without exceeding each
+    category's max_occupancy.
+    Returns the bookings in allocation order; raises RoomUnavailable when a category is short.
+    """
+    candidates = list(free_rooms(check_in, check_out, hotel_id=hotel.pk).filter(
+        room_category__slug__in=category_counts
+    ).order_by('room_number').values_list('id', 'room_category__slug', 'room_category__max_occupancy'))
+
+    taken = set()
+    while True:
+        picked = _pick_rooms(candidates, category_counts, taken)
+        room_ids = [room_id for room_id, _max_occupancy in picked]
+        lock_rooms(*room_ids)
+        # Bookings are authoritative: the inventory may lag them or another writer may have won
+        conflicts = set(Booking.objects.filter(
+            room_id__in=room_ids, status__in=ACTIVE_BOOKING_STATUSES, check_in__lt=check_out, check_out__gt=check_in
+        ).values_list('room_id', flat=True))
+        if not conflicts:
+            break
+        taken |= conflicts
+
+    assignments = _assign_guests(guests, [max_occupancy for _room_id, max_occupancy in picked])
+    codes = next_codes(
+        'booking_code', 'BK{n:03d}', len(picked), scope=hotel.pk,
+        initial=lambda: next_after(Booking.objects.filter(hotel=hotel), 'booking_code', 'BK'),
+    )
+    slugs = allocate_slugs(Booking, [slugify(f"{hotel.name}-{code}") for code in codes])
+    bookings = []
+    for (room_id, _max_occupancy), room_guests, code, slug in zip(picked, assignments, codes, slugs):
+        bookings.append(Booking(
+            user=user, hotel=hotel, room_id=room_id, booking_code=code, slug=slug,
+            check_in=check_in, check_out=check_out, guests_count=max(1, len(room_guests)), status=status,
+        ))
+
+    try:
+        with transaction.atomic():
+            Booking.objects.bulk_create(bookings)
+    except IntegrityError as e:
+        if EXCLUSION_CONSTRAINT in str(e):
+            raise RoomUnavailable("Some of the picked rooms were just booked, please retry.") from e
+        raise
+    # bulk_create skips post_save, so the nights are written here
+    RoomNight.objects.bulk_create([night for booking in bookings for night in booking_nights(booking)], batch_size=1000)
+
+    guest_rows = [
+        (booking, guest) for booking, room_guests in zip(bookings, assignments) for guest in room_guests
+    ]
+    slugs = allocate_slugs(Guest, [
+        slugify(f"{guest.get('first_name')}-{guest.get('last_name') or ''}-{booking.booking_code}")
+        for booking, guest in guest_rows
+    ], start=2)
+    Guest.objects.bulk_create(
+        [Guest(booking=booking, slug=slug, **guest) for (booking, guest), slug in zip(guest_rows, slugs)],
+        batch_size=1000,
+    )
+    return bookings
+
+
+def _pick_rooms(candidates, category_counts, taken):
+    """
+    The first `count` rooms of each category not in `taken`, as (room_id, max_occupancy).
+    Raises RoomUnavailable naming every category that is short.
+    """
+    picked, available = [], {slug: 0 for slug in category_counts}
+    for room_id, slug, max_occupancy in candidates:
+        if room_id in taken:
+            continue
+        if available[slug] < category_counts[slug]:
+            picked.append((room_id, max_occupancy))
+        available[slug] += 1
+    short = {slug: available[slug] for slug, count in category_counts.items() if available[slug] < count}
+    if short:
+        raise RoomUnavailable(f"Not enough free rooms: {', '.join(f'{slug} has {n}' for slug, n in short.items())}.")
+    return picked
+
+
+def _assign_guests(guests, capacities):
+    """
+    Round-robin guests over rooms, skipping rooms that are full. Returns one list per room.
+    """
+    assignments = [[] for _ in capacities]
+    open_rooms = [index for index, capacity in enumerate(capacities) if capacity]
+    turn = 0
+    for guest in guests:
+        if not open_rooms:
+            raise RoomUnavailable("More guests than the requested rooms can hold.")
+        turn %= len(open_rooms)
+        index = open_rooms[turn]
+        assignments[index].append(guest)
+        if len(assignments[index]) >= capacities[index]:
+            open_rooms.pop(turn)
+        else:
+            turn += 1
+    return assignments
+
+
+def install_exclusion_constraint(using='default', **kwargs):
+    """
+    post_migrate hook (the apps ship without migrations): on PostgreSQL, lets the
+    database itself reject overlapping active bookings of a room.
+    """
+    db = connections[using]
+    if db.vendor != 'postgresql':
+        return
+    table = Booking._meta.db_table
+    statuses = ', '.join(f"'{status}'" for status in ACTIVE_BOOKING_STATUSES)
+    try:
+        with transaction.atomic(using=using), db.cursor() as cursor:
+            cursor.execute("SELECT 1 FROM pg_constraint WHERE conname = %s", [EXCLUSION_CONSTRAINT])
+            if cursor.fetchone():
+                return
+            cursor.execute("CREATE EXTENSION IF NOT EXISTS btree_gist")
+            cursor.execute(
+                f'ALTER TABLE "{table}" ADD CONSTRAINT {EXCLUSION_CONSTRAINT} '
+                f"EXCLUDE USING gist (room_id WITH =, daterange(check_in, check_out, '[)') WITH &&) "
+                f"WHERE (status IN ({statuses}))"
+            )
+    except DatabaseError:
+        # e.g. existing overlapping bookings: the row locks still protect new ones
+        logger.warning("Could not add %s on %s", EXCLUSION_CONSTRAINT, table, exc_info=True)
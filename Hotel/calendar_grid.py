@@ -0,0 +1,92 @@
+import datetime
+
+from .inventory import ACTIVE_BOOKING_STATUSES
+from .models import Booking
+
+FREE, BOOKED, MAINTENANCE = 0, 1, 2
+STATE_LETTERS = 'FBM'
+LEGEND = {'F': 'free', 'B': 'booked', 'M': 'maintenance'}
+
+MAX_CALENDAR_DAYS = 90
+
+
+def encode_runs(grid):
+    """
+    Run-length encodes each row of a rooms x days state matrix, e.g. "F12B3F15".
+    Run starts are found for the whole matrix at once; no run crosses a row boundary
+    because every row's first cell starts a run.
+    """
+    import numpy as np
+
+    rooms, days = grid.shape
+    starts = np.ones(grid.shape, dtype=bool)
+    starts[:, 1:] = grid[:, 1:] != grid[:, :-1]
+    positions = np.flatnonzero(starts)
+    lengths = np.diff(np.append(positions, grid.size))
+    states = grid.ravel()[positions]
+    row_of = positions // days
+
+    encoded = [''] * rooms
+    bounds = np.searchsorted(row_of, np.arange(rooms + 1))
+    for row in range(rooms):
+        lo, hi = bounds[row], bounds[row + 1]
+        encoded[row] = ''.join(
+            f"{STATE_LETTERS[state]}{length}" for state, length in zip(states[lo:hi].tolist(), lengths[lo:hi].tolist())
+        )
+    return encoded
+
+
+def build_calendar(hotel_id, rooms, start, days):
+    """
+    Paints a rooms x days grid from the hotel's active bookings (one query) and returns
+    run-length encoded rows plus per-day free-room counts per category.
+    `rooms` is a list of dicts with id, room_number, slug, status and category.
+    """
+    import numpy as np
+
+    end = start + datetime.timedelta(days=days)
+    row_of_room = {room['id']: row for row, room in enumerate(rooms)}
+    grid = np.zeros((len(rooms), days), dtype=np.int8)
+
+    # Maintenance first: a booked night still shows as booked
+    grid[[row for row, room in enumerate(rooms) if room['status'] == 'maintenance']] = MAINTENANCE
+
+    origin = start.toordinal()
+    intervals = [
+        (row_of_room[room_id], check_in.toordinal() - origin, check_out.toordinal() - origin)
+        for room_id, check_in, check_out in Booking.objects.filter(
+            hotel_id=hotel_id,
+            status__in=ACTIVE_BOOKING_STATUSES,
+            check_in__lt=end,
+            check_out__gt=start,
+        ).values_list('room_id', 'check_in', 'check_out')
+        if room_id in row_of_room
+    ]
+    if intervals:
+        rows, first, last = np.array(intervals, dtype=np.int64).T
+        first, last = np.clip(first, 0, days), np.clip(last, 0, days)
+
+        # Difference array: +1 where a stay starts, -1 where it ends; a running sum > 0 is booked
+        delta = np.zeros((len(rooms), days + 1), dtype=np.int32)
+        np.add.at(delta, (rows, first), 1)
+        np.add.at(delta, (rows, last), -1)
+        grid[np.cumsum(delta, axis=1)[:, :days] > 0] = BOOKED
+
+    categories = sorted({room['category'] or '' for room in rooms})
+    category_of_row = np.array([categories.index(room['category'] or '') for room in rooms], dtype=np.intp)
+    free_by_category = np.zeros((len(categories), days), dtype=np.int32)
+    np.add.at(free_by_category, category_of_row, (grid == FREE).astype(np.int32))
+
+    return {
+        'start': start,
+        'days': days,
+        'legend': LEGEND,
+        'rooms': [
+            {'room_number': room['room_number'], 'slug': room['slug'], 'category': room['category'], 'runs': runs}
+            for room, runs in zip(rooms, encode_runs(grid))
+        ],
+        'free_by_category': {
+            category or 'uncategorized': counts
+            for category, counts in zip(categories, free_by_category.tolist())
+        },
+    }
@@ -0,0 +1,92 @@
+import datetime
+
+from django.db import transaction
+from django.db.models import Count, Exists, OuterRef
+
+from .models import Booking, Room, RoomNight
+
+# Bookings in these states hold their room for every night of the stay
+ACTIVE_BOOKING_STATUSES = ('pending', 'confirmed', 'checked_in')
+
+# A save touching none of these leaves the booking's nights as they are
+INVENTORY_FIELDS = {'hotel', 'hotel_id', 'room', 'room_id', 'check_in', 'check_out', 'status'}
+
+
+def stay_dates(check_in, check_out):
+    """
+    The nights of a stay: check_in up to, not including, check_out.
+    """
+    return [check_in + datetime.timedelta(days=offset) for offset in range((check_out - check_in).days)]
+
+
+def booking_nights(booking):
+    if booking.status not in ACTIVE_BOOKING_STATUSES or not (booking.check_in and booking.check_out):
+        return []
+    return [
+        RoomNight(hotel_id=booking.hotel_id, room_id=booking.room_id, booking_id=booking.pk, date=night)
+        for night in stay_dates(booking.check_in, booking.check_out)
+    ]
+
+
+def inventory_state(booking):
+    return (booking.hotel_id, booking.room_id, booking.check_in, booking.check_out, booking.status)
+
+
+@transaction.atomic
+def sync_booking(booking):
+    """
+    Replaces a booking's nights with what its current room, dates and status hold.
+    Called from Booking post_save; queryset.update() on bookings bypasses it,
+    so run rebuild_room_nights after such bulk changes.
+    A repeated save or post_save of the same instance with nothing changed is skipped.
+    """
+    state = inventory_state(booking)
+    if getattr(booking, '_synced_inventory_state', None) == state:
+        return
+    RoomNight.objects.filter(booking_id=booking.pk).delete()
+    RoomNight.objects.bulk_create(booking_nights(booking))
+    booking._synced_inventory_state = state
+
+
+@transaction.atomic
+def rebuild_room_nights():
+    """
+    Recomputes the whole inventory from the active bookings. Returns the number of nights written.
+    """
+    nights = []
+    active = Booking.objects.filter(status__in=ACTIVE_BOOKING_STATUSES).only(
+        'id', 'hotel_id', 'room_id', 'check_in', 'check_out', 'status'
+    )
+    for booking in active.iterator(chunk_size=2000):
+        nights += booking_nights(booking)
+
+    RoomNight.objects.all().delete()
+    RoomNight.objects.bulk_create(nights, batch_size=1000)
+    return len(nights)
+
+
+def free_rooms(check_in, check_out, hotel_id=None, category_slug=None):
+    """
+    Bookable rooms with no held night in [check_in, check_out): one NOT EXISTS probe
+    of the (room, date) index per candidate room.
+    """
+    rooms = Room.objects.filter(is_available=True, status='available')
+    if hotel_id:
+        rooms = rooms.filter(hotel_id=hotel_id)
+    if category_slug:
+        rooms = rooms.filter(room_category__slug=category_slug)
+
+    held = RoomNight.objects.filter(room=OuterRef('pk'), date__gte=check_in, date__lt=check_out)
+    return rooms.filter(~Exists(held))
+
+
+def availability_by_category(rooms):
+    """
+    [{"slug", "name", "available"}] for a free_rooms() queryset, in one aggregate query.
+    """
+    counts = (
+        rooms.values_list('room_category__slug', 'room_category__name')
+        .annotate(available=Count('id'))
+        .order_by('room_category__slug')
+    )
+    return [{'slug': slug, 'name': name, 'available': available} for slug, name, available in counts]
@@ -0,0 +1,131 @@
+import random
+import threading
+import time
+import uuid
+from datetime import date, timedelta
+
+from django.core.management.base import BaseCommand, CommandError
+from django.db import DatabaseError, connection
+
+from accounts.models import User
+from Hotel.booking_engine import RoomUnavailable, create_booking
+from Hotel.inventory import ACTIVE_BOOKING_STATUSES
+from Hotel.models import Booking, Hotel, Room
+
+
+class Command(BaseCommand):
+    help = ('Load-test booking creation: parallel clients book random stays in a scratch hotel, '
+            'then every room is checked for overlapping active bookings')
+
+    def add_arguments(self, parser):
+        parser.add_argument('--clients', type=int, default=50, help='Parallel clients, one DB connection each')
+        parser.add_argument('--requests', type=int, default=20, help='Booking attempts per client')
+        parser.add_argument('--rooms', type=int, default=10, help='Rooms in the scratch hotel')
+        parser.add_argument('--days', type=int, default=30, help='Horizon the stays are drawn from')
+        parser.add_argument('--seed', type=int, default=None)
+        parser.add_argument('--keep', action='store_true', help='Keep the scratch hotel and its bookings')
+
+    def setup_hotel(self, rooms):
+        tag = uuid.uuid4().hex[:8]
+        owner = User.objects.create_user(
+            email=f"bench-{tag}@example.com", password=None, full_name=f"Bench {tag}", is_email_verified=True
+        )
+        hotel = Hotel.objects.create(
+            owner=owner, name=f"Bench {tag}", address='-', city='-', state='-', country='-',
+            pincode='0', contact_number='0', email=owner.email,
+        )
+        room_list = [
+            Room.objects.create(hotel=hotel, room_code=f"BENCH-{tag}-{number}", floor='1')
+            for number in range(rooms)
+        ]
+        return owner, hotel, room_list
+
+    def client(self, index, owner, hotel, rooms, options, barrier, results):
+        rng = random.Random(None if options['seed'] is None else options['seed'] + index)
+        today = date.today()
+        outcome = {'created': 0, 'rejected': 0, 'errors': 0, 'latencies': []}
+        barrier.wait()
+        try:
+            for _ in range(options['requests']):
+                check_in = today + timedelta(days=rng.randint(0, options['days']))
+                started = time.perf_counter()
+                try:
+                    create_booking(
+                        user=owner, hotel=hotel, room=rng.choice(rooms), check_in=check_in,
+                        check_out=check_in + timedelta(days=rng.randint(1, 4)), guests_count=1, status='confirmed',
+                    )
+                    outcome['created'] += 1
+                except RoomUnavailable:
+                    outcome['rejected'] += 1
+                except DatabaseError as e:
+                    # e.g. SQLite's busy timeout under heavy write contention
+                    outcome['errors'] += 1
+                    outcome.setdefault('last_error', str(e))
+                outcome['latencies'].append(time.perf_counter() - started)
+        finally:
+            connection.close()
+            results.append(outcome)
+
+    @staticmethod
+    def double_bookings(hotel):
+        """
+        Pairs of active bookings of the same room that share a night.
+        """
+        doubles, last_by_room = [], {}
+        bookings = Booking.objects.filter(hotel=hotel, status__in=ACTIVE_BOOKING_STATUSES).order_by('room_id', 'check_in')
+        for booking in bookings.only('room_id', 'check_in', 'check_out', 'booking_code'):
+            previous = last_by_room.get(booking.room_id)
+            if previous and booking.check_in < previous.check_out:
+                doubles.append((previous.booking_code, booking.booking_code))
+            if not previous or booking.check_out > previous.check_out:
+                last_by_room[booking.room_id] = booking
+        return doubles
+
+    def handle(self, *args, **options):
+        owner, hotel, rooms = self.setup_hotel(options['rooms'])
+        clients = options['clients']
+        barrier = threading.Barrier(clients)
+        results = []
+        threads = [
+            threading.Thread(target=self.client, args=(index, owner, hotel, rooms, options, barrier, results))
+            for index in range(clients)
+        ]
+
+        started = time.perf_counter()
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+        elapsed = time.perf_counter() - started
+
+        latencies = sorted(latency for result in results for latency in result['latencies'])
+        created = sum(result['created'] for result in results)
+        rejected = sum(result['rejected'] for result in results)
+        errors = sum(result['errors'] for result in results)
+        doubles = self.double_bookings(hotel)
+
+        def percentile(fraction):
+            return latencies[min(len(latencies) - 1, int(len(latencies) * fraction))] * 1000 if latencies else 0
+
+        self.stdout.write(
+            f"{clients} clients x {options['requests']} attempts on {len(rooms)} rooms over {options['days']} days "
+            f"({connection.vendor}) in {elapsed:.2f}s"
+        )
+        self.stdout.write(
+            f"  created {created} | rejected (room taken) {rejected} | errors {errors} | "
+            f"{len(latencies) / elapsed:.1f} attempts/s, {created / elapsed:.1f} bookings/s"
+        )
+        self.stdout.write(
+            f"  latency p50 {percentile(0.5):.1f} ms | p95 {percentile(0.95):.1f} ms | max {percentile(1):.1f} ms"
+        )
+        for result in results:
+            if 'last_error' in result:
+                self.stdout.write(self.style.WARNING(f"  last error: {result['last_error']}"))
+                break
+
+        if not options['keep']:
+            owner.delete()  # cascades to the hotel, its rooms and bookings
+
+        if doubles:
+            raise CommandError(f"{len(doubles)} double bookings, e.g. {doubles[:5]}")
+        self.stdout.write(self.style.SUCCESS("No double bookings."))
@@ -0,0 +1,148 @@
+import itertools
+import random
+import time
+import uuid
+from datetime import date, timedelta
+
+from django.core.management.base import BaseCommand, CommandError
+from django.db import connection
+from django.db.models import F
+from django.test.utils import CaptureQueriesContext
+
+from accounts.models import User
+from Hotel.calendar_grid import LEGEND, build_calendar
+from Hotel.inventory import ACTIVE_BOOKING_STATUSES
+from Hotel.models import Booking, Hotel, Room, RoomCategory
+
+
+def naive_calendar(hotel_id, rooms, start, days):
+    """
+    Per-night loop over the same bookings query, kept here as the benchmark baseline
+    and as the reference build_calendar's output is checked against.
+    """
+    end = start + timedelta(days=days)
+    stays = {}
+    for room_id, check_in, check_out in Booking.objects.filter(
+        hotel_id=hotel_id, status__in=ACTIVE_BOOKING_STATUSES, check_in__lt=end, check_out__gt=start,
+    ).values_list('room_id', 'check_in', 'check_out'):
+        stays.setdefault(room_id, []).append((check_in, check_out))
+
+    dates = [start + timedelta(days=day) for day in range(days)]
+    calendar_rooms, free_by_category = [], {}
+    for room in rooms:
+        states = []
+        for night in dates:
+            if any(check_in <= night < check_out for check_in, check_out in stays.get(room['id'], ())):
+                states.append('B')
+            else:
+                states.append('M' if room['status'] == 'maintenance' else 'F')
+        calendar_rooms.append({
+            'room_number': room['room_number'], 'slug': room['slug'], 'category': room['category'],
+            'runs': ''.join(f"{state}{len(list(group))}" for state, group in itertools.groupby(states)),
+        })
+        counts = free_by_category.setdefault(room['category'] or 'uncategorized', [0] * days)
+        for day, state in enumerate(states):
+            counts[day] += state == 'F'
+
+    return {
+        'start': start,
+        'days': days,
+        'legend': LEGEND,
+        'rooms': calendar_rooms,
+        'free_by_category': dict(sorted(free_by_category.items())),
+    }
+
+
+class Command(BaseCommand):
+    help = ('Benchmark the rooms x dates calendar (Hotel.calendar_grid) against a per-night loop '
+            'on a scratch hotel, checking both produce the same grid')
+
+    def add_arguments(self, parser):
+        parser.add_argument('--rooms', type=int, default=500, help='Rooms in the scratch hotel')
+        parser.add_argument('--categories', type=int, default=5)
+        parser.add_argument('--days', type=int, default=90, help='Calendar width, also the booking horizon')
+        parser.add_argument('--rounds', type=int, default=10)
+        parser.add_argument('--seed', type=int, default=None)
+        parser.add_argument('--keep', action='store_true', help='Keep the scratch hotel and its bookings')
+
+    def setup_hotel(self, options):
+        rng = random.Random(options['seed'])
+        tag = uuid.uuid4().hex[:8]
+        owner = User.objects.create_user(
+            email=f"bench-{tag}@example.com", password=None, full_name=f"Bench {tag}", is_email_verified=True
+        )
+        hotel = Hotel.objects.create(
+            owner=owner, name=f"Bench {tag}", address='-', city='-', state='-', country='-',
+            pincode='0', contact_number='0', email=owner.email,
+        )
+        categories = RoomCategory.objects.bulk_create([
+            RoomCategory(hotel=hotel, name=f"Category {n}", slug=f"bench-{tag}-category-{n}", price_per_night=100,
+                         max_occupancy=2, amenities='-')
+            for n in range(options['categories'])
+        ])
+        rooms = Room.objects.bulk_create([
+            Room(
+                hotel=hotel, room_category=categories[number % len(categories)], room_number=f"R{number:05d}",
+                room_code=f"BENCH-{tag}-{number}", slug=f"bench-{tag}-{number}", floor='1',
+                status='maintenance' if rng.random() < 0.05 else 'available',
+            )
+            for number in range(options['rooms'])
+        ], batch_size=1000)
+
+        # Back-to-back stays per room with random gaps, so no constraint rejects an overlap
+        bookings, today = [], date.today()
+        for room in rooms:
+            day = rng.randint(-3, 3)
+            while day < options['days']:
+                length = rng.randint(1, 7)
+                bookings.append(Booking(
+                    user=owner, hotel=hotel, room=room, booking_code=f"BN{len(bookings):06d}",
+                    slug=f"bench-{tag}-booking-{len(bookings)}", guests_count=1,
+                    status=rng.choice(['confirmed', 'checked_in', 'pending', 'cancelled']),
+                    check_in=today + timedelta(days=day), check_out=today + timedelta(days=day + length),
+                ))
+                day += length + rng.randint(0, 4)
+        Booking.objects.bulk_create(bookings, batch_size=1000)
+        return owner, hotel, len(bookings)
+
+    def run(self, func, hotel, rooms, start, days, rounds):
+        elapsed, queries, result = 0.0, 0, None
+        for _ in range(rounds):
+            with CaptureQueriesContext(connection) as ctx:
+                started = time.perf_counter()
+                result = func(hotel.pk, rooms, start, days)
+                elapsed += time.perf_counter() - started
+            queries += len(ctx.captured_queries)
+        return elapsed, queries, result
+
+    def handle(self, *args, **options):
+        if not 1 <= options['days'] <= 90:
+            raise CommandError("--days must be between 1 and 90.")
+        owner, hotel, booking_count = self.setup_hotel(options)
+        try:
+            rooms = list(
+                Room.objects.filter(hotel=hotel).order_by('room_number')
+                .values('id', 'room_number', 'slug', 'status', category=F('room_category__slug'))
+            )
+            start, days, rounds = date.today(), options['days'], options['rounds']
+            build_calendar(hotel.pk, rooms[:1], start, 1)  # import numpy outside the timed loop
+
+            self.stdout.write(
+                f"{len(rooms)} rooms x {days} days, {booking_count} bookings ({connection.vendor}), {rounds} rounds"
+            )
+            results = {}
+            for label, func in (('per-night', naive_calendar), ('grid', build_calendar)):
+                elapsed, queries, results[label] = self.run(func, hotel, rooms, start, days, rounds)
+                results[f'{label} time'] = elapsed
+                self.stdout.write(
+                    f"{label:>10}: {elapsed / rounds * 1000:9.2f} ms/calendar | {queries / rounds:.0f} queries/calendar"
+                )
+        finally:
+            if not options['keep']:
+                owner.delete()  # cascades to the hotel, its rooms and bookings
+
+        if results['grid'] != results['per-night']:
+            raise CommandError("The grid and the per-night loop disagree.")
+        if results['grid time']:
+            speedup = results['per-night time'] / results['grid time']
+            self.stdout.write(self.style.SUCCESS(f"Same output; speedup {speedup:.1f}x"))
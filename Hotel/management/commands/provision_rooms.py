@@ -0,0 +1,52 @@
+import time
+
+from django.core.management.base import BaseCommand, CommandError
+
+from Hotel.models import Hotel
+from Hotel.provisioning import ProvisioningError, RoomProvisioner
+from MBP.utils import parse_rows
+
+
+class Command(BaseCommand):
+    help = 'Bulk create rooms of a hotel from a CSV or JSON plan of floor ranges'
+
+    def add_arguments(self, parser):
+        parser.add_argument('hotel', help='Slug of the hotel the rooms belong to')
+        parser.add_argument(
+            'path', help='CSV with a header row (floor, room_category, count or start/end, ...), or a JSON array'
+        )
+        parser.add_argument('--dry-run', action='store_true', help='Plan and validate only, write nothing')
+
+    def handle(self, *args, **options):
+        try:
+            hotel = Hotel.objects.get(slug=options['hotel'])
+        except Hotel.DoesNotExist:
+            raise CommandError(f"No hotel with slug {options['hotel']}")
+
+        try:
+            with open(options['path'], 'rb') as f:
+                rows = parse_rows(f.read(), options['path'])
+        except (OSError, ValueError, UnicodeDecodeError) as e:
+            raise CommandError(f"Could not read {options['path']}: {e}")
+
+        start = time.perf_counter()
+        try:
+            result = RoomProvisioner(hotel, dry_run=options['dry_run']).run(rows)
+        except ProvisioningError as e:
+            raise CommandError(str(e))
+        elapsed = time.perf_counter() - start
+
+        for error in result['errors']:
+            messages = '; '.join(
+                f"{field}: {' '.join(str(message) for message in field_errors)}"
+                for field, field_errors in error['errors'].items()
+            )
+            self.stderr.write(f"Row {error['row']}: {messages}")
+        if result['errors']:
+            raise CommandError(f"{len(result['errors'])} rows rejected; no rooms were created.")
+
+        verb = 'Planned' if options['dry_run'] else 'Created'
+        count = result['planned'] if options['dry_run'] else result['created']
+        self.stdout.write(self.style.SUCCESS(
+            f"{verb} {count} rooms at {hotel.name} from {len(rows)} ranges in {elapsed:.2f}s."
+        ))
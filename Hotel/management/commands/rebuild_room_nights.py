@@ -0,0 +1,11 @@
+from django.core.management.base import BaseCommand
+
+from Hotel.inventory import rebuild_room_nights
+
+
+class Command(BaseCommand):
+    help = 'Rebuild the RoomNight inventory from active bookings (entrypoint.sh runs it on every deploy)'
+
+    def handle(self, *args, **options):
+        nights = rebuild_room_nights()
+        self.stdout.write(self.style.SUCCESS(f"Wrote {nights} room nights."))
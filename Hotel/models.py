@@ -1,6 +1,8 @@
 import uuid
 from django.db import models
 from django.utils.text import slugify
+from MBP.sequences import next_after, next_code
+from MBP.slugs import unique_slug
 from django.db import models, transaction
 from django.contrib.auth import get_user_model
 
@@ -68,13 +70,7 @@ class RoomCategory(models.Model):
 
     def save(self, *args, **kwargs):
         if not self.slug:
-            base_slug = slugify(self.name)
-            slug = base_slug
-            index = 1
-            while RoomCategory.objects.filter(slug=slug).exists():
-                slug = f"{base_slug}-{index}"
-                index += 1
-            self.slug = slug
+            self.slug = unique_slug(self, slugify(self.name))
         super().save(*args, **kwargs)
 
 
@@ -113,32 +109,27 @@ class Room(models.Model):
     def __str__(self):
         return f"{self.room_number} - {self.hotel.name}"
 
+    @staticmethod
+    def format_room_number(floor, number):
+        """e.g. floor "1", number 5 -> "R105"; "01" -> "R105" too; "G" -> "RG05"."""
+        try:
+            floor = int(floor)
+        except ValueError:
+            pass
+        return f"R{floor}{number:02d}"
+
     def save(self, *args, **kwargs):
         with transaction.atomic():
             if not self.room_number:
                 count = Room.objects.filter(hotel=self.hotel, floor=self.floor).count() + 1
-                try:
-                    floor_number = int(self.floor)
-                    self.room_number = f"R{floor_number}{count:02d}"
-                except ValueError:
-                    self.room_number = f"R{self.floor}{count:02d}"
+                self.room_number = self.format_room_number(self.floor, count)
 
                 while Room.objects.filter(hotel=self.hotel, room_number=self.room_number).exists():
                     count += 1
-                    try:
-                        floor_number = int(self.floor)
-                        self.room_number = f"R{floor_number}{count:02d}"
-                    except ValueError:
-                        self.room_number = f"R{self.floor}{count:02d}"
+                    self.room_number = self.format_room_number(self.floor, count)
 
             if not self.slug:
-                base_slug = slugify(f"{self.hotel.name}-{self.room_number}")
-                slug = base_slug
-                index = 1
-                while Room.objects.filter(slug=slug).exists():
-                    slug = f"{base_slug}-{index}"
-                    index += 1
-                self.slug = slug
+                self.slug = unique_slug(self, slugify(f"{self.hotel.name}-{self.room_number}"))
 
             # Auto-generate room_code if not set
             # if not self.room_code:
@@ -186,7 +177,7 @@ class Booking(models.Model):
     user = models.ForeignKey(User, on_delete=models.CASCADE, related_name='bookings')
     hotel = models.ForeignKey(Hotel, on_delete=models.CASCADE, related_name='bookings')
     room = models.ForeignKey(Room, on_delete=models.CASCADE, related_name='bookings')
-    booking_code = models.CharField(max_length=10, unique=True, blank=True)
+    booking_code = models.CharField(max_length=10, blank=True)
     slug = models.SlugField(unique=True, blank=True)
     check_in = models.DateField()
     check_out = models.DateField()
@@ -197,24 +188,51 @@ class Booking(models.Model):
     check_out_time = models.DateTimeField(null=True, blank=True)
     created_at = models.DateTimeField(auto_now_add=True)
 
+    class Meta:
+        constraints = [
+            models.UniqueConstraint(fields=['hotel', 'booking_code'], name='unique_booking_code_per_hotel'),
+        ]
+
     def __str__(self):
         return f"{self.user} - {self.hotel.name} - {self.status}"
     
     def save(self, *args, **kwargs):
         if not self.booking_code:
-            last = Booking.objects.order_by('-created_at').first()
-            if last and last.booking_code and last.booking_code.startswith('BK'):
-                last_number = int(last.booking_code.replace('BK', ''))
-                self.booking_code = f"BK{last_number + 1:03d}"
-            else:
-                self.booking_code = "BK001"
+            # Per-hotel counter, so hotels do not contend for one sequence row
+            self.booking_code = next_code(
+                'booking_code', 'BK{n:03d}', scope=self.hotel_id,
+                initial=lambda: next_after(Booking.objects.filter(hotel_id=self.hotel_id), 'booking_code', 'BK'),
+            )
 
         if not self.slug:
-            self.slug = slugify(self.booking_code)
+            self.slug = unique_slug(self, slugify(f"{self.hotel.name}-{self.booking_code}"))
 
         super().save(*args, **kwargs)
-        
-        
+
+
+class RoomNight(models.Model):
+    """
+    One row per night a room is held by an active booking, kept in sync with
+    Booking by Hotel.inventory so availability is an indexed lookup by date.
+    """
+    hotel = models.ForeignKey(Hotel, on_delete=models.CASCADE, related_name='room_nights')
+    room = models.ForeignKey(Room, on_delete=models.CASCADE, related_name='nights')
+    booking = models.ForeignKey(Booking, on_delete=models.CASCADE, related_name='nights')
+    date = models.DateField()
+
+    class Meta:
+        constraints = [
+            models.UniqueConstraint(fields=['booking', 'date'], name='unique_booking_night'),
+        ]
+        indexes = [
+            models.Index(fields=['room', 'date'], name='roomnight_room_date_idx'),
+            models.Index(fields=['hotel', 'date'], name='roomnight_hotel_date_idx'),
+        ]
+
+    def __str__(self):
+        return f"{self.room_id} @ {self.date}"
+
+
 class Guest(models.Model):
     GENDER_CHOICES = [
         ('male', 'Male'),
@@ -247,13 +265,8 @@ class Guest(models.Model):
 
     def save(self, *args, **kwargs):
         if not self.slug:
-            base_slug = slugify(f"{self.first_name}-{self.last_name or ''}-{self.booking.booking_code}")
-            counter = 1
-            new_slug = base_slug
-            while Guest.objects.filter(slug=new_slug).exists():
-                counter += 1
-                new_slug = f"{base_slug}-{counter}"
-            self.slug = new_slug
+            base = f"{self.first_name}-{self.last_name or ''}-{self.booking.booking_code}"
+            self.slug = unique_slug(self, slugify(base), start=2)
         super().save(*args, **kwargs)
     
     
@@ -0,0 +1,211 @@
+from collections import Counter
+
+from django.conf import settings
+from django.db import IntegrityError, connection, transaction
+from django.db.models import F
+from django.utils.text import slugify
+from rest_framework import serializers
+
+from MBP.slugs import allocate_slugs
+from .models import Hotel, Room, RoomCategory
+
+
+class ProvisioningError(Exception):
+    """The planned rooms could not be inserted, e.g. a concurrent writer took one of their numbers."""
+
+
+class RoomRangeSerializer(serializers.Serializer):
+    """
+    One line of a provisioning plan: `count` new rooms on a floor, numbered after the
+    floor's existing ones, or the explicit numbers `start`..`end` (end defaults to start).
+    """
+    floor = serializers.CharField(max_length=20)
+    room_category = serializers.SlugField()
+    count = serializers.IntegerField(min_value=1, required=False, default=None)
+    start = serializers.IntegerField(min_value=0, required=False, default=None)
+    end = serializers.IntegerField(min_value=0, required=False, default=None)
+    room_code_prefix = serializers.CharField(max_length=12, required=False, allow_blank=True, default='')
+    price_per_night = serializers.DecimalField(max_digits=10, decimal_places=2, required=False, default=None)
+    status = serializers.ChoiceField(choices=Room.STATUS_CHOICES, required=False, default='available')
+    amenities = serializers.CharField(required=False, allow_blank=True, default='')
+    bed_type = serializers.CharField(max_length=50, required=False, allow_blank=True, default='')
+    room_size = serializers.CharField(max_length=50, required=False, allow_blank=True, default='')
+    view = serializers.CharField(max_length=100, required=False, allow_blank=True, default='')
+    description = serializers.CharField(required=False, allow_blank=True, default='')
+
+    def validate(self, data):
+        if (data['count'] is None) == (data['start'] is None):
+            raise serializers.ValidationError("Give either count, or start (and optionally end).")
+        if data['start'] is None:
+            if data['end'] is not None:
+                raise serializers.ValidationError({'end': ["end needs a start."]})
+        else:
+            data['end'] = data['start'] if data['end'] is None else data['end']
+            if data['end'] < data['start']:
+                raise serializers.ValidationError({'end': ["end must not be below start."]})
+        return data
+
+
+def lock_hotel(hotel_id):
+    """
+    Serializes room provisioning per hotel until the current transaction ends, so the
+    snapshot of existing room numbers cannot go stale before the insert.
+    """
+    if connection.features.has_select_for_update:
+        list(Hotel.objects.select_for_update().filter(pk=hotel_id).values_list('pk', flat=True))
+    else:
+        Hotel.objects.filter(pk=hotel_id).update(name=F('name'))
+
+
+class RoomProvisioner:
+    """
+    Turns a plan of floor ranges into Room rows. Room numbers, codes and slugs are
+    computed in memory against one snapshot of the hotel's rooms, then everything is
+    inserted with bulk_create in one transaction. A plan with any error writes nothing.
+    """
+
+    def __init__(self, hotel, dry_run=False):
+        self.hotel = hotel
+        self.dry_run = dry_run
+        self.errors = []
+
+    def run(self, rows):
+        with transaction.atomic():
+            if not self.dry_run:
+                lock_hotel(self.hotel.pk)
+            rooms = self.plan(rows)
+            created = not self.errors and not self.dry_run
+            if created:
+                slugs = allocate_slugs(Room, [slugify(f"{self.hotel.name}-{room.room_number}") for room in rooms])
+                for room, slug in zip(rooms, slugs):
+                    room.slug = slug
+                try:
+                    Room.objects.bulk_create(rooms, batch_size=500)
+                except IntegrityError as e:
+                    raise ProvisioningError("Rooms were added to this hotel meanwhile, please retry.") from e
+
+        return {
+            'hotel': self.hotel.slug,
+            'planned': len(rooms),
+            'created': len(rooms) if created else 0,
+            'dry_run': self.dry_run,
+            'errors': sorted(self.errors, key=lambda error: error['row']),
+            'rooms': [
+                {
+                    'room_number': room.room_number,
+                    'room_code': room.room_code,
+                    'slug': room.slug or None,
+                    'floor': room.floor,
+                    'room_category': room.room_category.slug,
+                    'price_per_night': room.price_per_night,
+                }
+                for room in rooms
+            ],
+        }
+
+    def validate_rows(self, rows):
+        valid = []
+        for number, row in enumerate(rows, start=1):
+            if not isinstance(row, dict):
+                self.errors.append({'row': number, 'errors': {'non_field_errors': ["Expected an object of room fields."]}})
+                continue
+            # Blank CSV cells mean "use the default"
+            serializer = RoomRangeSerializer(data={key: value for key, value in row.items() if value not in ('', None)})
+            if serializer.is_valid():
+                valid.append((number, serializer.validated_data))
+            else:
+                self.errors.append({'row': number, 'errors': serializer.errors})
+
+        categories = {
+            category.slug: category
+            for category in RoomCategory.objects.filter(hotel=self.hotel, slug__in={data['room_category'] for _n, data in valid})
+        }
+        accepted = []
+        for number, data in valid:
+            if data['room_category'] not in categories:
+                self.errors.append({'row': number, 'errors': {'room_category': ["No such room category in this hotel."]}})
+                continue
+            data['category'] = categories[data['room_category']]
+            accepted.append((number, data))
+
+        total = sum(data['count'] or data['end'] - data['start'] + 1 for _number, data in accepted)
+        if total > settings.ROOM_PROVISIONING_MAX_ROOMS:
+            self.errors.append({'row': 0, 'errors': {
+                'rows': [f"The plan adds {total} rooms; at most {settings.ROOM_PROVISIONING_MAX_ROOMS} per request."]
+            }})
+            return []
+        return accepted
+
+    def plan(self, rows):
+        """
+        Computes the rooms of every valid row. Explicit ranges go first so that
+        `count` rows fill around them rather than taking their numbers.
+        """
+        accepted = self.validate_rows(rows)
+        accepted.sort(key=lambda item: item[1]['start'] is None)
+
+        # Snapshot of what exists: one query for the hotel's numbers, one for the candidate codes
+        existing = list(Room.objects.filter(hotel=self.hotel).values_list('floor', 'room_number'))
+        taken_numbers = {room_number for _floor, room_number in existing}
+        next_on_floor = Counter(floor for floor, _room_number in existing)
+
+        planned = []
+        for number, data in accepted:
+            floor = data['floor']
+            if data['start'] is not None:
+                numbers = [Room.format_room_number(floor, n) for n in range(data['start'], data['end'] + 1)]
+                clashes = [room_number for room_number in numbers if room_number in taken_numbers]
+                if clashes:
+                    self.errors.append({'row': number, 'errors': {
+                        'start': [f"Room numbers already taken: {', '.join(clashes[:10])}."]
+                    }})
+                    continue
+            else:
+                # Same numbering as Room.save(): after the floor's room count, skipping taken numbers
+                numbers, n = [], next_on_floor[floor] + 1
+                while len(numbers) < data['count']:
+                    room_number = Room.format_room_number(floor, n)
+                    if room_number not in taken_numbers:
+                        numbers.append(room_number)
+                    n += 1
+            taken_numbers.update(numbers)
+            next_on_floor[floor] += len(numbers)
+            planned.append((number, data, numbers))
+
+        prefix = f"{self.hotel.pk.hex[:6].upper()}-"
+        codes = [
+            (data['room_code_prefix'] or prefix) + room_number
+            for _number, data, numbers in planned for room_number in numbers
+        ]
+        taken_codes = set(Room.objects.filter(room_code__in=codes).values_list('room_code', flat=True))
+
+        rooms, codes = [], iter(codes)
+        for number, data, numbers in planned:
+            row_rooms, clashes = [], []
+            for room_number in numbers:
+                room_code = next(codes)
+                if room_code in taken_codes or len(room_code) > 20 or len(room_number) > 20:
+                    clashes.append(room_code)
+                taken_codes.add(room_code)
+                row_rooms.append(Room(
+                    hotel=self.hotel,
+                    room_category=data['category'],
+                    room_number=room_number,
+                    room_code=room_code,
+                    floor=data['floor'],
+                    status=data['status'],
+                    # Same default as Room.save(): the category's price
+                    price_per_night=data['price_per_night'] or data['category'].price_per_night,
+                    amenities=data['amenities'],
+                    bed_type=data['bed_type'],
+                    room_size=data['room_size'],
+                    view=data['view'],
+                    description=data['description'],
+                ))
+            if clashes:
+                self.errors.append({'row': number, 'errors': {
+                    'room_code_prefix': [f"Room codes taken or longer than 20 characters: {', '.join(clashes[:10])}."]
+                }})
+            else:
+                rooms.extend(row_rooms)
+        return rooms
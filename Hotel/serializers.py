@@ -1,5 +1,9 @@
 from rest_framework import serializers
 from .models import Hotel, RoomCategory, Room, Booking, RoomServiceRequest, Guest, RoomMedia
+from .booking_engine import RoomUnavailable, create_booking, overlapping, update_booking
+from .inventory import ACTIVE_BOOKING_STATUSES
+from django.conf import settings
+from django.db import transaction
 from django.contrib.auth import get_user_model
 User = get_user_model()
 
@@ -217,46 +221,84 @@ class BookingSerializer(serializers.ModelSerializer):
         check_in = data.get('check_in', self.instance.check_in if self.instance else None)
         check_out = data.get('check_out', self.instance.check_out if self.instance else None)
         room = data.get('room', self.instance.room if self.instance else None)
+        booking_status = data.get('status', self.instance.status if self.instance else 'pending')
 
         # ✅ Check date order
         if check_in and check_out and check_in >= check_out:
             raise serializers.ValidationError("Check-out must be after check-in.")
 
-        # ✅ Prevent overlapping bookings
-        overlapping = Booking.objects.filter(
-            room=room,
-            check_out__gt=check_in,
-            check_in__lt=check_out
-        )
-        if self.instance:
-            overlapping = overlapping.exclude(id=self.instance.id)
-        if overlapping.exists():
-            raise serializers.ValidationError("This room is already booked for the selected dates.")
+        # ✅ Prevent overlapping bookings (re-checked under the room lock on save)
+        if room and check_in and check_out and booking_status in ACTIVE_BOOKING_STATUSES:
+            exclude_id = self.instance.id if self.instance else None
+            if overlapping(room.id, check_in, check_out, exclude_id=exclude_id).exists():
+                raise serializers.ValidationError("This room is already booked for the selected dates.")
 
         return data
 
     def create(self, validated_data):
         guests_data = validated_data.pop('guests', [])
-        booking = Booking.objects.create(**validated_data)
-        for guest in guests_data:
-            Guest.objects.create(booking=booking, **guest)
-        return booking
+        try:
+            return create_booking(guests=guests_data, **validated_data)
+        except RoomUnavailable as e:
+            raise serializers.ValidationError(str(e))
 
     def update(self, instance, validated_data):
         guests_data = validated_data.pop('guests', None)
-        for attr, value in validated_data.items():
-            setattr(instance, attr, value)
-        instance.save()
+        with transaction.atomic():
+            try:
+                update_booking(instance, **validated_data)
+            except RoomUnavailable as e:
+                raise serializers.ValidationError(str(e))
 
-        if guests_data is not None:
-            instance.guests.all().delete()  # clear old guests
-            for guest in guests_data:
-                Guest.objects.create(booking=instance, **guest)
+            if guests_data is not None:
+                instance.guests.all().delete()  # clear old guests
+                for guest in guests_data:
+                    Guest.objects.create(booking=instance, **guest)
 
         return instance
 
 
 
+class GroupBookingRoomsSerializer(serializers.Serializer):
+    room_category = serializers.SlugField()
+    count = serializers.IntegerField(min_value=1)
+
+
+class GroupBookingSerializer(serializers.Serializer):
+    """
+    Input of POST /api/bookings/group/: one stay, a mix of room categories and the guest list.
+    """
+    hotel = serializers.SlugRelatedField(slug_field='slug', queryset=Hotel.objects.all())
+    check_in = serializers.DateField()
+    check_out = serializers.DateField()
+    rooms = GroupBookingRoomsSerializer(many=True, allow_empty=False)
+    guests = GuestSerializer(many=True, required=False, default=list)
+    status = serializers.ChoiceField(choices=['pending', 'confirmed'], default='pending')
+
+    def validate(self, data):
+        if data['check_in'] >= data['check_out']:
+            raise serializers.ValidationError("Check-out must be after check-in.")
+
+        category_counts = {}
+        for item in data['rooms']:
+            category_counts[item['room_category']] = category_counts.get(item['room_category'], 0) + item['count']
+        if sum(category_counts.values()) > settings.GROUP_BOOKING_MAX_ROOMS:
+            raise serializers.ValidationError(f"At most {settings.GROUP_BOOKING_MAX_ROOMS} rooms per group booking.")
+
+        capacities = dict(
+            RoomCategory.objects.filter(hotel=data['hotel'], slug__in=category_counts)
+            .values_list('slug', 'max_occupancy')
+        )
+        unknown = category_counts.keys() - capacities.keys()
+        if unknown:
+            raise serializers.ValidationError({"rooms": f"Unknown room categories for this hotel: {', '.join(sorted(unknown))}."})
+        if len(data['guests']) > sum(capacities[slug] * count for slug, count in category_counts.items()):
+            raise serializers.ValidationError({"guests": "More guests than the requested rooms can hold."})
+
+        data['category_counts'] = category_counts
+        return data
+
+
 class RoomServiceRequestSerializer(serializers.ModelSerializer):
     
     room = serializers.SlugRelatedField(
@@ -1,6 +1,7 @@
 from django.db.models.signals import post_save
 from django.dispatch import receiver
-from .models import Hotel
+from .inventory import INVENTORY_FIELDS, sync_booking
+from .models import Booking, Hotel
 from accounts.models import User  # adjust path based on your structure
 
 @receiver(post_save, sender=User)
@@ -10,3 +11,11 @@ def create_admin_hotel(sender, instance, created, **kwargs):
             owner=instance,
             defaults={'name': f"{instance.username}'s Hotel"}
         )
+
+
+@receiver(post_save, sender=Booking)
+def update_room_nights(sender, instance, raw=False, update_fields=None, **kwargs):
+    # Deleted bookings drop their nights by CASCADE; saves of unrelated fields skip the sync
+    if raw or (update_fields is not None and not INVENTORY_FIELDS.intersection(update_fields)):
+        return
+    sync_booking(instance)
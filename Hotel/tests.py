@@ -1,3 +1,354 @@
+import datetime
+import itertools
+import random
+from unittest import mock, skipUnless
+
+import numpy as np
+from django.core.cache import cache
+from django.db import DatabaseError, IntegrityError, connection
+from django.db.models import F
 from django.test import TestCase
+from django.test.utils import CaptureQueriesContext
+from rest_framework.test import APIClient
+
+from accounts.models import User
+from . import booking_engine
+from .booking_engine import RoomUnavailable, create_booking, install_exclusion_constraint
+from .calendar_grid import build_calendar, encode_runs
+from .inventory import ACTIVE_BOOKING_STATUSES
+from .models import Booking, Hotel, Room, RoomCategory, RoomNight
+
+TODAY = datetime.date(2030, 1, 10)
+
+
+def make_hotel(owner_email='owner@example.com'):
+    owner = User.objects.create_user(email=owner_email, password=None, is_email_verified=True)
+    return Hotel.objects.create(
+        owner=owner, name='Seaside', address='1 Beach Road', city='Goa', state='Goa',
+        country='India', pincode='403001', contact_number='1234567890', email='desk@seaside.example',
+    )
+
+
+def make_category(hotel, name, max_occupancy=2):
+    return RoomCategory.objects.create(
+        hotel=hotel, name=name, price_per_night=100, max_occupancy=max_occupancy, amenities='wifi',
+    )
+
+
+def make_rooms(hotel, category, count, floor='1'):
+    return [
+        Room.objects.create(hotel=hotel, room_category=category, floor=floor, room_code=f'{category.slug}-{n}')
+        for n in range(count)
+    ]
+
+
+def nights(day, count):
+    return TODAY + datetime.timedelta(days=day), TODAY + datetime.timedelta(days=day + count)
+
+
+class RoomNightSyncTests(TestCase):
+    def setUp(self):
+        cache.clear()
+        self.hotel = make_hotel()
+        self.room, = make_rooms(self.hotel, make_category(self.hotel, 'Deluxe'), 1)
+        self.client = APIClient()
+        self.client.force_authenticate(User.objects.create_superuser(email='root@example.com', password=None))
+
+    def test_created_booking_syncs_its_nights_once(self):
+        check_in, check_out = nights(0, 3)
+        with CaptureQueriesContext(connection) as queries:
+            response = self.client.post('/api/bookings/', {
+                'hotel': self.hotel.slug, 'room': self.room.slug, 'check_in': check_in, 'check_out': check_out,
+                'guests_count': 1, 'guests': [{'first_name': 'Asha'}],
+            }, format='json')
+        self.assertEqual(response.status_code, 201, response.data)
+
+        syncs = [q for q in queries if q['sql'].startswith('DELETE FROM "Hotel_roomnight"')]
+        self.assertEqual(len(syncs), 1)
+        self.assertEqual(RoomNight.objects.filter(room=self.room).count(), 3)
+
+    def test_changed_dates_and_status_resync(self):
+        check_in, check_out = nights(0, 2)
+        booking = Booking.objects.create(
+            user=self.hotel.owner, hotel=self.hotel, room=self.room, check_in=check_in, check_out=check_out,
+            guests_count=1,
+        )
+        booking.check_out += datetime.timedelta(days=2)
+        booking.save()
+        self.assertEqual(RoomNight.objects.filter(booking=booking).count(), 4)
+
+        booking.status = 'cancelled'
+        booking.save()
+        self.assertFalse(RoomNight.objects.filter(booking=booking).exists())
+
+
+class BookingOverlapTests(TestCase):
+    def setUp(self):
+        self.hotel = make_hotel()
+        self.room, = make_rooms(self.hotel, make_category(self.hotel, 'Deluxe'), 1)
+
+    def book(self, check_in, check_out, **fields):
+        return create_booking(
+            user=self.hotel.owner, hotel=self.hotel, room=self.room, check_in=check_in, check_out=check_out,
+            guests_count=1, **fields
+        )
+
+    def test_overlapping_stay_is_rejected(self):
+        self.book(*nights(0, 3))
+        for stay in (nights(2, 3), nights(-1, 2), nights(1, 1)):
+            with self.assertRaises(RoomUnavailable):
+                self.book(*stay)
+        self.assertEqual(Booking.objects.count(), 1)
+
+    def test_back_to_back_and_cancelled_stays_are_allowed(self):
+        first = self.book(*nights(0, 3))
+        self.book(*nights(3, 2))
+        first.status = 'cancelled'
+        first.save()
+        self.book(*nights(0, 3))
+        self.assertEqual(Booking.objects.filter(status='pending').count(), 2)
+
+    @skipUnless(connection.vendor == 'postgresql', 'the exclusion constraint is PostgreSQL only')
+    def test_exclusion_constraint_is_reported_as_room_unavailable(self):
+        self.book(*nights(0, 3))
+        # Skip the locked re-check so the overlap reaches the database
+        with mock.patch('Hotel.booking_engine._check_room'), self.assertRaises(RoomUnavailable) as raised:
+            self.book(*nights(1, 1))
+        self.assertIsInstance(raised.exception.__cause__, IntegrityError)
+
+    def test_failed_constraint_install_is_logged(self):
+        db = mock.MagicMock(vendor='postgresql')
+        db.cursor.return_value.__enter__.return_value.execute.side_effect = DatabaseError('overlapping rows')
+        with mock.patch('Hotel.booking_engine.connections', {'default': db}), \
+                self.assertLogs('Hotel.booking_engine', 'WARNING') as logs:
+            install_exclusion_constraint(using='default')
+        self.assertIn('Could not add hotel_booking_no_overlap', logs.output[0])
+        self.assertIn('overlapping rows', logs.output[0])
+
+
+class GroupBookingTests(TestCase):
+    def setUp(self):
+        cache.clear()
+        self.hotel = make_hotel()
+        self.deluxe = make_rooms(self.hotel, make_category(self.hotel, 'Deluxe'), 3)
+        self.suites = make_rooms(self.hotel, make_category(self.hotel, 'Suite', max_occupancy=4), 1, floor='2')
+        self.client = APIClient()
+        self.client.force_authenticate(User.objects.create_superuser(email='root@example.com', password=None))
+
+    def book(self, deluxe=0, suite=0, guests=()):
+        check_in, check_out = nights(0, 2)
+        rooms = [{'room_category': 'deluxe', 'count': deluxe}, {'room_category': 'suite', 'count': suite}]
+        return self.client.post('/api/bookings/group/', {
+            'hotel': self.hotel.slug, 'check_in': check_in, 'check_out': check_out,
+            'rooms': [room for room in rooms if room['count']], 'guests': list(guests),
+        }, format='json')
+
+    def book_outside_the_inventory(self, room):
+        # e.g. written by queryset.update() or before rebuild_room_nights ran
+        check_in, check_out = nights(1, 1)
+        booking = Booking.objects.create(
+            user=self.hotel.owner, hotel=self.hotel, room=room, check_in=check_in, check_out=check_out, guests_count=1,
+        )
+        RoomNight.objects.filter(booking=booking).delete()
+
+    def test_books_every_requested_room(self):
+        response = self.book(deluxe=2, suite=1, guests=[{'first_name': f'Guest {n}'} for n in range(5)])
+        self.assertEqual(response.status_code, 201, response.data)
+        self.assertEqual(response.data['total_rooms'], 3)
+        self.assertEqual(RoomNight.objects.count(), 6)
+        self.assertEqual(sum(booking.guests.count() for booking in Booking.objects.all()), 5)
+
+    def test_short_category_books_nothing(self):
+        response = self.book(deluxe=2, suite=2)
+        self.assertEqual(response.status_code, 409)
+        self.assertIn('suite has 1', response.data['error'])
+        self.assertFalse(Booking.objects.exists())
+        self.assertFalse(RoomNight.objects.exists())
+
+    def test_taken_room_is_replaced_from_the_remaining_candidates(self):
+        self.book_outside_the_inventory(self.deluxe[0])
+        response = self.book(deluxe=2)
+        self.assertEqual(response.status_code, 201, response.data)
+        booked = set(Booking.objects.filter(room__in=self.deluxe[1:]).values_list('room_id', flat=True))
+        self.assertEqual(booked, {self.deluxe[1].pk, self.deluxe[2].pk})
+
+    def test_room_booked_while_picking_is_replaced_after_the_lock(self):
+        lock_rooms, raced = booking_engine.lock_rooms, []
+
+        def racing_lock(*room_ids):
+            if not raced:
+                # Another writer books a picked room between the candidate query and the lock
+                check_in, check_out = nights(1, 1)
+                raced.append(Booking.objects.create(
+                    user=self.hotel.owner, hotel=self.hotel, room_id=room_ids[0],
+                    check_in=check_in, check_out=check_out, guests_count=1,
+                ))
+            lock_rooms(*room_ids)
+
+        with mock.patch('Hotel.booking_engine.lock_rooms', side_effect=racing_lock) as locked:
+            response = self.book(deluxe=2)
+        self.assertEqual(response.status_code, 201, response.data)
+        self.assertEqual(locked.call_count, 2)
+        self.assertEqual(Booking.objects.filter(room_id=raced[0].room_id).count(), 1)
+        self.assertEqual(Booking.objects.filter(room__in=self.deluxe).count(), 3)
+
+    def test_taken_rooms_leave_the_category_short(self):
+        self.book_outside_the_inventory(self.deluxe[0])
+        self.book_outside_the_inventory(self.deluxe[1])
+        response = self.book(deluxe=2)
+        self.assertEqual(response.status_code, 409)
+        self.assertIn('deluxe has 1', response.data['error'])
+        self.assertEqual(Booking.objects.count(), 2)
+
+    def test_booking_codes_are_numbered_per_hotel(self):
+        self.assertEqual(self.book(deluxe=2).status_code, 201)
+        other = Hotel.objects.create(
+            owner=User.objects.create_user(email='hill@example.com', password=None), name='Hillside', address='2 Hill Road', city='Ooty', state='Tamil Nadu',
+            country='India', pincode='643001', contact_number='1234567890', email='desk@hillside.example',
+        )
+        room, = make_rooms(other, make_category(other, 'Deluxe'), 1)
+        booking = Booking.objects.create(
+            user=other.owner, hotel=other, room=room, check_in=TODAY, check_out=TODAY + datetime.timedelta(days=1),
+            guests_count=1,
+        )
+
+        codes = sorted(Booking.objects.filter(hotel=self.hotel).values_list('booking_code', flat=True))
+        self.assertEqual(codes, ['BK001', 'BK002'])
+        self.assertEqual(booking.booking_code, 'BK001')
+        self.assertEqual(booking.slug, 'hillside-bk001')
+
+
+class BulkProvisionTests(TestCase):
+    def setUp(self):
+        cache.clear()
+        self.hotel = make_hotel()
+        self.category = make_category(self.hotel, 'Deluxe')
+        make_rooms(self.hotel, self.category, 2)
+        self.client = APIClient()
+        self.client.force_authenticate(User.objects.create_superuser(email='root@example.com', password=None))
+
+    def provision(self, *rows, **params):
+        return self.client.post(
+            '/api/rooms/bulk-provision/', {'hotel': self.hotel.slug, 'rows': list(rows), **params}, format='json'
+        )
+
+    def room_numbers(self):
+        return sorted(Room.objects.filter(hotel=self.hotel).values_list('room_number', flat=True))
+
+    def test_counts_fill_around_existing_and_explicit_numbers(self):
+        response = self.provision(
+            {'floor': '1', 'room_category': 'deluxe', 'count': 3},
+            {'floor': '1', 'room_category': 'deluxe', 'start': 5},
+            {'floor': '2', 'room_category': 'deluxe', 'count': 2},
+        )
+        self.assertEqual(response.status_code, 201, response.data)
+        self.assertEqual(response.data['created'], 6)
+        # Like Room.save(): numbering resumes after the floor's room count (3 with R105), skipping R105
+        self.assertEqual(self.room_numbers(), ['R101', 'R102', 'R104', 'R105', 'R106', 'R107', 'R201', 'R202'])
+        self.assertEqual(len(set(Room.objects.values_list('room_code', flat=True))), 8)
+
+    def test_dry_run_writes_nothing(self):
+        response = self.provision({'floor': '3', 'room_category': 'deluxe', 'count': 2}, dry_run=True)
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual([room['room_number'] for room in response.data['rooms']], ['R301', 'R302'])
+        self.assertEqual(self.room_numbers(), ['R101', 'R102'])
+
+    def test_number_collision_rejects_the_whole_plan(self):
+        response = self.provision(
+            {'floor': '3', 'room_category': 'deluxe', 'count': 2},
+            {'floor': '1', 'room_category': 'deluxe', 'start': 2, 'end': 4},
+        )
+        self.assertEqual(response.status_code, 400)
+        self.assertEqual([error['row'] for error in response.data['errors']], [2])
+        self.assertIn('R102', str(response.data['errors'][0]['errors']['start']))
+        self.assertEqual(self.room_numbers(), ['R101', 'R102'])
+
+    def test_room_code_collision_is_reported(self):
+        Room.objects.filter(room_number='R101').update(room_code='X-R301')
+        response = self.provision({'floor': '3', 'room_category': 'deluxe', 'count': 1, 'room_code_prefix': 'X-'})
+        self.assertEqual(response.status_code, 400)
+        self.assertIn('room_code_prefix', response.data['errors'][0]['errors'])
+
+    def test_malformed_rows_are_reported_per_row(self):
+        response = self.provision(
+            {'floor': '3', 'room_category': 'deluxe', 'count': 1}, ['3', 'deluxe'], 'R301',
+            {'floor': '3', 'room_category': 'missing', 'count': 1},
+        )
+        self.assertEqual(response.status_code, 400)
+        self.assertEqual([error['row'] for error in response.data['errors']], [2, 3, 4])
+        self.assertEqual(self.room_numbers(), ['R101', 'R102'])
+
+
+def naive_calendar(rooms, bookings, start, days):
+    """
+    Reference for build_calendar: every room and night checked one by one.
+    """
+    dates = [start + datetime.timedelta(days=day) for day in range(days)]
+    runs, free = [], {}
+    for room in rooms:
+        states = []
+        for night in dates:
+            if any(
+                booking.room_id == room['id'] and booking.status in ACTIVE_BOOKING_STATUSES
+                and booking.check_in <= night < booking.check_out
+                for booking in bookings
+            ):
+                states.append('B')
+            elif room['status'] == 'maintenance':
+                states.append('M')
+            else:
+                states.append('F')
+        runs.append(''.join(f"{state}{len(list(group))}" for state, group in itertools.groupby(states)))
+        counts = free.setdefault(room['category'] or 'uncategorized', [0] * days)
+        for day, state in enumerate(states):
+            counts[day] += state == 'F'
+    return runs, free
+
+
+class CalendarGridTests(TestCase):
+    def setUp(self):
+        cache.clear()
+        self.hotel = make_hotel()
+        make_rooms(self.hotel, make_category(self.hotel, 'Deluxe'), 4)
+        make_rooms(self.hotel, make_category(self.hotel, 'Suite'), 2, floor='2')
+        Room.objects.create(hotel=self.hotel, floor='3', room_code='loose-0')
+        Room.objects.filter(room_code='suite-1').update(status='maintenance')
+        self.rooms = list(
+            Room.objects.filter(hotel=self.hotel).order_by('room_number')
+            .values('id', 'room_number', 'slug', 'status', category=F('room_category__slug'))
+        )
+
+        # Overlapping, cancelled and window-crossing stays included
+        rng = random.Random(7)
+        statuses = ['pending', 'confirmed', 'checked_in', 'cancelled', 'checked_out']
+        self.bookings = Booking.objects.bulk_create([
+            Booking(
+                user=self.hotel.owner, hotel=self.hotel, room_id=rng.choice(self.rooms)['id'],
+                booking_code=f'BK{n:03d}', slug=f'calendar-{n}', guests_count=1, status=rng.choice(statuses),
+                check_in=check_in, check_out=check_in + datetime.timedelta(days=rng.randint(1, 6)),
+            )
+            for n in range(60)
+            for check_in in [TODAY + datetime.timedelta(days=rng.randint(-8, 40))]
+        ])
+
+    def test_grid_matches_a_per_night_loop(self):
+        for start, days in ((TODAY, 30), (TODAY - datetime.timedelta(days=3), 1), (TODAY + datetime.timedelta(days=35), 10)):
+            with self.subTest(start=start, days=days):
+                calendar = build_calendar(self.hotel.pk, self.rooms, start, days)
+                runs, free = naive_calendar(self.rooms, self.bookings, start, days)
+                self.assertEqual([room['runs'] for room in calendar['rooms']], runs)
+                self.assertEqual(calendar['free_by_category'], free)
+
+    def test_runs_are_encoded_per_row(self):
+        grid = np.array([[0] * 12 + [1] * 3, [2] * 15, [1] + [0] * 13 + [1]], dtype=np.int8)
+        self.assertEqual(encode_runs(grid), ['F12B3', 'M15', 'B1F13B1'])
+
+    def test_calendar_endpoint(self):
+        client = APIClient()
+        client.force_authenticate(User.objects.create_superuser(email='root@example.com', password=None))
+        response = client.get('/api/rooms/calendar/', {'hotel': self.hotel.pk, 'start': TODAY.isoformat(), 'days': 14})
+        self.assertEqual(response.status_code, 200, response.data)
 
-# Create your tests here.
+        runs, free = naive_calendar(self.rooms, self.bookings, TODAY, 14)
+        self.assertEqual([room['runs'] for room in response.data['rooms']], runs)
+        self.assertEqual(response.data['free_by_category'], free)
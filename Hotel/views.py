@@ -6,6 +6,8 @@ from django.db.models import Count, Q, F, Avg, Sum
 from django.utils import timezone
 from rest_framework import status
 from .models import Hotel, RoomCategory, Room, Booking, RoomServiceRequest, RoomMedia
+from .inventory import availability_by_category, free_rooms
+from .calendar_grid import MAX_CALENDAR_DAYS, build_calendar
 from django.core.exceptions import PermissionDenied
 from .serializers import (
     HotelSerializer,
@@ -14,7 +16,12 @@ from .serializers import (
     BookingSerializer,
     RoomServiceRequestSerializer,
     RoomCreateUpdateSerializer,
+    GroupBookingSerializer,
 )
+from .booking_engine import RoomUnavailable, create_group_booking
+from .provisioning import ProvisioningError, RoomProvisioner
+from rest_framework.parsers import MultiPartParser, JSONParser
+from MBP.utils import log_audit, parse_rows
 
 
 class HotelViewSet(ProtectedModelViewSet):
@@ -105,6 +112,57 @@ class RoomViewSet(ProtectedModelViewSet):
             return RoomCreateUpdateSerializer
         return RoomSerializer
 
+    def get_permissions(self):
+        permissions = super().get_permissions()
+        if self.action == 'bulk_provision':
+            self.permission_code = 'c'
+        return permissions
+
+    @action(detail=False, methods=['post'], url_path='bulk-provision', parser_classes=[MultiPartParser, JSONParser])
+    def bulk_provision(self, request):
+        """
+        Creates many rooms in one transaction from floor ranges.
+        Send a CSV/JSON `file` upload or a JSON body {"rows": [...]}, one row per range:
+        floor, room_category (slug), count or start/end, and optional room_code_prefix,
+        price_per_night (defaults to the category's), status, bed_type, room_size, view, amenities, description.
+        Superusers pass `hotel` (slug); others provision their own hotel. Add dry_run=true to only plan.
+        """
+        user = request.user
+        if hasattr(user, 'hotel'):
+            hotel = user.hotel
+        elif user.is_superuser:
+            hotel = Hotel.objects.filter(slug=request.data.get('hotel')).first()
+            if not hotel:
+                return Response({"error": "A valid hotel slug is required."}, status=status.HTTP_400_BAD_REQUEST)
+        else:
+            raise PermissionDenied("You are not authorized to create rooms.")
+
+        upload = request.FILES.get('file')
+        try:
+            if upload:
+                rows = parse_rows(upload.read(), upload.name)
+            else:
+                rows = parse_rows(request.data.get('rows', []))
+        except (ValueError, UnicodeDecodeError) as e:
+            return Response({"error": f"Could not read rows: {e}"}, status=status.HTTP_400_BAD_REQUEST)
+
+        dry_run = str(request.data.get('dry_run', '')).lower() in ('1', 'true', 'yes')
+        try:
+            result = RoomProvisioner(hotel, dry_run=dry_run).run(rows)
+        except ProvisioningError as e:
+            return Response({"error": str(e)}, status=status.HTTP_409_CONFLICT)
+
+        if result['errors']:
+            return Response(result, status=status.HTTP_400_BAD_REQUEST)
+        if result['created']:
+            log_audit(
+                request=request,
+                action="create",
+                model_name="Room",
+                details=f"Provisioned {result['created']} rooms at {hotel.name} from {len(rows)} ranges.",
+            )
+        return Response(result, status=status.HTTP_201_CREATED if result['created'] else status.HTTP_200_OK)
+
     # ✅ Custom filter for available rooms
     @action(detail=False, methods=['get'], url_path='available')
     def available_rooms(self, request):
@@ -218,6 +276,33 @@ class RoomViewSet(ProtectedModelViewSet):
 
         return Response({item['status']: item['total'] for item in summary})
     
+    @action(detail=False, methods=['get'], url_path='calendar')
+    def calendar(self, request):
+        """
+        Rooms x dates grid for one hotel: each room's cells run-length encoded
+        ("F12B3" = 12 free nights, then 3 booked) plus free rooms per category per day.
+        Params: hotel (uuid, defaults to the user's hotel), start (YYYY-MM-DD, default today), days (max 90).
+        """
+        start = request.query_params.get('start')
+        try:
+            start = datetime.strptime(start, "%Y-%m-%d").date() if start else date.today()
+            days = int(request.query_params.get('days', 30))
+        except ValueError:
+            return Response({"error": "Invalid date or number format."}, status=status.HTTP_400_BAD_REQUEST)
+        if not 1 <= days <= MAX_CALENDAR_DAYS:
+            return Response({"error": f"days must be between 1 and {MAX_CALENDAR_DAYS}."}, status=status.HTTP_400_BAD_REQUEST)
+
+        hotel_id = request.query_params.get('hotel') or getattr(getattr(request.user, 'hotel', None), 'id', None)
+        if not hotel_id or not is_valid_uuid(hotel_id):
+            return Response({"error": "A valid hotel id is required."}, status=status.HTTP_400_BAD_REQUEST)
+
+        rooms = list(
+            self.get_queryset().filter(hotel_id=hotel_id)
+            .order_by('room_number')
+            .values('id', 'room_number', 'slug', 'status', category=F('room_category__slug'))
+        )
+        return Response(build_calendar(hotel_id, rooms, start, days))
+
     @action(detail=False, methods=['get'], url_path='check-availability')
     def check_availability(self, request):
         check_in = request.query_params.get('check_in')
@@ -240,39 +325,38 @@ class RoomViewSet(ProtectedModelViewSet):
         except ValueError:
             return Response({"error": "Invalid date or number format."}, status=status.HTTP_400_BAD_REQUEST)
 
-        # ✅ Find booked rooms in that date range
-        booked_room_ids = Booking.objects.filter(
-            Q(check_in__lt=check_out) & Q(check_out__gt=check_in),
-            status__in=['pending', 'confirmed', 'checked_in']
-        ).values_list('room_id', flat=True)
+        if check_in >= check_out:
+            return Response({"error": "check_out must be after check_in."}, status=status.HTTP_400_BAD_REQUEST)
 
-        # ✅ Start with available rooms
-        available_rooms = Room.objects.exclude(id__in=booked_room_ids).filter(
-            is_available=True,
-            status='available'
-        )
+        hotel_id = request.query_params.get('hotel')
+        if hotel_id and not is_valid_uuid(hotel_id):
+            return Response({"error": "Invalid hotel id."}, status=status.HTTP_400_BAD_REQUEST)
 
-        # ✅ Apply optional room_category filter
-        if room_category:
-            available_rooms = available_rooms.filter(category__slug=room_category)
+        # ✅ Free rooms from the room-night inventory, counted per category in one query
+        available_rooms = free_rooms(check_in, check_out, hotel_id=hotel_id, category_slug=room_category)
+        by_category = availability_by_category(available_rooms)
+        total_available = sum(category['available'] for category in by_category)
 
         # ✅ Check availability
-        if available_rooms.count() < rooms_required:
+        if total_available < rooms_required:
             return Response({
                 "message": "Not enough rooms available.",
-                "total_available": available_rooms.count(),
+                "total_available": total_available,
+                "by_category": by_category,
                 "room_category": room_category or "all"
             }, status=status.HTTP_200_OK)
 
         # ✅ Serialize and respond
-        serialized = RoomSerializer(available_rooms[:rooms_required], many=True)
+        rooms = available_rooms.select_related('hotel', 'room_category').prefetch_related('media')
+        serialized = RoomSerializer(rooms[:rooms_required], many=True, context={'request': request})
         return Response({
             "available_rooms": serialized.data,
-            "total_available": available_rooms.count(),
+            "total_available": total_available,
+            "by_category": by_category,
             "room_category": room_category or "all"
         }, status=status.HTTP_200_OK)
         
-# GET /api/rooms/check-availability/?check_in=2025-07-25&check_out=2025-07-28&guests=2&rooms_required=1&room_category=deluxe
+# GET /api/rooms/check-availability/?check_in=2025-07-25&check_out=2025-07-28&guests=2&rooms_required=1&room_category=deluxe&hotel=<uuid>
 
 
 class BookingViewSet(ProtectedModelViewSet):
@@ -285,6 +369,61 @@ class BookingViewSet(ProtectedModelViewSet):
         if self.request.user.is_superuser:
             return Booking.objects.all()
         return Booking.objects.filter(user=self.request.user)
+
+    def get_permissions(self):
+        permissions = super().get_permissions()
+        if self.action == 'group_booking':
+            self.permission_code = 'c'
+        return permissions
+
+    @action(detail=False, methods=['post'], url_path='group')
+    def group_booking(self, request):
+        """
+        Books many rooms for one stay in a single all-or-nothing transaction.
+        Body: {"hotel": slug, "check_in", "check_out", "rooms": [{"room_category": slug, "count": n}],
+               "guests": [...], "status": "pending"|"confirmed"}
+        """
+        serializer = GroupBookingSerializer(data=request.data, context={'request': request})
+        serializer.is_valid(raise_exception=True)
+        data = serializer.validated_data
+
+        try:
+            bookings = create_group_booking(
+                user=request.user,
+                hotel=data['hotel'],
+                check_in=data['check_in'],
+                check_out=data['check_out'],
+                category_counts=data['category_counts'],
+                guests=data['guests'],
+                status=data['status'],
+            )
+        except RoomUnavailable as e:
+            return Response({"error": str(e)}, status=status.HTTP_409_CONFLICT)
+
+        rooms = Room.objects.in_bulk([booking.room_id for booking in bookings])
+        log_audit(
+            request=request,
+            action="create",
+            model_name="Booking",
+            details=f"Group booking of {len(bookings)} rooms at {data['hotel'].name}, "
+                    f"{data['check_in']} to {data['check_out']}: {bookings[0].booking_code}..{bookings[-1].booking_code}",
+        )
+        return Response({
+            "hotel": data['hotel'].slug,
+            "check_in": data['check_in'],
+            "check_out": data['check_out'],
+            "total_rooms": len(bookings),
+            "bookings": [
+                {
+                    "booking_code": booking.booking_code,
+                    "slug": booking.slug,
+                    "room": rooms[booking.room_id].room_number,
+                    "room_slug": rooms[booking.room_id].slug,
+                    "guests_count": booking.guests_count,
+                }
+                for booking in bookings
+            ],
+        }, status=status.HTTP_201_CREATED)
     
     @action(detail=True, methods=['post'], url_path='check-in')
     def check_in(self, request, slug=None):
@@ -4,3 +4,8 @@ from django.apps import AppConfig
 class LaundryConfig(AppConfig):
     default_auto_field = 'django.db.models.BigAutoField'
     name = 'Laundry'
+
+    audited_models = {
+        'LaundryService': (),
+        'LaundryOrder': (),
+    }
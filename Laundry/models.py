@@ -1,6 +1,7 @@
 import uuid
 from django.db import models
 from django.utils.text import slugify
+from MBP.slugs import unique_slug
 from Hotel.models import Hotel, Room
 from django.contrib.auth import get_user_model
 
@@ -26,13 +27,7 @@ class LaundryService(models.Model):
 
     def save(self, *args, **kwargs):
         if not self.slug:
-            base_slug = slugify(self.name)
-            new_slug = base_slug
-            counter = 1
-            while LaundryService.objects.filter(slug=new_slug).exists():
-                new_slug = f"{base_slug}-{counter}"
-                counter += 1
-            self.slug = new_slug
+            self.slug = unique_slug(self, slugify(self.name))
         super().save(*args, **kwargs)
 
 
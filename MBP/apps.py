@@ -5,5 +5,16 @@ class MbpConfig(AppConfig):
     default_auto_field = 'django.db.models.BigAutoField'
     name = 'MBP'
 
+    audited_models = {
+        'Role': (),
+        'AppModel': (),
+        'PermissionType': (),
+        'RoleModelPermission': (),
+    }
+
     def ready(self):
         import MBP.signals
+        from MBP.registry import audit_registry
+
+        audit_registry.autodiscover()
+        MBP.signals.connect_audit_receivers()
@@ -0,0 +1,143 @@
+import datetime
+import gzip
+import json
+import os
+from pathlib import Path
+
+from django.conf import settings
+from django.core.serializers.json import DjangoJSONEncoder
+from django.utils import timezone
+
+from .models import AuditLog
+
+ARCHIVE_FIELDS = (
+    'id', 'user', 'user__email', 'action', 'model_name', 'object_id', 'details',
+    'old_data', 'new_data', 'changes', 'ip_address', 'user_agent', 'timestamp',
+)
+
+
+def archive_root():
+    return Path(settings.AUDIT_LOG_ARCHIVE_ROOT)
+
+
+def archive_path(day):
+    """
+    One gzip NDJSON partition per day: <root>/YYYY/MM/YYYY-MM-DD.ndjson.gz
+    """
+    return archive_root() / f"{day:%Y}" / f"{day:%m}" / f"{day:%Y-%m-%d}.ndjson.gz"
+
+
+def hot_window_start():
+    """
+    Oldest timestamp still kept in the AuditLog table.
+    """
+    return timezone.now() - datetime.timedelta(days=settings.AUDIT_LOG_RETENTION_DAYS)
+
+
+def _to_record(row):
+    # Same shape as AuditLogSerializer output
+    row['user_email'] = row.pop('user__email')
+    row['user'] = str(row['user']) if row['user'] else None
+    return row
+
+
+def record_position(record):
+    """
+    (timestamp, id) of an archived record, the keyset order shared with AuditLog rows.
+    """
+    return datetime.datetime.fromisoformat(record['timestamp']), record['id']
+
+
+def _append_partition(day, records):
+    path = archive_path(day)
+    path.parent.mkdir(parents=True, exist_ok=True)
+    # Appending creates a new gzip member; gzip readers treat the file as one stream
+    with gzip.open(path, 'at', encoding='utf-8') as fh:
+        for record in records:
+            fh.write(json.dumps(record, cls=DjangoJSONEncoder) + '\n')
+        fh.flush()
+        os.fsync(fh.fileno())
+
+
+def archive_audit_logs(before=None, batch_size=None, dry_run=False):
+    """
+    Moves AuditLog rows older than `before` (default: the hot window start) into
+    daily archive partitions, deleting each archived batch before reading the next.
+    Returns (archived_rows, partitions_touched).
+    """
+    before = before or hot_window_start()
+    batch_size = batch_size or settings.AUDIT_LOG_ARCHIVE_BATCH_SIZE
+    queryset = AuditLog.objects.filter(timestamp__lt=before).order_by('timestamp', 'id')
+
+    if dry_run:
+        days = queryset.dates('timestamp', 'day')
+        return queryset.count(), len(days)
+
+    archived = 0
+    partitions = set()
+    while True:
+        rows = list(queryset.values(*ARCHIVE_FIELDS)[:batch_size])
+        if not rows:
+            break
+
+        by_day = {}
+        for row in rows:
+            day = timezone.localdate(row['timestamp'])
+            by_day.setdefault(day, []).append(_to_record(row))
+
+        for day, records in by_day.items():
+            _append_partition(day, records)
+            partitions.add(day)
+
+        # Rows are deleted only after their partition is safely written.
+        # A crash in between leaves duplicates, which readers skip by id.
+        AuditLog.objects.filter(id__in=[row['id'] for row in rows]).delete()
+        archived += len(rows)
+
+    return archived, len(partitions)
+
+
+def _read_partition(day):
+    path = archive_path(day)
+    if not path.exists():
+        return []
+
+    seen = set()
+    records = []
+    with gzip.open(path, 'rt', encoding='utf-8') as fh:
+        for line in fh:
+            record = json.loads(line)
+            if record['id'] in seen:
+                continue
+            seen.add(record['id'])
+            records.append(record)
+    return records
+
+
+def first_archived_day():
+    """
+    Day of the oldest archive partition, or None when nothing has been archived.
+    """
+    partitions = sorted(archive_root().glob('*/*/*.ndjson.gz'))
+    if not partitions:
+        return None
+    return datetime.date.fromisoformat(partitions[0].name[:10])
+
+
+def iter_archived_logs(start, end, predicate=None):
+    """
+    Streams archived records with start <= timestamp <= end, newest first.
+    Only one daily partition is held in memory at a time.
+    """
+    day = timezone.localdate(end)
+    first_day = timezone.localdate(start)
+    while day >= first_day:
+        records = []
+        for record in _read_partition(day):
+            timestamp = datetime.datetime.fromisoformat(record['timestamp'])
+            if start <= timestamp <= end and (predicate is None or predicate(record)):
+                records.append((timestamp, record['id'], record))
+        records.sort(key=lambda item: (item[0], item[1]), reverse=True)
+        for _timestamp, _id, record in records:
+            yield record
+        day -= datetime.timedelta(days=1)
@@ -0,0 +1,123 @@
+import json
+import logging
+import threading
+import weakref
+from contextlib import contextmanager
+
+from django.conf import settings
+from django.core.serializers.json import DjangoJSONEncoder
+from django.db import transaction
+
+from .models import AuditLog
+
+_state = threading.local()
+logger = logging.getLogger(__name__)
+
+
+def _request_buffer():
+    return getattr(_state, 'buffer', None)
+
+
+@contextmanager
+def audit_buffer():
+    """
+    Collects AuditLog rows recorded inside the block and writes them with a
+    single bulk insert when the block exits. Nested blocks share the outer buffer.
+    """
+    if _request_buffer() is not None:
+        yield _state.buffer
+        return
+
+    _state.buffer = []
+    try:
+        yield _state.buffer
+    finally:
+        entries, _state.buffer = _state.buffer, None
+        flush(entries)
+
+
+def _deliver(entries):
+    """
+    Hands committed entries to the active request buffer, or writes them now.
+    """
+    buffer = _request_buffer()
+    if buffer is not None:
+        buffer.extend(entries)
+    else:
+        flush(entries)
+
+
+def _transaction_pending():
+    """
+    Returns the list of entries waiting for the current transaction to commit.
+    One buffer is opened per transaction and per savepoint, keyed by the savepoint it
+    was opened under, and its flush is registered once with transaction.on_commit().
+    Django drops the callbacks of a savepoint or transaction that rolls back; the
+    buffer only holds a weak reference to its flush, so it dies with it.
+    """
+    connection = transaction.get_connection()
+    key = connection.savepoint_ids[-1] if connection.savepoint_ids else None
+    buffers = getattr(_state, 'pending', None)
+    if buffers is None:
+        buffers = _state.pending = {}
+
+    current = buffers.get(key)
+    if current is not None and current[1]() is not None:
+        return current[0]
+
+    # Drop the buffers of rolled back savepoints and transactions
+    for stale in [stale for stale, (_entries, flush_ref) in buffers.items() if flush_ref() is None]:
+        del buffers[stale]
+
+    entries = []
+
+    def flush_on_commit():
+        if buffers.get(key, (None,))[0] is entries:
+            del buffers[key]
+        _deliver(entries)
+
+    buffers[key] = (entries, weakref.ref(flush_on_commit))
+    transaction.on_commit(flush_on_commit)
+    return entries
+
+
+def record(entry):
+    """
+    Queues an unsaved AuditLog instance.
+
+    - Inside a transaction → written after commit (one insert per transaction)
+    - Inside audit_buffer() → written when the buffer exits (one insert per request)
+    - Otherwise → written immediately
+    """
+    if transaction.get_connection().in_atomic_block:
+        _transaction_pending().append(entry)
+    else:
+        _deliver([entry])
+
+
+def _to_payload(entry):
+    row = {
+        field.attname: field.value_from_object(entry)
+        for field in AuditLog._meta.concrete_fields
+        if not field.primary_key
+    }
+    return json.loads(json.dumps(row, cls=DjangoJSONEncoder))
+
+
+def flush(entries):
+    if not entries:
+        return
+
+    if getattr(settings, 'AUDIT_LOG_ASYNC', False) and settings.CELERY_BROKER_URL:
+        try:
+            from HMS.celery import app  # noqa: F401 -- binds shared tasks to the Django-configured app
+            from .tasks import write_audit_logs
+            write_audit_logs.delay([_to_payload(entry) for entry in entries])
+            return
+        except Exception as e:
+            logger.warning("Failed to queue audit logs, writing synchronously: %s", e)
+
+    try:
+        AuditLog.objects.bulk_create(entries)
+    except Exception as e:
+        logger.warning("Failed to create %d audit logs: %s", len(entries), e, exc_info=True)
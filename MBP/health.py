@@ -0,0 +1,136 @@
+import collections
+import datetime
+import os
+import threading
+import time
+
+from django.conf import settings
+from django.core.cache import cache
+from django.core.exceptions import ImproperlyConfigured
+from django.db import close_old_connections, connection
+
+TREND_WINDOWS = (('1m', 60), ('5m', 5 * 60), ('15m', 15 * 60))
+CACHE_PING_KEY = 'mbp:health:ping'
+
+
+class HealthSampler:
+    """
+    Samples CPU, memory, disk, DB round-trip and cache latency in a daemon
+    thread (one per worker process) into a fixed-size ring buffer, so the
+    health endpoint answers from memory without blocking.
+    """
+
+    def __init__(self):
+        self.samples = None
+        self._lock = threading.Lock()
+        self._thread = None
+        self._pid = None
+
+    @property
+    def interval(self):
+        interval = settings.SYSTEM_HEALTH_SAMPLE_INTERVAL
+        if interval <= 0:
+            raise ImproperlyConfigured("SYSTEM_HEALTH_SAMPLE_INTERVAL must be a positive number of seconds.")
+        return interval
+
+    def ensure_started(self):
+        # The pid check restarts the thread in workers forked after it was started
+        if self._thread and self._thread.is_alive() and self._pid == os.getpid():
+            return
+        with self._lock:
+            if self._thread and self._thread.is_alive() and self._pid == os.getpid():
+                return
+            self._pid = os.getpid()
+            longest_window = TREND_WINDOWS[-1][1]
+            self.samples = collections.deque(maxlen=longest_window // self.interval + 1)
+            # Prime the CPU counter; the first reading comes one interval later; one taken
+            # right now would cover a near-zero span and report about 0%
+            _psutil().cpu_percent(interval=None)
+            self._thread = threading.Thread(target=self._run, name='health-sampler', daemon=True)
+            self._thread.start()
+
+    def _run(self):
+        while True:
+            time.sleep(self.interval)
+            # Same connection hygiene as a request: drop a connection past CONN_MAX_AGE or broken
+            close_old_connections()
+            try:
+                self.samples.append(self.take_sample())
+            except Exception as e:
+                print("Health sampler failed:", e)
+
+    def take_sample(self):
+        psutil = _psutil()
+        sample = {
+            'time': time.time(),
+            'cpu': psutil.cpu_percent(interval=None),
+            'memory': psutil.virtual_memory().percent,
+            'disk': psutil.disk_usage('/').percent,
+            'db_ok': True,
+            'db_latency_ms': None,
+            'cache_ok': True,
+            'cache_latency_ms': None,
+        }
+
+        start = time.perf_counter()
+        try:
+            with connection.cursor() as cursor:
+                cursor.execute('SELECT 1')
+                cursor.fetchone()
+            sample['db_latency_ms'] = round((time.perf_counter() - start) * 1000, 2)
+        except Exception:
+            sample['db_ok'] = False
+            connection.close_if_unusable_or_obsolete()
+
+        start = time.perf_counter()
+        try:
+            cache.set(CACHE_PING_KEY, start, 30)
+            sample['cache_ok'] = cache.get(CACHE_PING_KEY) == start
+            sample['cache_latency_ms'] = round((time.perf_counter() - start) * 1000, 2)
+        except Exception:
+            sample['cache_ok'] = False
+
+        return sample
+
+    def latest(self):
+        """
+        Newest sample, or None until the first interval has passed.
+        """
+        return self.samples[-1] if self.samples else None
+
+    def trends(self):
+        """
+        Averages per window (1m / 5m / 15m) over the buffered samples.
+        """
+        now = time.time()
+        samples = list(self.samples)
+        result = {}
+        for label, seconds in TREND_WINDOWS:
+            window = [s for s in samples if now - s['time'] <= seconds]
+            result[label] = {
+                'samples': len(window),
+                'cpu_usage': _average(window, 'cpu'),
+                'memory_usage': _average(window, 'memory'),
+                'db_latency_ms': _average(window, 'db_latency_ms'),
+                'cache_latency_ms': _average(window, 'cache_latency_ms'),
+            }
+        return result
+
+
+def _psutil():
+    # Imported on first sample so workers that never serve the health endpoint skip it
+    import psutil
+
+    return psutil
+
+
+def _average(samples, key):
+    values = [s[key] for s in samples if s[key] is not None]
+    return round(sum(values) / len(values), 2) if values else None
+
+
+def boot_time():
+    return datetime.datetime.fromtimestamp(_psutil().boot_time(), tz=datetime.timezone.utc)
+
+
+sampler = HealthSampler()
@@ -0,0 +1,40 @@
+import datetime
+import time
+
+from django.conf import settings
+from django.core.management.base import BaseCommand
+from django.utils import timezone
+
+from MBP.archive import archive_audit_logs, archive_root
+
+
+class Command(BaseCommand):
+    help = 'Move AuditLog rows older than the retention window into daily gzip NDJSON archives'
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--days', type=int, default=settings.AUDIT_LOG_RETENTION_DAYS,
+            help='Keep this many days in the AuditLog table (default: AUDIT_LOG_RETENTION_DAYS)'
+        )
+        parser.add_argument(
+            '--batch-size', type=int, default=settings.AUDIT_LOG_ARCHIVE_BATCH_SIZE,
+            help='Rows archived and deleted per batch'
+        )
+        parser.add_argument('--dry-run', action='store_true', help='Only report what would be archived')
+
+    def handle(self, *args, **options):
+        before = timezone.now() - datetime.timedelta(days=options['days'])
+        started = time.perf_counter()
+
+        archived, partitions = archive_audit_logs(
+            before=before,
+            batch_size=options['batch_size'],
+            dry_run=options['dry_run'],
+        )
+
+        elapsed = time.perf_counter() - started
+        verb = "Would archive" if options['dry_run'] else "Archived"
+        self.stdout.write(self.style.SUCCESS(
+            f"{verb} {archived} audit logs older than {before:%Y-%m-%d %H:%M} "
+            f"into {partitions} daily partition(s) under {archive_root()} in {elapsed:.2f}s."
+        ))
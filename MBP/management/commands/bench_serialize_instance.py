@@ -0,0 +1,95 @@
+import datetime
+import json
+import time
+import uuid
+from decimal import Decimal
+
+from django.apps import apps
+from django.core.management.base import BaseCommand, CommandError
+from django.core.serializers.json import DjangoJSONEncoder
+from django.db import connection
+from django.db.models import Model
+from django.db.models.fields.files import FileField, ImageField
+from django.test.utils import CaptureQueriesContext
+
+from MBP.utils import serialize_instance
+
+
+def legacy_serialize_instance(instance):
+    """
+    The previous per-call implementation, kept here as the benchmark baseline.
+    """
+    data = {}
+    for field in instance._meta.fields:
+        field_name = field.name
+        value = getattr(instance, field_name, None)
+
+        if isinstance(field, (FileField, ImageField)):
+            data[field_name] = value.url if value else None
+        elif isinstance(value, (uuid.UUID, datetime.datetime, datetime.date)):
+            data[field_name] = str(value)
+        elif isinstance(value, Decimal):
+            data[field_name] = float(value)
+        elif isinstance(value, Model):
+            data[field_name] = str(value)
+        else:
+            try:
+                json.dumps(value, cls=DjangoJSONEncoder)
+                data[field_name] = value
+            except (TypeError, ValueError):
+                data[field_name] = str(value)
+    return data
+
+
+class Command(BaseCommand):
+    help = 'Benchmark MBP.utils.serialize_instance against the legacy implementation'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--model', default='Hotel.Room', help='app_label.ModelName to snapshot')
+        parser.add_argument('--count', type=int, default=200, help='Instances per round')
+        parser.add_argument('--rounds', type=int, default=20)
+
+    def load_instances(self, model, count):
+        instances = list(model.objects.all()[:count])
+        if not instances:
+            # Unsaved instances still exercise every field converter
+            instances = [model() for _ in range(count)]
+        return instances
+
+    def run(self, func, model, count, rounds):
+        elapsed = 0.0
+        queries = 0
+        snapshots = 0
+        for _ in range(rounds):
+            # Fresh instances each round so related-object caches do not carry over
+            instances = self.load_instances(model, count)
+            with CaptureQueriesContext(connection) as ctx:
+                start = time.perf_counter()
+                for instance in instances:
+                    func(instance)
+                elapsed += time.perf_counter() - start
+            queries += len(ctx.captured_queries)
+            snapshots += len(instances)
+        return elapsed, queries, snapshots
+
+    def handle(self, *args, **options):
+        try:
+            model = apps.get_model(options['model'])
+        except (LookupError, ValueError):
+            raise CommandError(f"Unknown model '{options['model']}'.")
+
+        count, rounds = options['count'], options['rounds']
+        serialize_instance(model())  # compile the plan outside the timed loop
+
+        results = {}
+        for label, func in (('legacy', legacy_serialize_instance), ('compiled', serialize_instance)):
+            elapsed, queries, snapshots = self.run(func, model, count, rounds)
+            results[label] = elapsed
+            self.stdout.write(
+                f"{label:>9}: {elapsed * 1000:9.2f} ms total | "
+                f"{elapsed / snapshots * 1e6:8.2f} µs/snapshot | {queries} queries"
+            )
+
+        if results['compiled']:
+            speedup = results['legacy'] / results['compiled']
+            self.stdout.write(self.style.SUCCESS(f"Speedup: {speedup:.1f}x on {model._meta.label}"))
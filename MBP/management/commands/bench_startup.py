@@ -0,0 +1,108 @@
+import json
+import os
+import subprocess
+import sys
+
+from django.conf import settings
+from django.core.management.base import BaseCommand, CommandError
+
+# Optional dependencies that must only load on first use, never at worker boot
+HEAVY_MODULES = ('google.generativeai', 'grpc', 'google.protobuf', 'psutil', 'textblob', 'nltk', 'numpy')
+
+# Runs in a fresh interpreter: what a gunicorn worker does before serving its first request
+BOOT_SCRIPT = """
+import importlib, json, resource, sys, time
+start = time.perf_counter()
+import django
+django.setup()
+from django.conf import settings
+importlib.import_module(settings.ROOT_URLCONF)
+for name in sys.argv[2:]:
+    importlib.import_module(name)
+elapsed = time.perf_counter() - start
+print(json.dumps({
+    "boot_ms": elapsed * 1000,
+    "rss_kb": resource.getrusage(resource.RUSAGE_SELF).ru_maxrss,
+    "modules": sorted(sys.modules),
+}))
+"""
+
+
+class Command(BaseCommand):
+    help = ('Measure worker boot (django.setup() + URLconf import) time, import time and peak RSS '
+            'in fresh interpreters, and fail when heavy optional dependencies load at boot')
+
+    def add_arguments(self, parser):
+        parser.add_argument('--runs', type=int, default=3, help='Fresh interpreters per scenario')
+        parser.add_argument('--top', type=int, default=10, help='Slowest top-level imports to list')
+        parser.add_argument('--compare-eager', action='store_true',
+                            help='Also boot with the heavy modules imported eagerly, to show the saving')
+        parser.add_argument('--max-boot-ms', type=float, default=None, help='Fail above this median boot time')
+        parser.add_argument('--max-rss-mb', type=float, default=None, help='Fail above this median peak RSS')
+
+    def boot(self, extra_imports=()):
+        env = {**os.environ, 'DJANGO_SETTINGS_MODULE': os.environ.get('DJANGO_SETTINGS_MODULE', 'HMS.settings')}
+        result = subprocess.run(
+            [sys.executable, '-X', 'importtime', '-c', BOOT_SCRIPT, '--', *extra_imports],
+            cwd=settings.BASE_DIR, env=env, capture_output=True, text=True,
+        )
+        if result.returncode:
+            raise CommandError(f"Boot failed:\n{result.stderr[-2000:]}")
+
+        stats = json.loads(result.stdout.strip().splitlines()[-1])
+        stats['imports'] = self.parse_importtime(result.stderr)
+        return stats
+
+    @staticmethod
+    def parse_importtime(stderr):
+        """
+        Returns {top_level_module: cumulative_us} from `python -X importtime` output.
+        """
+        imports = {}
+        for line in stderr.splitlines():
+            if not line.startswith('import time:') or '|' not in line:
+                continue
+            _self_us, cumulative, name = line[len('import time:'):].split('|')
+            # Nested imports are indented further; only top-level entries carry their full cost
+            if cumulative.strip().isdigit() and not name.startswith('  '):
+                imports[name.strip()] = imports.get(name.strip(), 0) + int(cumulative)
+        return imports
+
+    def run_scenario(self, label, runs, extra_imports=()):
+        samples = [self.boot(extra_imports) for _ in range(runs)]
+        boot_ms = sorted(sample['boot_ms'] for sample in samples)[runs // 2]
+        rss_mb = sorted(sample['rss_kb'] for sample in samples)[runs // 2] / 1024
+        import_ms = sum(samples[-1]['imports'].values()) / 1000
+        self.stdout.write(
+            f"{label:>6}: boot {boot_ms:8.1f} ms | imports {import_ms:8.1f} ms | peak RSS {rss_mb:7.1f} MB"
+        )
+        return boot_ms, rss_mb, samples[-1]
+
+    def handle(self, *args, **options):
+        runs = max(1, options['runs'])
+        boot_ms, rss_mb, sample = self.run_scenario('lazy', runs)
+
+        slowest = sorted(sample['imports'].items(), key=lambda item: item[1], reverse=True)[:options['top']]
+        self.stdout.write("Slowest top-level imports:")
+        for name, cumulative in slowest:
+            self.stdout.write(f"  {cumulative / 1000:8.1f} ms  {name}")
+
+        if options['compare_eager']:
+            eager_boot_ms, eager_rss_mb, _ = self.run_scenario('eager', runs, HEAVY_MODULES)
+            self.stdout.write(self.style.SUCCESS(
+                f"Deferring heavy imports saves {eager_boot_ms - boot_ms:.1f} ms and "
+                f"{eager_rss_mb - rss_mb:.1f} MB per worker."
+            ))
+
+        problems = []
+        loaded = [name for name in HEAVY_MODULES if name in sample['modules']]
+        if loaded:
+            problems.append(f"heavy modules loaded at boot: {', '.join(loaded)}")
+        if options['max_boot_ms'] is not None and boot_ms > options['max_boot_ms']:
+            problems.append(f"boot {boot_ms:.1f} ms > {options['max_boot_ms']} ms")
+        if options['max_rss_mb'] is not None and rss_mb > options['max_rss_mb']:
+            problems.append(f"peak RSS {rss_mb:.1f} MB > {options['max_rss_mb']} MB")
+
+        if problems:
+            raise CommandError("Startup regression: " + "; ".join(problems))
+        self.stdout.write(self.style.SUCCESS("No heavy optional dependency is imported at boot."))
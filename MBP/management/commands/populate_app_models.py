@@ -1,26 +1,145 @@
-from django.core.management.base import BaseCommand
+import time
+
 from django.apps import apps
+from django.conf import settings
+from django.core.management.base import BaseCommand, CommandError
+from django.db import connection, transaction
+from django.test.utils import CaptureQueriesContext
 from django.utils.text import slugify
-from MBP.models import AppModel
+
+from MBP.models import AppModel, PermissionType, Role, RoleModelPermission
+from MBP.permissions import bump_permission_version
+from MBP.slugs import allocate_slugs
+
+PERMISSION_TYPE_NAMES = {'c': 'Create', 'r': 'Read', 'u': 'Update', 'd': 'Delete'}
+
 
 class Command(BaseCommand):
-    help = 'Populate all models into AppModel table'
+    help = 'Sync all models into the AppModel table and optionally seed role permission grids'
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--seed-permissions', action='store_true',
+            help='Grant the configured roles their permission codes on every AppModel',
+        )
+        parser.add_argument(
+            '--grant', action='append', default=[], metavar='ROLE=CODES',
+            help='Role slug and permission codes, e.g. --grant admin=crud --grant staff=r. '
+                 'Defaults to settings.DEFAULT_ROLE_PERMISSIONS.',
+        )
+
+    def handle(self, *args, **options):
+        start = time.perf_counter()
+        with CaptureQueriesContext(connection) as ctx, transaction.atomic():
+            added = self.sync_app_models()
+            granted = 0
+            if options['seed_permissions']:
+                granted = self.seed_permissions(self.get_grants(options['grant']))
+
+        if added or granted:
+            # bulk_create skips post_save, so the cached permission matrices are dropped here
+            bump_permission_version()
+
+        elapsed = (time.perf_counter() - start) * 1000
+        self.stdout.write(self.style.SUCCESS(
+            f"Synced {added} AppModels, {granted} role permissions "
+            f"in {elapsed:.1f} ms ({len(ctx.captured_queries)} queries)."
+        ))
+
+    def sync_app_models(self):
+        # AppModel.name is unique, so the model class name is the sync key
+        rows = list(AppModel.objects.order_by('name').values_list('pk', 'name', 'ordinal'))
+        existing = {name for _pk, name, _ordinal in rows}
+
+        # Rows created before ordinals existed get the next free bit positions
+        unnumbered = [AppModel(pk=pk) for pk, _name, ordinal in rows if ordinal is None]
 
-    def handle(self, *args, **kwargs):
-        count = 0
+        missing = {}
         for model in apps.get_models():
             model_name = model.__name__
-            app_label = model._meta.app_label
+            if model_name in existing or model_name in missing:
+                continue
             verbose_name = model._meta.verbose_name.title()
+            missing[model_name] = AppModel(
+                name=model_name,
+                slug=slugify(model_name),
+                verbose_name=verbose_name,
+                app_label=model._meta.app_label,
+                description=f"Auto-added model: {verbose_name}",
+            )
+
+        # One reservation from the same sequence AppModel.save() uses
+        numbered = unnumbered + list(missing.values())
+        for app_model, ordinal in zip(numbered, AppModel.allocate_ordinals(len(numbered)) if numbered else ()):
+            app_model.ordinal = ordinal
+        AppModel.objects.bulk_update(unnumbered, ['ordinal'])
+        AppModel.objects.bulk_create(missing.values())
+        return len(missing) + len(unnumbered)
+
+    def get_grants(self, grant_options):
+        if not grant_options:
+            return dict(settings.DEFAULT_ROLE_PERMISSIONS)
+
+        grants = {}
+        for option in grant_options:
+            role_slug, sep, codes = option.partition('=')
+            if not sep or not role_slug:
+                raise CommandError(f"Invalid --grant '{option}', expected ROLE=CODES.")
+            grants[role_slug] = codes
+        return grants
+
+    def get_permission_types(self, codes):
+        """
+        Returns {code: PermissionType}, creating the standard CRUD types that are missing.
+        """
+        types = {}
+        for permission_type in PermissionType.objects.filter(code__in=codes).order_by('name'):
+            types.setdefault(permission_type.code, permission_type)
+
+        unknown = codes - types.keys() - PERMISSION_TYPE_NAMES.keys()
+        if unknown:
+            raise CommandError(f"Unknown permission codes: {', '.join(sorted(unknown))}.")
+
+        missing = [
+            PermissionType(name=PERMISSION_TYPE_NAMES[code], slug=slugify(PERMISSION_TYPE_NAMES[code]), code=code)
+            for code in sorted(codes - types.keys())
+        ]
+        for permission_type in PermissionType.objects.bulk_create(missing):
+            types[permission_type.code] = permission_type
+        return types
+
+    def seed_permissions(self, grants):
+        grants = {slug: set(codes.lower()) for slug, codes in grants.items() if codes}
+        if not grants:
+            self.stdout.write(self.style.WARNING("No role permissions configured, nothing to seed."))
+            return 0
+
+        roles = {role.slug: role for role in Role.objects.filter(slug__in=grants)}
+        for slug in grants.keys() - roles.keys():
+            self.stdout.write(self.style.WARNING(f"Role '{slug}' does not exist, skipping."))
+
+        permission_types = self.get_permission_types(set().union(*grants.values()))
+        app_models = list(AppModel.objects.only('id', 'name'))
+
+        existing = set(
+            RoleModelPermission.objects.filter(role__in=roles.values())
+            .values_list('role_id', 'model_id', 'permission_type_id')
+        )
+        rows = []
+        for slug, role in roles.items():
+            for code in sorted(grants[slug]):
+                permission_type = permission_types[code]
+                for app_model in app_models:
+                    if (role.id, app_model.id, permission_type.id) in existing:
+                        continue
+                    rows.append(RoleModelPermission(
+                        slug=slugify(f"{role.name}-{app_model.name}-{permission_type.slug}"),
+                        role=role,
+                        model=app_model,
+                        permission_type=permission_type,
+                    ))
 
-            if not AppModel.objects.filter(name=model_name, app_label=app_label).exists():
-                AppModel.objects.create(
-                    name=model_name,
-                    slug=slugify(model_name),
-                    verbose_name=verbose_name,
-                    app_label=app_label,
-                    description=f"Auto-added model: {verbose_name}"
-                )
-                count += 1
-
-        self.stdout.write(self.style.SUCCESS(f"Added {count} new AppModels."))
+        for row, slug in zip(rows, allocate_slugs(RoleModelPermission, [row.slug for row in rows])):
+            row.slug = slug
+        RoleModelPermission.objects.bulk_create(rows, batch_size=1000)
+        return len(rows)
@@ -0,0 +1,61 @@
+import logging
+import time
+
+from django.conf import settings
+from django.core.exceptions import MiddlewareNotUsed
+
+from .audit import audit_buffer
+from .profiling import QueryCollector, endpoint_name, profiler
+
+logger = logging.getLogger(__name__)
+
+
+class AuditBufferMiddleware:
+    """
+    Buffers every audit log written while handling a request and stores
+    them with a single bulk insert once the response is ready.
+    """
+
+    def __init__(self, get_response):
+        self.get_response = get_response
+
+    def __call__(self, request):
+        with audit_buffer():
+            return self.get_response(request)
+
+
+class EndpointProfilingMiddleware:
+    """
+    Opt-in (ENDPOINT_PROFILING) per-endpoint profile of latency, SQL query
+    count, SQL time and response size, with duplicate SQL flagged per request.
+    """
+
+    def __init__(self, get_response):
+        if not settings.ENDPOINT_PROFILING:
+            raise MiddlewareNotUsed
+        self.get_response = get_response
+
+    def __call__(self, request):
+        collector = QueryCollector()
+        start = time.perf_counter()
+        with collector.capture():
+            response = self.get_response(request)
+        latency = time.perf_counter() - start
+
+        endpoint = getattr(request, '_profiling_endpoint', None)
+        if endpoint is None:
+            # Unresolved URLs and middleware short-circuits are not endpoints
+            return response
+
+        size = None if response.streaming else len(response.content)
+        duplicates = profiler.record(endpoint, latency, collector, size, response.status_code)
+        if duplicates:
+            worst = max(duplicates.values())
+            logger.info("Duplicate SQL in %s: %d pattern(s), up to %d repeats", endpoint, len(duplicates), worst)
+
+        response['X-Profile-Queries'] = str(collector.count)
+        response['X-Profile-Time-Ms'] = f"{latency * 1000:.1f}"
+        return response
+
+    def process_view(self, request, view_func, view_args, view_kwargs):
+        request._profiling_endpoint = endpoint_name(view_func, request.method)
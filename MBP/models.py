@@ -1,7 +1,9 @@
 from django.db import models
 from django.utils.text import slugify
+from .slugs import unique_slug
 import uuid
 from django.conf import settings
+from django.utils import timezone
 
 class Role(models.Model):
     id = models.UUIDField(primary_key=True, default=uuid.uuid4, editable=False)
@@ -17,6 +19,9 @@ class Role(models.Model):
     def __str__(self):
         return self.name
 
+APP_MODEL_ORDINAL_SEQUENCE = 'app_model_ordinal'
+
+
 class AppModel(models.Model):
     id = models.UUIDField(primary_key=True, default=uuid.uuid4, editable=False)
     name = models.CharField(max_length=100, unique=True)
@@ -24,12 +29,32 @@ class AppModel(models.Model):
     verbose_name = models.CharField(max_length=150)
     description = models.TextField(blank=True)
     app_label = models.CharField(max_length=100)
+    # Stable bit position of this model in the JWT permission bitmaps
+    ordinal = models.PositiveIntegerField(unique=True, null=True, editable=False)
 
 
     def save(self, *args, **kwargs):
         if not self.slug:
             self.slug = slugify(self.name)
+        if self.ordinal is None:
+            self.ordinal = AppModel.allocate_ordinals(1)[0]
         super().save(*args, **kwargs)
+
+    @staticmethod
+    def allocate_ordinals(count):
+        """
+        `count` unused bit positions from the locked app_model_ordinal sequence, so concurrent
+        saves never pick the same one. Blocks of one keep the bitmaps dense.
+        """
+        from .sequences import sequences
+
+        return sequences.take(APP_MODEL_ORDINAL_SEQUENCE, count, initial=AppModel.next_ordinal, block_size=1)
+
+    @staticmethod
+    def next_ordinal():
+        # Seeds the sequence after the ordinals handed out before it existed
+        current = AppModel.objects.aggregate(models.Max('ordinal'))['ordinal__max']
+        return 0 if current is None else current + 1
     
     def __str__(self):
         return self.name
@@ -64,15 +89,7 @@ class RoleModelPermission(models.Model):
     def save(self, *args, **kwargs):
         if not self.slug:
             base = f"{self.role.name}-{self.model.name}-{self.permission_type.slug}"
-            base_slug = slugify(base)
-            unique_slug = base_slug
-            counter = 1
-
-            while RoleModelPermission.objects.filter(slug=unique_slug).exclude(pk=self.pk).exists():
-                unique_slug = f"{base_slug}-{counter}"
-                counter += 1
-
-            self.slug = unique_slug
+            self.slug = unique_slug(self, slugify(base))
 
         super().save(*args, **kwargs)
 
@@ -95,9 +112,36 @@ class AuditLog(models.Model):
     details = models.TextField(blank=True, null=True)
     old_data = models.JSONField(null=True, blank=True)
     new_data = models.JSONField(null=True, blank=True)
+    changes = models.JSONField(null=True, blank=True, help_text="Changed fields only: {field: [old, new]}")
     ip_address = models.GenericIPAddressField(null=True, blank=True)
     user_agent = models.TextField(null=True, blank=True)
-    timestamp = models.DateTimeField(auto_now_add=True)
+    timestamp = models.DateTimeField(default=timezone.now, editable=False)
+
+    class Meta:
+        indexes = [
+            models.Index(fields=['timestamp', 'id'], name='auditlog_ts_id_idx'),
+            models.Index(fields=['user', 'timestamp'], name='auditlog_user_ts_idx'),
+            models.Index(fields=['action', 'timestamp'], name='auditlog_action_ts_idx'),
+            models.Index(fields=['model_name', 'object_id', 'timestamp'], name='auditlog_object_ts_idx'),
+        ]
+
+    def __str__(self):
+        return f"{self.timestamp.strftime('%Y-%m-%d %H:%M:%S')} | {self.user} | {self.action} | {self.model_name} ({self.object_id})"
+
+class Sequence(models.Model):
+    """
+    Counter row behind MBP.sequences: `next_value` is the first value not yet handed out
+    for (name, scope), e.g. ("booking_code", <hotel id>) or ("table_code", <hotel id>).
+    """
+    name = models.CharField(max_length=50)
+    scope = models.CharField(max_length=64, blank=True, default='')
+    next_value = models.PositiveBigIntegerField(default=1)
+    updated_at = models.DateTimeField(auto_now=True)
+
+    class Meta:
+        constraints = [
+            models.UniqueConstraint(fields=['name', 'scope'], name='unique_sequence_scope'),
+        ]
 
     def __str__(self):
-        return f"{self.timestamp.strftime('%Y-%m-%d %H:%M:%S')} | {self.user} | {self.action} | {self.model_name} ({self.object_id})"
\ No newline at end of file
+        return f"{self.name}[{self.scope}] -> {self.next_value}"
@@ -0,0 +1,128 @@
+import base64
+import binascii
+
+from django.db.models import Q
+from django.utils.dateparse import parse_datetime
+from rest_framework.exceptions import NotFound
+from rest_framework.pagination import BasePagination
+from rest_framework.response import Response
+from rest_framework.utils.urls import remove_query_param, replace_query_param
+
+
+class KeysetPagination(BasePagination):
+    """
+    Cursor pagination on (timestamp, id), newest first.
+
+    Each page is a single indexed range scan: the cursor holds the last row's
+    (timestamp, id) and the next page starts strictly below it, so the cost
+    does not grow with the page number or the table size.
+
+    GET /api/logs/?page_size=50           → first page
+    GET /api/logs/?cursor=<next cursor>   → following page
+    """
+    timestamp_field = 'timestamp'
+    page_size = 50
+    max_page_size = 500
+    cursor_query_param = 'cursor'
+    page_size_query_param = 'page_size'
+    invalid_cursor_message = 'Invalid cursor'
+
+    def get_page_size(self, request):
+        try:
+            size = int(request.query_params.get(self.page_size_query_param, self.page_size))
+        except (TypeError, ValueError):
+            return self.page_size
+        return max(1, min(size, self.max_page_size))
+
+    def encode_position(self, timestamp, pk):
+        raw = f"{timestamp.isoformat()}|{pk}"
+        return base64.urlsafe_b64encode(raw.encode()).decode().rstrip('=')
+
+    def encode_cursor(self, obj):
+        return self.encode_position(getattr(obj, self.timestamp_field), obj.pk)
+
+    def decode_cursor(self, request):
+        encoded = request.query_params.get(self.cursor_query_param)
+        if not encoded:
+            return None
+        try:
+            raw = base64.urlsafe_b64decode(encoded + '=' * (-len(encoded) % 4)).decode()
+            timestamp, pk = raw.rsplit('|', 1)
+            timestamp = parse_datetime(timestamp)
+            pk = int(pk)
+        except (TypeError, ValueError, UnicodeDecodeError, binascii.Error):
+            raise NotFound(self.invalid_cursor_message)
+        if timestamp is None:
+            raise NotFound(self.invalid_cursor_message)
+        return timestamp, pk
+
+    def paginate_queryset(self, queryset, request, view=None):
+        self.request = request
+        page_size = self.get_page_size(request)
+        field = self.timestamp_field
+
+        queryset = queryset.order_by(f'-{field}', '-pk')
+        cursor = self.cursor = self.decode_cursor(request)
+        self.current_page_size = page_size
+        if cursor:
+            timestamp, pk = cursor
+            queryset = queryset.filter(
+                Q(**{f'{field}__lt': timestamp}) | Q(**{field: timestamp, 'pk__lt': pk})
+            )
+
+        rows = list(queryset[:page_size + 1])
+        self.has_next = len(rows) > page_size
+        rows = rows[:page_size]
+        self.next_cursor = self.encode_cursor(rows[-1]) if self.has_next else None
+        return rows
+
+    def fill_from(self, rows, records, position):
+        """
+        Tops up a page whose queryset ran out with `records`: an iterable that continues
+        the same newest-first order below the page's last row (e.g. archived rows).
+        `position(record)` returns a record's (timestamp, pk). Returns the records added.
+        """
+        if self.has_next:
+            return []
+        wanted = self.current_page_size - len(rows)
+        extra = []
+        for record in records:
+            extra.append(record)
+            if len(extra) > wanted:
+                break
+        self.has_next = len(extra) > wanted
+        extra = extra[:wanted]
+        if self.has_next:
+            if extra:
+                self.next_cursor = self.encode_position(*position(extra[-1]))
+            else:
+                self.next_cursor = self.encode_cursor(rows[-1])
+        return extra
+
+    def get_next_link(self):
+        if not self.next_cursor:
+            return None
+        url = self.request.build_absolute_uri()
+        return replace_query_param(url, self.cursor_query_param, self.next_cursor)
+
+    def get_first_link(self):
+        url = self.request.build_absolute_uri()
+        return remove_query_param(url, self.cursor_query_param)
+
+    def get_paginated_response(self, data):
+        return Response({
+            'next': self.get_next_link(),
+            'first': self.get_first_link(),
+            'results': data,
+        })
+
+    def get_paginated_response_schema(self, schema):
+        return {
+            'type': 'object',
+            'required': ['results'],
+            'properties': {
+                'next': {'type': 'string', 'nullable': True, 'format': 'uri'},
+                'first': {'type': 'string', 'format': 'uri'},
+                'results': schema,
+            },
+        }
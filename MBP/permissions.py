@@ -1,17 +1,182 @@
+import base64
+
+from django.core.cache import cache
+from django.db import transaction
 from rest_framework.permissions import BasePermission
-from .models import RoleModelPermission, AppModel, PermissionType
+from .models import AppModel, RoleModelPermission
+from .versions import SharedVersion
+
+PERMISSION_VERSION_KEY = 'mbp:permission_matrix:version'
+PERMISSION_MATRIX_TIMEOUT = 60 * 60
+
+# JWT claims written by MBP.tokens
+PERMISSION_VERSION_CLAIM = 'perm_v'
+PERMISSION_ROLE_CLAIM = 'perm_role'
+PERMISSIONS_CLAIM = 'perms'
+
+permission_version = SharedVersion(PERMISSION_VERSION_KEY)
+
+# role_id -> (version, matrix), kept per worker process
+_local_matrices = {}
+# (version, {model_name_lower: ordinal}), kept per worker process
+_local_ordinals = [None, None]
+# role_id -> (version, claims)
+_local_claims = {}
+
+
+def get_permission_version():
+    """
+    Returns the current permission matrix version: process memory, re-read from the
+    shared cache at most every SHARED_VERSION_REFRESH seconds.
+    """
+    return permission_version.get()
+
+
+def bump_permission_version():
+    """
+    Invalidates every compiled permission matrix (in all workers sharing the cache)
+    once the current transaction commits. Bumping earlier would let a concurrent
+    rebuild read the old grants and cache them under the new version.
+    """
+    transaction.on_commit(_bump_permission_version)
+
+
+def _bump_permission_version():
+    permission_version.bump()
+    _local_matrices.clear()
+    _local_claims.clear()
+
+
+def build_permission_matrix(role_id):
+    """
+    Builds {model_name_lower: frozenset(codes)} for a role in a single query.
+    """
+    matrix = {}
+    rows = RoleModelPermission.objects.filter(role_id=role_id).values_list(
+        'model__name', 'permission_type__code'
+    )
+    for model_name, code in rows:
+        matrix.setdefault(model_name.lower(), set()).add(code.lower())
+    return {name: frozenset(codes) for name, codes in matrix.items()}
+
+
+def get_permission_matrix(role_id):
+    """
+    Returns the compiled permission matrix of a role.
+    Lookup order: process memory -> shared cache -> database.
+    """
+    version = get_permission_version()
+
+    local = _local_matrices.get(role_id)
+    if local and local[0] == version:
+        return local[1]
+
+    cache_key = f'mbp:permission_matrix:{version}:{role_id}'
+    matrix = cache.get(cache_key)
+    if matrix is None:
+        matrix = build_permission_matrix(role_id)
+        cache.set(cache_key, matrix, PERMISSION_MATRIX_TIMEOUT)
+
+    _local_matrices[role_id] = (version, matrix)
+    return matrix
+
+
+def role_has_permission(role_id, model_name, permission_code):
+    matrix = get_permission_matrix(role_id)
+    return permission_code.lower() in matrix.get(model_name.lower(), ())
+
+
+def get_model_ordinals():
+    """
+    Returns {model_name_lower: ordinal}, the bit position of each AppModel.
+    AppModel changes bump the permission version, so the map is versioned with it.
+    """
+    version = get_permission_version()
+    if _local_ordinals[0] == version:
+        return _local_ordinals[1]
+
+    cache_key = f'mbp:model_ordinals:{version}'
+    ordinals = cache.get(cache_key)
+    if ordinals is None:
+        ordinals = {
+            name.lower(): ordinal
+            for name, ordinal in AppModel.objects.exclude(ordinal=None).values_list('name', 'ordinal')
+        }
+        cache.set(cache_key, ordinals, PERMISSION_MATRIX_TIMEOUT)
+
+    _local_ordinals[:] = [version, ordinals]
+    return ordinals
+
+
+def encode_bitmap(bitmap):
+    raw = bitmap.to_bytes((bitmap.bit_length() + 7) // 8, 'little')
+    return base64.urlsafe_b64encode(raw).decode().rstrip('=')
+
+
+def decode_bitmap(encoded):
+    return int.from_bytes(base64.urlsafe_b64decode(encoded + '=' * (-len(encoded) % 4)), 'little')
+
+
+def get_permission_claims(role_id):
+    """
+    Compact form of a role's permission matrix for the access token:
+    one bitmap per permission code, bit n set when the AppModel with ordinal n is granted.
+    """
+    version = get_permission_version()
+    local = _local_claims.get(role_id)
+    if local and local[0] == version:
+        return local[1]
+
+    ordinals = get_model_ordinals()
+    bitmaps = {}
+    for model_name, codes in get_permission_matrix(role_id).items():
+        ordinal = ordinals.get(model_name)
+        if ordinal is None:
+            continue
+        for code in codes:
+            bitmaps[code] = bitmaps.get(code, 0) | (1 << ordinal)
+
+    claims = {
+        PERMISSION_VERSION_CLAIM: version,
+        PERMISSION_ROLE_CLAIM: str(role_id),
+        PERMISSIONS_CLAIM: {code: encode_bitmap(bitmap) for code, bitmap in sorted(bitmaps.items())},
+    }
+    _local_claims[role_id] = (version, claims)
+    return claims
+
+
+def token_has_permission(token, role_id, model_name, permission_code):
+    """
+    Authorizes from the token's permission bitmap alone.
+    Returns None when the token carries no claims or stale ones, so the caller
+    falls back to the permission matrix.
+    """
+    if token is None or not hasattr(token, 'get'):
+        return None
+    if token.get(PERMISSION_VERSION_CLAIM) != get_permission_version():
+        return None
+    if token.get(PERMISSION_ROLE_CLAIM) != str(role_id):
+        return None
+
+    ordinal = get_model_ordinals().get(model_name.lower())
+    if ordinal is None:
+        return False
+    encoded = token.get(PERMISSIONS_CLAIM, {}).get(permission_code.lower())
+    return bool(encoded) and bool(decode_bitmap(encoded) >> ordinal & 1)
+
 
 class HasModelPermission(BasePermission):
     def has_permission(self, request, view):
-        
+
         if not request.user or not request.user.is_authenticated:
             return False
-        
+
         if request.user.is_superuser:
             return True
 
-        role = getattr(request.user, 'role', None)
-        if not role:
+        # Use the raw FK id so the role row itself is never loaded
+        role_id = getattr(request.user, 'role_id', None)
+        if not role_id:
             return False
 
         # Auto infer model_name from view's queryset
@@ -24,13 +189,7 @@ class HasModelPermission(BasePermission):
         if not model_name or not permission_code:
             return False
 
-        try:
-            model_obj = AppModel.objects.get(name__iexact=model_name)
-            perm_type = PermissionType.objects.get(code=permission_code.lower())
-            return RoleModelPermission.objects.filter(
-                role=role,
-                model=model_obj,
-                permission_type=perm_type
-            ).exists()
-        except (AppModel.DoesNotExist, PermissionType.DoesNotExist):
-            return False
+        allowed = token_has_permission(request.auth, role_id, model_name, permission_code)
+        if allowed is not None:
+            return allowed
+        return role_has_permission(role_id, model_name, permission_code)
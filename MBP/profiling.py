@@ -0,0 +1,185 @@
+import bisect
+import re
+import threading
+import time
+from contextlib import ExitStack
+
+from django.conf import settings
+from django.db import connections
+
+LATENCY_BUCKETS_MS = (1, 2, 5, 10, 25, 50, 100, 250, 500, 1000, 2500, 5000, 10000)
+QUERY_COUNT_BUCKETS = (0, 1, 2, 3, 5, 10, 20, 50, 100, 250, 500)
+SQL_TIME_BUCKETS_MS = (0.5, 1, 2, 5, 10, 25, 50, 100, 250, 500, 1000, 5000)
+SIZE_BUCKETS_BYTES = (256, 1024, 4096, 16384, 65536, 262144, 1048576, 4194304)
+
+# Collapses "IN (%s, %s, %s)" so batched lookups of different sizes share a pattern
+_PLACEHOLDER_LIST = re.compile(r'%s(?:\s*,\s*%s)+')
+_WHITESPACE = re.compile(r'\s+')
+
+
+def sql_pattern(sql):
+    """
+    Normalizes a parameterized SQL template into a pattern for duplicate detection.
+    """
+    return _WHITESPACE.sub(' ', _PLACEHOLDER_LIST.sub('%s, ...', sql)).strip()
+
+
+class Histogram:
+    """
+    Fixed-bucket histogram: counts[i] holds values <= bounds[i], the last slot overflows.
+    """
+
+    def __init__(self, bounds):
+        self.bounds = bounds
+        self.counts = [0] * (len(bounds) + 1)
+        self.count = 0
+        self.total = 0.0
+        self.max = 0.0
+
+    def add(self, value):
+        self.counts[bisect.bisect_left(self.bounds, value)] += 1
+        self.count += 1
+        self.total += value
+        self.max = max(self.max, value)
+
+    def percentile(self, pct):
+        # Upper bound of the bucket holding the pct-th value (max for the overflow bucket)
+        if not self.count:
+            return None
+        rank = pct / 100 * self.count
+        seen = 0
+        for index, bucket_count in enumerate(self.counts):
+            seen += bucket_count
+            if seen >= rank:
+                return self.bounds[index] if index < len(self.bounds) else self.max
+        return self.max
+
+    def as_dict(self):
+        buckets = {f"le_{bound}": count for bound, count in zip(self.bounds, self.counts)}
+        buckets['overflow'] = self.counts[-1]
+        return {
+            'count': self.count,
+            'mean': round(self.total / self.count, 2) if self.count else None,
+            'max': round(self.max, 2),
+            'p50': self.percentile(50),
+            'p95': self.percentile(95),
+            'p99': self.percentile(99),
+            'buckets': buckets,
+        }
+
+
+class EndpointStats:
+    def __init__(self):
+        self.latency_ms = Histogram(LATENCY_BUCKETS_MS)
+        self.queries = Histogram(QUERY_COUNT_BUCKETS)
+        self.sql_ms = Histogram(SQL_TIME_BUCKETS_MS)
+        self.response_bytes = Histogram(SIZE_BUCKETS_BYTES)
+        self.status_codes = {}
+        # pattern -> {'requests': flagged requests, 'max_repeats': worst repeat count}
+        self.duplicate_sql = {}
+
+    def as_dict(self):
+        return {
+            'requests': self.latency_ms.count,
+            'latency_ms': self.latency_ms.as_dict(),
+            'queries': self.queries.as_dict(),
+            'sql_ms': self.sql_ms.as_dict(),
+            'response_bytes': self.response_bytes.as_dict(),
+            'status_codes': dict(self.status_codes),
+            'duplicate_sql': [
+                {'sql': pattern, **info}
+                for pattern, info in sorted(
+                    self.duplicate_sql.items(), key=lambda item: item[1]['max_repeats'], reverse=True
+                )
+            ],
+        }
+
+
+class QueryCollector:
+    """
+    connection.execute_wrapper hook timing every query run during one request.
+    Works without DEBUG, unlike connection.queries.
+    """
+
+    def __init__(self):
+        self.count = 0
+        self.elapsed = 0.0
+        self.patterns = {}
+
+    def __call__(self, execute, sql, params, many, context):
+        start = time.perf_counter()
+        try:
+            return execute(sql, params, many, context)
+        finally:
+            self.elapsed += time.perf_counter() - start
+            self.count += 1
+            pattern = sql_pattern(sql)
+            self.patterns[pattern] = self.patterns.get(pattern, 0) + 1
+
+    def capture(self):
+        stack = ExitStack()
+        for connection in connections.all():
+            stack.enter_context(connection.execute_wrapper(self))
+        return stack
+
+
+class EndpointProfiler:
+    """
+    In-process, per-worker profile of every endpoint, keyed by view and action.
+    """
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._stats = {}
+        self.started_at = time.time()
+
+    def record(self, endpoint, latency, collector, response_size, status_code):
+        threshold = settings.ENDPOINT_PROFILING_DUPLICATE_SQL_THRESHOLD
+        duplicates = {pattern: n for pattern, n in collector.patterns.items() if n >= threshold}
+
+        with self._lock:
+            stats = self._stats.get(endpoint)
+            if stats is None:
+                stats = self._stats[endpoint] = EndpointStats()
+            stats.latency_ms.add(latency * 1000)
+            stats.queries.add(collector.count)
+            stats.sql_ms.add(collector.elapsed * 1000)
+            if response_size is not None:
+                stats.response_bytes.add(response_size)
+            stats.status_codes[status_code] = stats.status_codes.get(status_code, 0) + 1
+            for pattern, repeats in duplicates.items():
+                info = stats.duplicate_sql.setdefault(pattern, {'requests': 0, 'max_repeats': 0})
+                info['requests'] += 1
+                info['max_repeats'] = max(info['max_repeats'], repeats)
+
+        return duplicates
+
+    def snapshot(self):
+        with self._lock:
+            endpoints = {name: stats.as_dict() for name, stats in self._stats.items()}
+        return {
+            'started_at': self.started_at,
+            'generated_at': time.time(),
+            'duplicate_sql_threshold': settings.ENDPOINT_PROFILING_DUPLICATE_SQL_THRESHOLD,
+            'endpoints': dict(sorted(endpoints.items())),
+        }
+
+    def reset(self):
+        with self._lock:
+            self._stats = {}
+            self.started_at = time.time()
+
+
+def endpoint_name(view_func, method):
+    """
+    "RoomViewSet.check_availability" for viewsets, "LoginView.post" for API views.
+    """
+    cls = getattr(view_func, 'cls', None) or getattr(view_func, 'view_class', None)
+    if cls is None:
+        return f"{view_func.__module__}.{view_func.__name__}"
+    actions = getattr(view_func, 'actions', None)
+    handler = actions.get(method.lower(), method.lower()) if actions else method.lower()
+    return f"{cls.__name__}.{handler}"
+
+
+profiler = EndpointProfiler()
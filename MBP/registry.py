@@ -0,0 +1,59 @@
+from django.apps import apps
+
+
+class AuditedModel:
+    """
+    Audit plan of one model: the fields captured in its snapshots, computed once.
+    """
+
+    def __init__(self, model, exclude=()):
+        self.model = model
+        self.exclude = frozenset(exclude)
+        self.fields = tuple(
+            field for field in model._meta.fields if field.name not in self.exclude
+        )
+
+    def __repr__(self):
+        return f"<AuditedModel {self.model._meta.label}>"
+
+
+class AuditRegistry:
+    """
+    Models whose saves and deletes are written to the AuditLog.
+
+    Apps declare them on their AppConfig:
+
+        class HotelConfig(AppConfig):
+            audited_models = {
+                'Room': (),                 # all fields
+                'Booking': ('slug',),       # fields left out of snapshots
+            }
+    """
+
+    def __init__(self):
+        self._registry = {}
+
+    def register(self, model, exclude=()):
+        self._registry[model] = AuditedModel(model, exclude)
+        return self._registry[model]
+
+    def unregister(self, model):
+        self._registry.pop(model, None)
+
+    def get(self, model):
+        return self._registry.get(model)
+
+    def is_registered(self, model):
+        return model in self._registry
+
+    def __iter__(self):
+        return iter(self._registry.values())
+
+    def autodiscover(self):
+        for app_config in apps.get_app_configs():
+            declared = getattr(app_config, 'audited_models', None) or {}
+            for model_name, exclude in declared.items():
+                self.register(app_config.get_model(model_name), exclude)
+
+
+audit_registry = AuditRegistry()
@@ -0,0 +1,122 @@
+import os
+import threading
+
+from django.conf import settings
+from django.db import connections, router, transaction
+from django.db.models import F
+from django.utils import timezone
+
+from .models import Sequence
+
+
+class SequenceAllocator:
+    """
+    Hands out values of named, optionally scoped counters. Each worker reserves
+    a block of SEQUENCE_BLOCK_SIZE values with one locked UPDATE of its Sequence row
+    and serves the rest of the block from memory, so most codes cost no query.
+    Values are unique but only roughly ordered across workers; unused values of
+    a block are skipped when the worker exits.
+    """
+
+    def __init__(self):
+        self._blocks = {}  # (name, scope) -> [next, end)
+        self._lock = threading.Lock()
+        self._pid = os.getpid()
+
+    def next_value(self, name, scope='', initial=1, block_size=None):
+        return self.take(name, 1, scope, initial, block_size)[0]
+
+    def take(self, name, count, scope='', initial=1, block_size=None):
+        """
+        `count` values: what is left of this worker's block first, the rest from one reservation.
+        `initial` (a value or a callable) seeds the counter the first time (name, scope) is used.
+        """
+        key = (name, str(scope))
+        values = []
+        with self._lock:
+            if self._pid != os.getpid():
+                # Forked worker: blocks copied from the parent belong to the parent
+                self._blocks, self._pid = {}, os.getpid()
+            block = self._blocks.get(key)
+            if block:
+                taken = min(count, block[1] - block[0])
+                values = list(range(block[0], block[0] + taken))
+                block[0] += taken
+
+        missing = count - len(values)
+        if missing:
+            block_size = block_size or settings.SEQUENCE_BLOCK_SIZE
+            using = self.reservation_db()
+            start, end = self.reserve(name, key[1], initial, missing + block_size - 1, using)
+            values += range(start, start + missing)
+            if start + missing < end:
+                # If the reservation joined the caller's transaction, a rollback undoes it: keep
+                # the rest of the block only once it is committed (at once on its own connection)
+                transaction.on_commit(lambda: self._store(key, start + missing, end), using=using)
+        return values
+
+    def _store(self, key, start, end):
+        with self._lock:
+            block = self._blocks.get(key)
+            if not block or block[0] >= block[1]:
+                self._blocks[key] = [start, end]
+
+    @staticmethod
+    def reservation_db():
+        """
+        The alias to reserve on. Inside a transaction that is SEQUENCE_DATABASE, a second
+        connection to the same database, so the counter row is committed and unlocked at once
+        instead of staying locked until the caller commits. SQLite has a single writer and
+        the caller may already hold the write lock, so there the caller's connection is used.
+        """
+        using = router.db_for_write(Sequence)
+        connection = connections[using]
+        if connection.in_atomic_block and connection.vendor != 'sqlite' and settings.SEQUENCE_DATABASE:
+            return settings.SEQUENCE_DATABASE
+        return using
+
+    @staticmethod
+    def reserve(name, scope, initial, count, using=None):
+        """
+        Moves the counter forward by `count` and returns the reserved [start, end).
+        The UPDATE comes first so it takes the row lock (the write lock on SQLite) before
+        anything is read; a select-then-update would deadlock SQLite writers.
+        """
+        using = using or router.db_for_write(Sequence)
+        counter = Sequence.objects.using(using).filter(name=name, scope=scope)
+        with transaction.atomic(using=using):
+            if not counter.update(next_value=F('next_value') + count, updated_at=timezone.now()):
+                Sequence.objects.using(using).get_or_create(name=name, scope=scope, defaults={'next_value': initial})
+                counter.update(next_value=F('next_value') + count, updated_at=timezone.now())
+            end = counter.values_list('next_value', flat=True).get()
+        return end - count, end
+
+    def reset(self):
+        with self._lock:
+            self._blocks.clear()
+
+
+sequences = SequenceAllocator()
+
+
+def next_code(name, fmt, scope='', initial=1):
+    """
+    Next formatted code of a sequence, e.g. next_code('booking_code', 'BK{n:03d}') -> 'BK042'.
+    """
+    return fmt.format(n=sequences.next_value(name, scope, initial))
+
+
+def next_codes(name, fmt, count, scope='', initial=1):
+    """
+    `count` formatted codes from a single reservation, for bulk inserts.
+    """
+    return [fmt.format(n=value) for value in sequences.take(name, count, scope, initial)]
+
+
+def next_after(queryset, field, prefix):
+    """
+    1 + the highest number among existing `<prefix><digits>` codes; seeds a new counter
+    so it continues after codes generated before it existed.
+    """
+    codes = queryset.filter(**{f'{field}__startswith': prefix}).values_list(field, flat=True)
+    return max((int(code[len(prefix):]) for code in codes if code[len(prefix):].isdigit()), default=0) + 1
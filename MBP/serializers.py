@@ -18,8 +18,8 @@ class RoleSerializer(serializers.ModelSerializer):
 class AppModelSerializer(serializers.ModelSerializer):
     class Meta:
         model = AppModel
-        fields = ['id', 'name', 'slug', 'verbose_name', 'description', 'app_label']
-        read_only_fields = ['slug']
+        fields = ['id', 'name', 'slug', 'verbose_name', 'description', 'app_label', 'ordinal']
+        read_only_fields = ['slug', 'ordinal']
 
     def validate_name(self, value):
         qs = AppModel.objects.exclude(id=self.instance.id) if self.instance else AppModel.objects.all()
@@ -94,7 +94,7 @@ class AuditLogSerializer(serializers.ModelSerializer):
         model = AuditLog
         fields = [
             'id', 'user', 'user_email', 'action', 'model_name',
-            'object_id', 'details', 'old_data', 'new_data',
+            'object_id', 'details', 'old_data', 'new_data', 'changes',
             'ip_address', 'user_agent', 'timestamp'
         ]
         read_only_fields = fields
@@ -1,24 +1,32 @@
+import logging
+
 from django.db.models.signals import pre_save, post_save, post_delete
 from django.dispatch import receiver
-from .models import AuditLog
+from django.conf import settings
+from .models import Role, AppModel, PermissionType, RoleModelPermission
 from .utils import log_audit_from_user
-from .utils import serialize_instance
+from .utils import serialize_instance, compute_changes
+from .permissions import bump_permission_version
+from .registry import audit_registry
 
+logger = logging.getLogger(__name__)
 
-@receiver(post_save)
-def log_create_or_update(sender, instance, created, **kwargs):
-    if sender == AuditLog:
-        return
 
+def log_create_or_update(sender, instance, created, **kwargs):
     user = getattr(instance, '_request_user', None)
     if not user:
-        print("No _request_user found. Skipping.")
+        logger.debug("No _request_user on %s %s, not audited", sender.__name__, instance.pk)
         return
 
     model_name = sender.__name__
     object_id = instance.pk
     old_data = getattr(instance, '_old_data', None)
     new_data = serialize_instance(instance)
+    changes = compute_changes(old_data, new_data) if old_data is not None else None
+
+    if not created and old_data is not None and not changes:
+        # Saved without changing anything audited: nothing to record
+        return
 
     if created:
         log_audit_from_user(
@@ -29,6 +37,15 @@ def log_create_or_update(sender, instance, created, **kwargs):
             details=f"Created {model_name}",
             new_data=new_data
         )
+    elif settings.AUDIT_LOG_DIFF_MODE and old_data is not None:
+        log_audit_from_user(
+            user=user,
+            action='update',
+            model_name=model_name,
+            object_id=object_id,
+            details=f"Updated {model_name}",
+            changes=changes
+        )
     else:
         log_audit_from_user(
             user=user,
@@ -41,11 +58,7 @@ def log_create_or_update(sender, instance, created, **kwargs):
         )
 
 
-@receiver(post_delete)
 def log_deletion(sender, instance, **kwargs):
-    if sender == AuditLog:
-        return
-
     user = getattr(instance, '_request_user', None)
     if not user:
         return
@@ -62,3 +75,26 @@ def log_deletion(sender, instance, **kwargs):
         details=f"Signal: Deleted {model_name}: {instance}",
         old_data=old_data
     )
+
+
+def connect_audit_receivers():
+    """
+    Connects the audit receivers to registered models only, so saves of
+    unaudited models (sessions, tokens, AuditLog itself) never reach them.
+    """
+    for audited in audit_registry:
+        uid = audited.model._meta.label_lower
+        post_save.connect(log_create_or_update, sender=audited.model, dispatch_uid=f"audit_save_{uid}")
+        post_delete.connect(log_deletion, sender=audited.model, dispatch_uid=f"audit_delete_{uid}")
+
+
+@receiver(post_save, sender=Role)
+@receiver(post_delete, sender=Role)
+@receiver(post_save, sender=AppModel)
+@receiver(post_delete, sender=AppModel)
+@receiver(post_save, sender=PermissionType)
+@receiver(post_delete, sender=PermissionType)
+@receiver(post_save, sender=RoleModelPermission)
+@receiver(post_delete, sender=RoleModelPermission)
+def invalidate_permission_matrix(sender, **kwargs):
+    bump_permission_version()
@@ -0,0 +1,59 @@
+import re
+from functools import reduce
+from operator import or_
+
+from django.db.models import Q
+
+# Bases per prefix query in bulk allocation, to keep the OR clause bounded
+PREFIX_QUERY_CHUNK = 200
+
+
+def taken_slugs(model, bases, field='slug', exclude_pk=None):
+    """
+    Returns the slugs in use that a base could collide with ("base" or "base-<n>"),
+    from one query per chunk of bases instead of one exists() per candidate.
+    """
+    bases = sorted(set(bases))
+    taken = set()
+    for start in range(0, len(bases), PREFIX_QUERY_CHUNK):
+        chunk = bases[start:start + PREFIX_QUERY_CHUNK]
+        # The prefix clause can use the slug index; the regex drops "john-smith" for "john"
+        # in the database, so only real collisions are fetched
+        pattern = '^({})(-[0-9]+)?$'.format('|'.join(re.escape(base) for base in chunk))
+        queryset = model._default_manager.filter(reduce(or_, (
+            Q(**{field: base}) | Q(**{f'{field}__startswith': f'{base}-'}) for base in chunk
+        )), **{f'{field}__regex': pattern})
+        if exclude_pk is not None:
+            queryset = queryset.exclude(pk=exclude_pk)
+        taken.update(queryset.values_list(field, flat=True))
+    return taken
+
+
+def next_free_slug(base, taken, start=1):
+    """
+    `base`, or `base-<n>` with the lowest free n >= start, like the old exists() loops.
+    Adds the result to `taken`.
+    """
+    slug, counter = base, start
+    while slug in taken:
+        slug = f"{base}-{counter}"
+        counter += 1
+    taken.add(slug)
+    return slug
+
+
+def unique_slug(instance, base, field='slug', start=1):
+    """
+    A free slug for one instance being saved, in a single query.
+    """
+    taken = taken_slugs(type(instance), [base], field, exclude_pk=instance.pk)
+    return next_free_slug(base, taken, start)
+
+
+def allocate_slugs(model, bases, field='slug', start=1):
+    """
+    Free slugs for many new rows at once (bulk_create), resolved in memory;
+    duplicate bases within the batch get distinct suffixes.
+    """
+    taken = taken_slugs(model, bases, field)
+    return [next_free_slug(base, taken, start) for base in bases]
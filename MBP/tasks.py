@@ -0,0 +1,22 @@
+from celery import shared_task
+from .models import AuditLog
+
+
+@shared_task
+def write_audit_logs(rows):
+    """
+    Writes a batch of audit log rows (dicts of AuditLog field values) in one insert.
+    """
+    AuditLog.objects.bulk_create([AuditLog(**row) for row in rows])
+    return f"Audit logs written: {len(rows)}"
+
+
+@shared_task
+def archive_old_audit_logs():
+    """
+    Moves audit rows past AUDIT_LOG_RETENTION_DAYS into the daily archive partitions.
+    """
+    from .archive import archive_audit_logs
+
+    archived, partitions = archive_audit_logs()
+    return f"Audit logs archived: {archived} into {partitions} partition(s)"
@@ -1,3 +1,573 @@
-from django.test import TestCase
+import datetime
+import io
+import tempfile
+from unittest import mock
 
-# Create your tests here.
+from django.apps import apps
+from django.core.cache import cache
+from django.core.management import call_command
+from django.core.exceptions import ImproperlyConfigured
+from django.db import connection, transaction
+from django.db.models.functions import Upper
+from django.test import TestCase, TransactionTestCase, override_settings
+from django.test.utils import CaptureQueriesContext
+from django.utils import timezone
+from rest_framework.test import APIClient
+from rest_framework_simplejwt.tokens import AccessToken
+
+from accounts.models import User
+from . import audit
+from .archive import archive_audit_logs
+from .health import HealthSampler
+from .profiling import Histogram, QueryCollector, profiler
+from .sequences import next_after, next_code, sequences
+from .slugs import allocate_slugs, taken_slugs, unique_slug
+from .models import AppModel, AuditLog, PermissionType, Role, RoleModelPermission, Sequence
+from .permissions import (
+    PERMISSION_VERSION_CLAIM, PERMISSION_VERSION_KEY, PERMISSIONS_CLAIM, encode_bitmap, get_permission_version,
+    permission_version, role_has_permission, token_has_permission,
+)
+from .tokens import PermissionRefreshToken, PermissionTokenRefreshSerializer
+from .utils import serialize_instance
+from .versions import SharedVersion
+
+
+def make_user(email, role=None, created_by=None):
+    return User.objects.create_user(
+        email=email, password=None, full_name=email.split('@')[0], role=role,
+        created_by=created_by, is_email_verified=True,
+    )
+
+
+def grant(role, model_name, *codes):
+    model, _ = AppModel.objects.get_or_create(name=model_name, defaults={'verbose_name': model_name, 'app_label': 'MBP'})
+    for code in codes:
+        permission_type, _ = PermissionType.objects.get_or_create(code=code, defaults={'name': code})
+        RoleModelPermission.objects.create(role=role, model=model, permission_type=permission_type)
+
+
+class PermissionInvalidationTests(TestCase):
+    def setUp(self):
+        cache.clear()
+        permission_version.expire()
+        self.role = Role.objects.create(name='Manager')
+        self.model = AppModel.objects.create(name='Room', verbose_name='Room', app_label='Hotel')
+        self.read = PermissionType.objects.create(name='Read', code='r')
+
+    def test_grant_and_revoke_take_effect_after_commit(self):
+        self.assertFalse(role_has_permission(self.role.pk, 'Room', 'r'))
+
+        with self.captureOnCommitCallbacks(execute=True):
+            grant = RoleModelPermission.objects.create(role=self.role, model=self.model, permission_type=self.read)
+        self.assertTrue(role_has_permission(self.role.pk, 'Room', 'r'))
+
+        with self.captureOnCommitCallbacks(execute=True):
+            grant.delete()
+        self.assertFalse(role_has_permission(self.role.pk, 'Room', 'r'))
+
+    def test_version_is_bumped_only_on_commit(self):
+        version = get_permission_version()
+        with self.captureOnCommitCallbacks(execute=True) as callbacks:
+            RoleModelPermission.objects.create(role=self.role, model=self.model, permission_type=self.read)
+            # Still inside the transaction: a concurrent rebuild must keep the old version
+            self.assertEqual(get_permission_version(), version)
+        self.assertTrue(callbacks)
+        self.assertNotEqual(get_permission_version(), version)
+
+    def test_rolled_back_change_does_not_bump(self):
+        version = get_permission_version()
+        with self.captureOnCommitCallbacks(execute=False):
+            RoleModelPermission.objects.create(role=self.role, model=self.model, permission_type=self.read)
+        self.assertEqual(get_permission_version(), version)
+
+    def test_version_is_read_from_the_shared_cache_once_per_refresh(self):
+        get_permission_version()
+        permission_version.expire()
+        with mock.patch('MBP.versions.cache', wraps=cache) as shared:
+            for _ in range(5):
+                role_has_permission(self.role.pk, 'Room', 'r')
+                get_permission_version()
+        self.assertEqual(shared.get.call_count, 1)
+
+    @override_settings(SHARED_VERSION_REFRESH=60)
+    def test_other_workers_see_a_bump_after_the_refresh_interval(self):
+        other_worker = SharedVersion(PERMISSION_VERSION_KEY)
+        version = other_worker.get()
+        with self.captureOnCommitCallbacks(execute=True):
+            RoleModelPermission.objects.create(role=self.role, model=self.model, permission_type=self.read)
+        self.assertEqual(other_worker.get(), version)
+
+        other_worker._read_at -= 60
+        self.assertEqual(other_worker.get(), get_permission_version())
+        self.assertNotEqual(other_worker.get(), version)
+
+
+class AuditBufferTests(TestCase):
+    def test_entries_of_a_rolled_back_savepoint_are_dropped(self):
+        with self.captureOnCommitCallbacks(execute=True):
+            audit.record(AuditLog(action='create', model_name='Room', object_id='kept'))
+            try:
+                with transaction.atomic():
+                    audit.record(AuditLog(action='create', model_name='Room', object_id='dropped'))
+                    raise ValueError
+            except ValueError:
+                pass
+            with transaction.atomic():
+                audit.record(AuditLog(action='update', model_name='Room', object_id='released'))
+            audit.record(AuditLog(action='delete', model_name='Room', object_id='after'))
+
+        self.assertCountEqual(
+            AuditLog.objects.values_list('object_id', flat=True), ['kept', 'released', 'after']
+        )
+
+    def test_nothing_is_written_before_commit(self):
+        with self.captureOnCommitCallbacks(execute=False):
+            audit.record(AuditLog(action='create', model_name='Room', object_id='1'))
+        self.assertFalse(AuditLog.objects.exists())
+
+    def test_one_flush_is_registered_per_transaction(self):
+        with self.captureOnCommitCallbacks(execute=True) as callbacks:
+            for n in range(50):
+                audit.record(AuditLog(action='create', model_name='Room', object_id=str(n)))
+        self.assertEqual(len(callbacks), 1)
+        self.assertEqual(AuditLog.objects.count(), 50)
+
+
+    def test_failed_write_is_logged(self):
+        with mock.patch.object(AuditLog.objects, 'bulk_create', side_effect=ValueError('disk full')), \
+                self.assertLogs('MBP.audit', 'WARNING') as logs:
+            audit.flush([AuditLog(action='create', model_name='Room', object_id='1')])
+        self.assertIn('disk full', logs.output[0])
+
+
+class AuditBufferTransactionTests(TransactionTestCase):
+    def test_entries_of_a_rolled_back_transaction_do_not_reach_the_next_one(self):
+        try:
+            with transaction.atomic():
+                audit.record(AuditLog(action='create', model_name='Room', object_id='dropped'))
+                raise ValueError
+        except ValueError:
+            pass
+        with transaction.atomic():
+            audit.record(AuditLog(action='create', model_name='Room', object_id='kept'))
+
+        self.assertEqual(list(AuditLog.objects.values_list('object_id', flat=True)), ['kept'])
+
+
+class ObjectStateReplayTests(TestCase):
+    def setUp(self):
+        cache.clear()
+        role = Role.objects.create(name='Manager')
+        grant(role, 'AuditLog', 'r')
+        self.reader = make_user('reader@example.com', role=role)
+        self.other = make_user('other@example.com', role=role)
+        self.client = APIClient()
+        self.client.force_authenticate(self.reader)
+        self.now = timezone.now()
+
+    def log(self, user, action, minutes_ago, **data):
+        return AuditLog.objects.create(
+            user=user, action=action, model_name='Room', object_id='42',
+            timestamp=self.now - datetime.timedelta(minutes=minutes_ago), **data
+        )
+
+    def state(self, **params):
+        return self.client.get('/api/logs/state/', {'model': 'Room', 'object_id': '42', **params})
+
+    def test_replays_deltas_written_by_users_the_caller_cannot_see(self):
+        self.log(self.reader, 'create', 30, new_data={'floor': '1', 'status': 'available'})
+        self.log(self.other, 'update', 20, changes={'status': ['available', 'maintenance']})
+        self.log(self.reader, 'update', 10, changes={'floor': ['1', '2']})
+
+        response = self.state()
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(response.data['state'], {'floor': '2', 'status': 'maintenance'})
+        self.assertEqual(response.data['replayed_entries'], 3)
+
+        earlier = self.state(at=(self.now - datetime.timedelta(minutes=15)).isoformat())
+        self.assertEqual(earlier.data['state'], {'floor': '1', 'status': 'maintenance'})
+
+    def test_object_without_visible_entries_is_not_found(self):
+        self.log(self.other, 'create', 30, new_data={'floor': '1'})
+        self.assertEqual(self.state().status_code, 404)
+
+    def test_delete_ends_the_object(self):
+        self.log(self.reader, 'create', 30, new_data={'floor': '1'})
+        self.log(self.reader, 'delete', 10, old_data={'floor': '1'})
+        response = self.state()
+        self.assertFalse(response.data['exists'])
+        self.assertIsNone(response.data['state'])
+
+    def test_base_snapshot_is_read_from_the_archive(self):
+        with tempfile.TemporaryDirectory() as root, override_settings(AUDIT_LOG_ARCHIVE_ROOT=root):
+            self.log(self.reader, 'create', 200 * 24 * 60, new_data={'floor': '1', 'status': 'available'})
+            self.log(self.reader, 'update', 150 * 24 * 60, changes={'floor': ['1', '3']})
+            self.assertEqual(archive_audit_logs(), (2, 2))
+            self.log(self.other, 'update', 10, changes={'status': ['available', 'occupied']})
+
+            response = self.state()
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(response.data['state'], {'floor': '3', 'status': 'occupied'})
+        self.assertEqual(response.data['replayed_entries'], 3)
+
+    def test_update_without_changes_is_not_logged(self):
+        role = Role.objects.create(name='Auditor')
+        role._request_user = self.reader
+
+        with self.captureOnCommitCallbacks(execute=True):
+            role._old_data = serialize_instance(role)
+            role.save()
+        self.assertFalse(AuditLog.objects.filter(action='update').exists())
+
+        with self.captureOnCommitCallbacks(execute=True):
+            role.description = 'Reads the logs'
+            role.save()
+        self.assertEqual(
+            list(AuditLog.objects.filter(action='update').values_list('changes', flat=True)),
+            [{'description': ['', 'Reads the logs']}],
+        )
+
+
+class AuditLogPaginationTests(TestCase):
+    def setUp(self):
+        cache.clear()
+        self.admin = User.objects.create_superuser(email='root@example.com', password=None)
+        self.client = APIClient()
+        self.client.force_authenticate(self.admin)
+        self.now = timezone.now()
+
+    def log(self, minutes_ago, **extra):
+        return AuditLog.objects.create(
+            user=self.admin, action='other', timestamp=self.now - datetime.timedelta(minutes=minutes_ago), **extra
+        )
+
+    def walk(self, url, params):
+        ids, pages, response = [], 0, self.client.get(url, params)
+        while True:
+            self.assertEqual(response.status_code, 200)
+            self.assertEqual(set(response.data), {'next', 'first', 'results'})
+            ids += [row['id'] for row in response.data['results']]
+            pages += 1
+            if not response.data['next']:
+                return ids, pages
+            response = self.client.get(response.data['next'])
+
+    def test_cursor_walks_every_row_once_newest_first(self):
+        AuditLog.objects.all().delete()
+        logs = [self.log(minutes) for minutes in (50, 40, 40, 40, 30, 20, 10)]
+        expected = [log.pk for log in sorted(logs, key=lambda log: (log.timestamp, log.pk), reverse=True)]
+
+        ids, pages = self.walk('/api/logs/', {'page_size': 3})
+        self.assertEqual(ids, expected)
+        self.assertEqual(pages, 3)
+
+    def test_rows_inserted_after_the_first_page_do_not_shift_later_pages(self):
+        AuditLog.objects.all().delete()
+        logs = [self.log(minutes) for minutes in (40, 30, 20, 10)]
+        first = self.client.get('/api/logs/', {'page_size': 2})
+        self.log(0)
+        second = self.client.get(first.data['next'])
+        self.assertEqual([row['id'] for row in second.data['results']], [logs[1].pk, logs[0].pk])
+
+    def test_invalid_cursor_is_not_found(self):
+        self.assertEqual(self.client.get('/api/logs/', {'cursor': 'not-a-cursor'}).status_code, 404)
+
+    def test_range_before_the_hot_window_continues_into_the_archive(self):
+        with tempfile.TemporaryDirectory() as root, override_settings(AUDIT_LOG_ARCHIVE_ROOT=root):
+            AuditLog.objects.all().delete()
+            archived = [self.log(days * 24 * 60, object_id=str(days)) for days in (200, 199, 199, 150, 120)]
+            self.assertEqual(archive_audit_logs()[0], 5)
+            hot = [self.log(minutes) for minutes in (20, 10)]
+
+            since = (self.now - datetime.timedelta(days=300)).date().isoformat()
+            ids, pages = self.walk('/api/logs/', {'page_size': 3, 'from': since})
+
+        expected = [log.pk for log in sorted(archived + hot, key=lambda log: (log.timestamp, log.pk), reverse=True)]
+        self.assertEqual(ids, expected)
+        self.assertEqual(pages, 3)
+
+    def test_email_filter_ignores_case(self):
+        role = Role.objects.create(name='Manager')
+        grant(role, 'AuditLog', 'r')
+        reader = make_user('Reader@Example.com', role=role)
+        log = AuditLog.objects.create(user=reader, action='login')
+        self.client.force_authenticate(reader)
+
+        for query in ('reader@example.com', 'READER@EXAMPLE.COM', 'EADER'):
+            response = self.client.get('/api/logs/', {'user': query})
+            self.assertEqual([row['id'] for row in response.data['results']], [log.pk], query)
+
+    def test_email_filter_uses_the_upper_email_index(self):
+        matching = User.objects.alias(email_upper=Upper('email')).filter(email_upper='READER@EXAMPLE.COM')
+        self.assertIn('user_email_upper_idx', matching.explain())
+
+
+class HealthSamplerTests(TestCase):
+    @override_settings(SYSTEM_HEALTH_SAMPLE_INTERVAL=0)
+    def test_interval_must_be_positive(self):
+        with self.assertRaises(ImproperlyConfigured):
+            HealthSampler().ensure_started()
+
+    @override_settings(SYSTEM_HEALTH_SAMPLE_INTERVAL=60)
+    def test_first_sample_waits_one_interval(self):
+        sampler = HealthSampler()
+        sampler.ensure_started()
+        self.assertIsNone(sampler.latest())
+        self.assertEqual(sampler.trends()['1m']['samples'], 0)
+
+
+class PopulateAppModelsTests(TestCase):
+    def setUp(self):
+        cache.clear()
+        permission_version.expire()
+        self.manager = Role.objects.create(name='Manager')
+
+    def populate(self, *args):
+        with self.captureOnCommitCallbacks(execute=True):
+            call_command('populate_app_models', *args, stdout=io.StringIO())
+
+    def snapshot(self):
+        return sorted(AppModel.objects.values_list('name', 'ordinal'))
+
+    def test_rerun_adds_nothing_and_keeps_ordinals(self):
+        self.populate()
+        first = self.snapshot()
+        self.assertEqual(len(first), len({model.__name__ for model in apps.get_models()}))
+        self.assertEqual(sorted(ordinal for _name, ordinal in first), list(range(len(first))))
+
+        version = get_permission_version()
+        self.populate()
+        self.assertEqual(self.snapshot(), first)
+        self.assertEqual(get_permission_version(), version)
+
+    def test_unnumbered_rows_get_the_next_free_ordinals(self):
+        self.populate()
+        before = dict(self.snapshot())
+        AppModel.objects.filter(name__in=['Room', 'Booking']).update(ordinal=None)
+
+        version = get_permission_version()
+        self.populate()
+        after = dict(self.snapshot())
+        self.assertNotEqual(get_permission_version(), version)
+        self.assertEqual({name: ordinal for name, ordinal in after.items() if name not in ('Room', 'Booking')},
+                         {name: ordinal for name, ordinal in before.items() if name not in ('Room', 'Booking')})
+        self.assertEqual(sorted([after['Room'], after['Booking']]), [len(before), len(before) + 1])
+
+    def test_seeding_writes_only_missing_grants(self):
+        self.populate('--seed-permissions', '--grant', 'manager=r')
+        models = AppModel.objects.count()
+        self.assertEqual(RoleModelPermission.objects.filter(role=self.manager).count(), models)
+
+        version = get_permission_version()
+        self.populate('--seed-permissions', '--grant', 'manager=r')
+        self.assertEqual(RoleModelPermission.objects.filter(role=self.manager).count(), models)
+        self.assertEqual(get_permission_version(), version)
+
+        self.populate('--seed-permissions', '--grant', 'manager=rc')
+        self.assertEqual(RoleModelPermission.objects.filter(role=self.manager).count(), 2 * models)
+        self.assertEqual(PermissionType.objects.filter(code='r').count(), 1)
+        self.assertNotEqual(get_permission_version(), version)
+        self.assertTrue(role_has_permission(self.manager.pk, 'Room', 'c'))
+
+
+class ProfilingTests(TestCase):
+    def setUp(self):
+        cache.clear()
+        profiler.reset()
+        self.client = APIClient()
+        self.client.force_authenticate(User.objects.create_superuser(email='root@example.com', password=None))
+
+    def test_histogram_buckets_and_percentiles(self):
+        histogram = Histogram((1, 5, 10))
+        for value in (0.5, 1, 3, 4, 7, 50):
+            histogram.add(value)
+        self.assertEqual(histogram.counts, [2, 2, 1, 1])
+        self.assertEqual(histogram.percentile(50), 5)
+        self.assertEqual(histogram.percentile(80), 10)
+        # The overflow bucket reports the largest value seen
+        self.assertEqual(histogram.percentile(99), 50)
+        self.assertIsNone(Histogram((1,)).percentile(50))
+
+    def test_collector_counts_every_query_and_collapses_in_lists(self):
+        collector = QueryCollector()
+        with collector.capture():
+            list(AuditLog.objects.filter(pk__in=[1, 2]))
+            list(AuditLog.objects.filter(pk__in=[1, 2, 3]))
+            with connection.cursor() as cursor:
+                cursor.execute('SELECT 1')
+        self.assertEqual(collector.count, 3)
+        self.assertEqual(sorted(collector.patterns.values()), [1, 2])
+        self.assertGreater(collector.elapsed, 0)
+
+    @override_settings(ENDPOINT_PROFILING=False)
+    def test_profiling_is_opt_in(self):
+        response = self.client.get('/api/logs/')
+        self.assertNotIn('X-Profile-Queries', response)
+        self.assertEqual(profiler.snapshot()['endpoints'], {})
+
+    @override_settings(ENDPOINT_PROFILING=True, ENDPOINT_PROFILING_DUPLICATE_SQL_THRESHOLD=1)
+    def test_profiled_request_is_recorded_and_duplicates_logged(self):
+        with self.assertLogs('MBP.middleware', 'INFO') as logs:
+            response = self.client.get('/api/logs/')
+        self.assertEqual(response.status_code, 200)
+        self.assertIn('Duplicate SQL in AuditLogViewSet.list', logs.output[0])
+
+        stats = profiler.snapshot()['endpoints']['AuditLogViewSet.list']
+        self.assertEqual(stats['requests'], 1)
+        self.assertEqual(stats['queries']['count'], 1)
+        self.assertEqual(stats['queries']['max'], int(response['X-Profile-Queries']))
+        self.assertEqual(stats['status_codes'], {200: 1})
+
+
+class TokenPermissionTests(TestCase):
+    def setUp(self):
+        cache.clear()
+        permission_version.expire()
+        with self.captureOnCommitCallbacks(execute=True):
+            self.role = Role.objects.create(name='Manager')
+            grant(self.role, 'AuditLog', 'r')
+            grant(self.role, 'Room', 'r', 'u')
+        self.user = make_user('manager@example.com', role=self.role)
+        self.refresh = PermissionRefreshToken.for_user(self.user)
+        self.access = self.refresh.access_token
+
+    def get_logs(self, access):
+        client = APIClient()
+        client.credentials(HTTP_AUTHORIZATION=f'Bearer {access}')
+        return client.get('/api/logs/')
+
+    def test_bitmap_answers_for_granted_and_missing_permissions(self):
+        self.assertTrue(token_has_permission(self.access, self.role.pk, 'Room', 'u'))
+        self.assertTrue(token_has_permission(self.access, self.role.pk, 'auditlog', 'R'))
+        self.assertFalse(token_has_permission(self.access, self.role.pk, 'Room', 'd'))
+        self.assertFalse(token_has_permission(self.access, self.role.pk, 'AuditLog', 'u'))
+        # Unknown models are denied outright
+        self.assertFalse(token_has_permission(self.access, self.role.pk, 'NoSuchModel', 'r'))
+
+    def test_ordinal_beyond_the_bitmap_is_denied(self):
+        with self.captureOnCommitCallbacks(execute=True):
+            late = AppModel.objects.create(name='Late', verbose_name='Late', app_label='MBP')
+        access = PermissionRefreshToken.for_user(self.user).access_token
+        self.assertGreater(late.ordinal, max(AppModel.objects.exclude(pk=late.pk).values_list('ordinal', flat=True)))
+        self.assertFalse(token_has_permission(access, self.role.pk, 'Late', 'r'))
+
+        # A hand-made bitmap shorter than the ordinal must not wrap around
+        access[PERMISSIONS_CLAIM] = {'r': encode_bitmap(1)}
+        self.assertFalse(token_has_permission(access, self.role.pk, 'Late', 'r'))
+
+    def test_stale_or_foreign_claims_fall_back_to_the_matrix(self):
+        other_role = Role.objects.create(name='Clerk')
+        self.assertIsNone(token_has_permission(self.access, other_role.pk, 'Room', 'r'))
+        self.assertIsNone(token_has_permission({}, self.role.pk, 'Room', 'r'))
+
+        with self.captureOnCommitCallbacks(execute=True):
+            RoleModelPermission.objects.filter(role=self.role, model__name='AuditLog').delete()
+        self.assertNotEqual(self.access[PERMISSION_VERSION_CLAIM], get_permission_version())
+        self.assertIsNone(token_has_permission(self.access, self.role.pk, 'AuditLog', 'r'))
+        # The token still claims AuditLog read, but the revoked grant wins
+        self.assertEqual(self.get_logs(self.access).status_code, 403)
+
+    def test_fresh_claims_authorize_without_the_matrix(self):
+        with mock.patch('MBP.permissions.role_has_permission', side_effect=AssertionError('matrix used')):
+            self.assertEqual(self.get_logs(self.access).status_code, 200)
+
+    def test_ordinals_come_from_the_sequence_not_a_max_read(self):
+        first = AppModel.objects.create(name='First', verbose_name='First', app_label='MBP')
+        # A concurrent saver would have read the same MAX(ordinal)
+        with mock.patch.object(AppModel, 'next_ordinal', return_value=first.ordinal):
+            second = AppModel.objects.create(name='Second', verbose_name='Second', app_label='MBP')
+        self.assertEqual(second.ordinal, first.ordinal + 1)
+
+    def test_refresh_restamps_stale_claims(self):
+        with self.captureOnCommitCallbacks(execute=True):
+            grant(self.role, 'Booking', 'c')
+        serializer = PermissionTokenRefreshSerializer(data={'refresh': str(self.refresh)})
+        serializer.is_valid(raise_exception=True)
+        access = serializer.validated_data['access']
+
+        token = AccessToken(access)
+        self.assertEqual(token[PERMISSION_VERSION_CLAIM], get_permission_version())
+        self.assertTrue(token_has_permission(token, self.role.pk, 'Booking', 'c'))
+        self.assertEqual(self.get_logs(access).status_code, 200)
+
+
+class SlugAllocationTests(TestCase):
+    def setUp(self):
+        for slug in ('desk', 'desk-1', 'desk-3', 'desk-manager', 'desk-2a', 'front-desk'):
+            Role.objects.create(name=slug, slug=slug)
+
+    def test_only_colliding_slugs_are_fetched(self):
+        with CaptureQueriesContext(connection) as queries:
+            taken = taken_slugs(Role, ['desk'])
+        self.assertEqual(taken, {'desk', 'desk-1', 'desk-3'})
+        self.assertEqual(len(queries), 1)
+        # Non-colliding prefixes ("desk-manager") are filtered out by the database
+        self.assertIn('(-[0-9]+)?$', queries[0]['sql'])
+
+    def test_unique_slug_takes_the_lowest_free_suffix(self):
+        self.assertEqual(unique_slug(Role(), 'desk'), 'desk-2')
+        self.assertEqual(unique_slug(Role(), 'desk', start=4), 'desk-4')
+        self.assertEqual(unique_slug(Role(), 'manager'), 'manager')
+
+    def test_unique_slug_ignores_the_instance_being_saved(self):
+        role = Role.objects.get(slug='desk-1')
+        self.assertEqual(unique_slug(role, 'desk-1'), 'desk-1')
+
+    def test_batch_allocation_spreads_duplicates(self):
+        with self.assertNumQueries(1):
+            slugs = allocate_slugs(Role, ['desk', 'desk', 'front-desk', 'porter', 'porter'])
+        self.assertEqual(slugs, ['desk-2', 'desk-4', 'front-desk-1', 'porter', 'porter-1'])
+
+
+@override_settings(SEQUENCE_BLOCK_SIZE=5)
+class SequenceTests(TestCase):
+    def setUp(self):
+        sequences.reset()
+
+    def test_block_is_reserved_once_and_served_from_memory(self):
+        with self.captureOnCommitCallbacks(execute=True):
+            self.assertEqual(sequences.next_value('code', scope='a'), 1)
+        with self.assertNumQueries(0):
+            self.assertEqual([sequences.next_value('code', scope='a') for _ in range(4)], [2, 3, 4, 5])
+        with self.captureOnCommitCallbacks(execute=True):
+            self.assertEqual(sequences.take('code', 2, scope='a'), [6, 7])
+
+        self.assertEqual(sequences.next_value('code', scope='b'), 1)
+        self.assertEqual(Sequence.objects.get(name='code', scope='a').next_value, 12)
+
+    def test_block_is_kept_only_once_committed(self):
+        with self.captureOnCommitCallbacks(execute=False) as callbacks:
+            self.assertEqual(sequences.next_value('code'), 1)
+        self.assertEqual(len(callbacks), 1)
+        # Not committed yet: the next value comes from a new reservation
+        self.assertEqual(sequences.next_value('code'), 6)
+
+    def test_next_after_seeds_a_new_counter(self):
+        for slug in ('bk007', 'bk012', 'bkx', 'other-99'):
+            Role.objects.create(name=slug, slug=slug)
+        seed = mock.Mock(side_effect=lambda: next_after(Role.objects.all(), 'slug', 'bk'))
+
+        self.assertEqual(next_code('booking_code', 'BK{n:03d}', initial=seed), 'BK013')
+        self.assertEqual(next_code('booking_code', 'BK{n:03d}', initial=seed), 'BK018')
+        self.assertEqual(seed.call_count, 1)
+
+    def test_reservation_leaves_the_transaction_except_on_sqlite(self):
+        with mock.patch.object(connection, 'vendor', 'postgresql'):
+            self.assertEqual(sequences.reservation_db(), 'sequences')
+        with mock.patch.object(connection, 'vendor', 'sqlite'):
+            self.assertEqual(sequences.reservation_db(), 'default')
+
+
+class SequenceRollbackTests(TransactionTestCase):
+    def setUp(self):
+        sequences.reset()
+
+    def test_rolled_back_reservation_is_not_reused_from_memory(self):
+        with self.assertRaises(RuntimeError), transaction.atomic():
+            self.assertEqual(sequences.next_value('code'), 1)
+            raise RuntimeError
+
+        # The counter rolled back with the caller and no leftover block was kept
+        self.assertEqual(sequences._blocks, {})
+        self.assertEqual(sequences.next_value('code'), 1)
+        self.assertEqual(sequences.next_value('code'), 2)
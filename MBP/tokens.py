@@ -0,0 +1,47 @@
+from django.contrib.auth import get_user_model
+from rest_framework_simplejwt.serializers import TokenObtainPairSerializer, TokenRefreshSerializer
+from rest_framework_simplejwt.settings import api_settings
+from rest_framework_simplejwt.tokens import AccessToken, RefreshToken
+
+from .permissions import PERMISSION_VERSION_CLAIM, get_permission_claims, get_permission_version
+
+
+def add_permission_claims(token, user):
+    """
+    Stamps the user's role permission bitmap and the permission version on a token.
+    """
+    if user.role_id:
+        for claim, value in get_permission_claims(user.role_id).items():
+            token[claim] = value
+    return token
+
+
+class PermissionRefreshToken(RefreshToken):
+    """
+    Refresh token whose access tokens carry the permission bitmap claims.
+    """
+
+    @classmethod
+    def for_user(cls, user):
+        return add_permission_claims(super().for_user(user), user)
+
+
+class PermissionTokenObtainPairSerializer(TokenObtainPairSerializer):
+    token_class = PermissionRefreshToken
+
+
+class PermissionTokenRefreshSerializer(TokenRefreshSerializer):
+    """
+    Re-stamps the permission claims when the ones copied from the refresh token are stale.
+    """
+    token_class = PermissionRefreshToken
+
+    def validate(self, attrs):
+        data = super().validate(attrs)
+        access = AccessToken(data["access"], verify=False)
+        if access.get(PERMISSION_VERSION_CLAIM) != get_permission_version():
+            user = get_user_model().objects.only("role").get(
+                **{api_settings.USER_ID_FIELD: access[api_settings.USER_ID_CLAIM]}
+            )
+            data["access"] = str(add_permission_claims(access, user))
+        return data
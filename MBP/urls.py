@@ -1,6 +1,6 @@
 from rest_framework import routers
 from django.urls import path, include
-from .views import RoleViewSet, AppModelViewSet, PermissionTypeViewSet, RoleModelPermissionViewSet, AuditLogViewSet
+from .views import RoleViewSet, AppModelViewSet, PermissionTypeViewSet, RoleModelPermissionViewSet, AuditLogViewSet, EndpointProfileViewSet
 
 router = routers.DefaultRouter()
 router.register(r'roles', RoleViewSet)
@@ -8,6 +8,7 @@ router.register(r'appmodels', AppModelViewSet)
 router.register(r'permission-types', PermissionTypeViewSet)
 router.register(r'role-permissions', RoleModelPermissionViewSet)
 router.register('logs', AuditLogViewSet, basename='auditlog')
+router.register('profiling', EndpointProfileViewSet, basename='profiling')
 
 urlpatterns = [
     path('api/', include(router.urls)),
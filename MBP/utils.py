@@ -1,41 +1,129 @@
-from .models import AuditLog
-from django.core.serializers.json import DjangoJSONEncoder
-from django.db.models.fields.files import FileField, ImageField
-from django.db.models import Model
-from decimal import Decimal
+import csv
+import io
 import json
-import uuid
-import datetime
+import logging
+
+from .models import AuditLog
+from . import audit
+from .registry import audit_registry
+from django.db import models
+from django.db.models.fields.files import FileField
 
+# model -> (fields, compiled (name, attname, converter) tuple)
+_snapshot_plans = {}
 
-def serialize_instance(instance):
-    data = {}
-    for field in instance._meta.fields:
-        field_name = field.name
-        value = getattr(instance, field_name, None)
+_JSON_TYPES = (str, int, float, bool, list, dict)
 
-        if isinstance(field, (FileField, ImageField)):
-            data[field_name] = value.url if value else None
+logger = logging.getLogger(__name__)
 
-        elif isinstance(value, (uuid.UUID, datetime.datetime, datetime.date)):
-            data[field_name] = str(value)
 
-        elif isinstance(value, Decimal):
-            # Convert Decimal to float for JSON serialization
-            data[field_name] = float(value)
+def _plain(value):
+    return value
 
-        elif isinstance(value, Model):
-            data[field_name] = str(value)
 
-        else:
-            try:
-                json.dumps(value, cls=DjangoJSONEncoder)
-                data[field_name] = value
-            except (TypeError, ValueError):
-                data[field_name] = str(value)
+def _to_str(value):
+    return None if value is None else str(value)
+
+
+def _to_float(value):
+    return None if value is None else float(value)
+
+
+def _to_file_url(value):
+    return value.url if value else None
+
+
+def _to_json_safe(value):
+    if value is None or isinstance(value, _JSON_TYPES):
+        return value
+    return str(value)
+
+
+def _converter_for(field):
+    """
+    Picks the converter for a field from its type, once per model.
+    Relations read the raw *_id column so no related row is ever loaded.
+    """
+    if field.is_relation:
+        target = field.target_field
+        if isinstance(target, models.IntegerField):
+            return field.attname, _plain
+        return field.attname, _to_str
+    if isinstance(field, FileField):
+        return field.name, _to_file_url
+    if isinstance(field, models.DecimalField):
+        return field.attname, _to_float
+    if isinstance(field, (models.UUIDField, models.DateField, models.TimeField,
+                          models.DurationField, models.GenericIPAddressField)):
+        return field.attname, _to_str
+    if isinstance(field, (models.CharField, models.TextField, models.BooleanField,
+                          models.IntegerField, models.FloatField, models.JSONField)):
+        return field.attname, _plain
+    return field.attname, _to_json_safe
+
+
+def compile_snapshot_plan(fields):
+    return tuple((field.name,) + _converter_for(field) for field in fields)
 
-    return data
 
+def get_snapshot_plan(model):
+    audited = audit_registry.get(model)
+    fields = audited.fields if audited else model._meta.fields
+
+    cached = _snapshot_plans.get(model)
+    if cached is None or cached[0] is not fields:
+        cached = _snapshot_plans[model] = (fields, compile_snapshot_plan(fields))
+    return cached[1]
+
+
+def serialize_instance(instance, fields=None):
+    """
+    Returns a JSON-ready snapshot of the instance's concrete fields.
+    Foreign keys are stored as their raw id.
+    """
+    if fields is None:
+        plan = get_snapshot_plan(type(instance))
+    else:
+        plan = compile_snapshot_plan(fields)
+
+    return {name: convert(getattr(instance, attname, None)) for name, attname, convert in plan}
+
+
+def compute_changes(old_data, new_data):
+    """
+    Returns the fields that differ between two snapshots as {field: [old, new]}.
+    """
+    old_data = old_data or {}
+    changes = {}
+    for field_name, new_value in new_data.items():
+        old_value = old_data.get(field_name)
+        if old_value != new_value:
+            changes[field_name] = [old_value, new_value]
+    return changes
+
+
+def replay_audit_entries(entries):
+    """
+    Rebuilds an object's state from its audit entries (oldest first).
+    Each entry is a (action, new_data, changes) tuple:
+    - create → full snapshot replaces the state
+    - update → snapshot fields are merged, or the delta's new values applied
+    - delete → the object no longer exists
+    """
+    state = None
+    for action, new_data, changes in entries:
+        if action == 'delete':
+            state = None
+        elif action == 'create' and new_data is not None:
+            state = dict(new_data)
+        else:
+            state = dict(state or {})
+            if new_data:
+                state.update(new_data)
+            if changes:
+                for field_name, (_old, new) in changes.items():
+                    state[field_name] = new
+    return state
 
 
 def get_client_ip(request):
@@ -46,9 +134,9 @@ def get_user_agent(request):
     return request.META.get('HTTP_USER_AGENT', '')
 
 def log_audit(request, action, model_name=None, object_id=None, details=None, old_data=None, new_data=None):
-    print(f"3.1 Calling log_audit_from_user for {model_name}, action: {action}")
+    logger.debug("log_audit: %s %s", action, model_name)
     try:
-        AuditLog.objects.create(
+        audit.record(AuditLog(
             user=request.user if request and request.user.is_authenticated else None,
             action=action,
             model_name=model_name,
@@ -58,21 +146,44 @@ def log_audit(request, action, model_name=None, object_id=None, details=None, ol
             new_data=new_data,
             ip_address=get_client_ip(request) if request else None,
             user_agent=get_user_agent(request) if request else None
-        )
+        ))
     except Exception as e:
-        print("Failed to create audit log:", e)
+        logger.warning("Failed to create audit log: %s", e, exc_info=True)
 
-def log_audit_from_user(user, action, model_name=None, object_id=None, details=None, old_data=None, new_data=None):
-    print(f"3.2 Calling log_audit_from_user for {model_name}, action: {action}")
+def log_audit_from_user(user, action, model_name=None, object_id=None, details=None, old_data=None, new_data=None, changes=None):
+    logger.debug("log_audit_from_user: %s %s", action, model_name)
     try:
-        AuditLog.objects.create(
+        audit.record(AuditLog(
             user=user,
             action=action,
             model_name=model_name,
             object_id=str(object_id) if object_id else None,
             details=details,
             old_data=old_data,
-            new_data=new_data
-        )
+            new_data=new_data,
+            changes=changes
+        ))
     except Exception as e:
-        print(" Failed to create audit log:", e)
+        logger.warning("Failed to create audit log: %s", e, exc_info=True)
+
+
+def parse_rows(content, filename=''):
+    """
+    Reads import rows from CSV text or a JSON array (or {"rows": [...]}).
+    """
+    if isinstance(content, bytes):
+        content = content.decode('utf-8-sig')
+    if isinstance(content, str):
+        stripped = content.lstrip()
+        if filename.lower().endswith('.json') or stripped.startswith(('[', '{')):
+            content = json.loads(content)
+        else:
+            return [
+                {key.strip(): (value or '').strip() for key, value in row.items() if key}
+                for row in csv.DictReader(io.StringIO(content))
+            ]
+    if isinstance(content, dict):
+        content = content.get('rows', [])
+    if not isinstance(content, list):
+        raise ValueError("Expected a CSV file or a JSON array of rows.")
+    return content
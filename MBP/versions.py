@@ -0,0 +1,40 @@
+import time
+
+from django.conf import settings
+from django.core.cache import cache
+
+
+class SharedVersion:
+    """
+    A version number shared by every worker process through the cache.
+    Each process keeps the last value it read and re-reads the cache at most every
+    SHARED_VERSION_REFRESH seconds, so hot paths compare against process memory.
+    Bumps take effect in the bumping process at once and in the others within that interval.
+    """
+
+    def __init__(self, key):
+        self.key = key
+        self._value = None
+        self._read_at = 0.0
+
+    def get(self):
+        if self._value is None or time.monotonic() - self._read_at >= settings.SHARED_VERSION_REFRESH:
+            value = cache.get(self.key)
+            if value is None:
+                # A fresh time-based value, so a cache flush never brings back an older version
+                cache.add(self.key, time.time_ns(), None)
+                value = cache.get(self.key)
+            self._value, self._read_at = value, time.monotonic()
+        return self._value
+
+    def bump(self):
+        # A fresh value rather than incr(): the database cache's incr is a get and a set,
+        # so two concurrent bumps could both land on the same number
+        value = time.time_ns()
+        cache.set(self.key, value, None)
+        self._value, self._read_at = value, time.monotonic()
+        return value
+
+    def expire(self):
+        """Makes the next get() re-read the shared value."""
+        self._value = None
@@ -8,15 +8,26 @@ from .serializers import (
     RoleModelPermissionSerializer,
     AuditLogSerializer
 )
-from .utils import serialize_instance
+from .utils import serialize_instance, replay_audit_entries
 from django.db.models.signals import post_save
 from rest_framework.decorators import action
 from rest_framework.response import Response
 from rest_framework import status
 from django.db.models import Q
-import psutil
+from django.db.models.functions import Upper
 from django.utils.timesince import timesince
 from django.utils import timezone
+from django.utils.dateparse import parse_datetime, parse_date
+from django.core.serializers.json import DjangoJSONEncoder
+from rest_framework.exceptions import ValidationError
+from .archive import first_archived_day, hot_window_start, iter_archived_logs, record_position
+from .pagination import KeysetPagination
+from .health import sampler as health_sampler, boot_time
+from .profiling import profiler
+from rest_framework.permissions import IsAdminUser
+from django.http import HttpResponse
+import datetime
+import json
 from django.contrib.auth import get_user_model
 
 User = get_user_model()
@@ -91,12 +102,15 @@ class AuditLogViewSet(viewsets.ReadOnlyModelViewSet):
     """
     Read-only audit logs view with role-based data filtering.
     - Superusers → all logs
-    - Admins → logs of users they created
+    - Admins → logs of users they created, at any depth
     - Others → only their own logs
-    Supports filters: ?user=email&action=create
+    Supports filters: ?user=email&action=create&from=2025-01-01&to=2025-02-01
+    Lists are keyset-paginated on (timestamp, id): follow the `next` cursor link.
+    A range starting before the hot window continues into the archived partitions.
     """
-    queryset = AuditLog.objects.all().order_by('-timestamp')
+    queryset = AuditLog.objects.all().order_by('-timestamp', '-id')
     serializer_class = AuditLogSerializer
+    pagination_class = KeysetPagination
     model_name = 'AuditLog'
     permission_classes = [HasModelPermission]
     permission_code = 'r'
@@ -110,29 +124,128 @@ class AuditLogViewSet(viewsets.ReadOnlyModelViewSet):
 
         # Superusers see everything
         if user.is_superuser:
-            return queryset
+            return self.filter_date_range(queryset)
 
-        # Normal users see their own logs and logs of users they created
-        created_users = user.created_users.all()
-        queryset = queryset.filter(Q(user=user) | Q(user__in=created_users))
+        # Normal users see their own logs and logs of every user in their created_by subtree.
+        # Their own logs are matched directly, so a missing closure row cannot hide them;
+        # plain IN/= on user_id lets the (user, timestamp) index serve the query.
+        queryset = queryset.filter(
+            Q(user=user) | Q(user_id__in=User.objects.managed_by(user).values("pk"))
+        )
 
         # Optional filters
         user_email = self.request.query_params.get("user")
         action = self.request.query_params.get("action")
 
         if user_email:
-            queryset = queryset.filter(user__email__icontains=user_email)
+            if "@" in user_email:
+                # Full address, case-insensitive like the archive predicate and the substring filter.
+                # UPPER(email) = UPPER(value) on every backend, served by user_email_upper_idx.
+                matching = User.objects.alias(email_upper=Upper("email")).filter(email_upper=user_email.upper())
+                queryset = queryset.filter(user_id__in=matching.values("pk"))
+            else:
+                queryset = queryset.filter(user__email__icontains=user_email)
         if action:
-            queryset = queryset.filter(action__iexact=action)
+            queryset = queryset.filter(action=action.lower())
 
+        return self.filter_date_range(queryset)
+
+    def get_visible_user_ids(self):
+        user = self.request.user
+        return list(User.objects.managed_by(user, include_self=True).values_list("pk", flat=True))
+
+    def get_date_range(self):
+        """
+        Parses ?from= and ?to= (ISO date or datetime) into aware datetimes.
+        """
+        bounds = []
+        for param, day_time in (("from", datetime.time.min), ("to", datetime.time.max)):
+            value = self.request.query_params.get(param)
+            parsed = None
+            if value:
+                parsed = parse_datetime(value)
+                if parsed is None and parse_date(value):
+                    parsed = datetime.datetime.combine(parse_date(value), day_time)
+                if parsed is None:
+                    raise ValidationError({param: "Invalid date or datetime."})
+                if timezone.is_naive(parsed):
+                    parsed = timezone.make_aware(parsed)
+            bounds.append(parsed)
+        return bounds
+
+    def filter_date_range(self, queryset):
+        start, end = self.get_date_range()
+        if start:
+            queryset = queryset.filter(timestamp__gte=start)
+        if end:
+            queryset = queryset.filter(timestamp__lte=end)
         return queryset
 
+    def get_archive_predicate(self):
+        """
+        Applies the same visibility rules and filters as get_queryset to archived records.
+        """
+        user = self.request.user
+        if user.is_superuser:
+            return None
+
+        visible = {str(pk) for pk in self.get_visible_user_ids()}
+        user_email = (self.request.query_params.get("user") or "").lower()
+        action = (self.request.query_params.get("action") or "").lower()
+
+        def predicate(record):
+            if record["user"] not in visible:
+                return False
+            record_email = (record["user_email"] or "").lower()
+            if user_email and "@" in user_email and record_email != user_email:
+                return False
+            if user_email and user_email not in record_email:
+                return False
+            if action and record["action"].lower() != action:
+                return False
+            return True
+
+        return predicate
+
+    def list(self, request, *args, **kwargs):
+        start, end = self.get_date_range()
+        if start is None or start >= hot_window_start():
+            return super().list(request, *args, **kwargs)
+
+        # The range reaches past the hot table. Archived rows are all older than the hot
+        # ones, so once the hot rows run out the same cursor carries on into the partitions.
+        paginator = self.paginator
+        queryset = self.filter_queryset(self.get_queryset()).select_related("user")
+        rows = paginator.paginate_queryset(queryset, request, view=self)
+        data = list(self.get_serializer(rows, many=True).data)
+        if not paginator.has_next:
+            below = (rows[-1].timestamp, rows[-1].pk) if rows else paginator.cursor
+            data += paginator.fill_from(rows, self.archived_records(start, end, below), record_position)
+        return paginator.get_paginated_response(data)
+
+    def archived_records(self, start, end, below=None):
+        """
+        Archived records visible to the caller within [start, end], newest first,
+        strictly below the keyset position `below` when given.
+        """
+        predicate = self.get_archive_predicate()
+        end = end or timezone.now()
+        if below:
+            end = min(end, below[0])
+
+        def visible(record):
+            if below and record_position(record) >= below:
+                return False
+            return predicate is None or predicate(record)
+
+        return iter_archived_logs(start, end, visible)
+
     @action(detail=False, methods=["get"], url_path="recent")
     def recent_logs(self, request):
         """
         Returns 5 most recent activities with "time ago" format.
         """
-        logs = self.get_queryset()[:5]
+        logs = self.get_queryset().select_related("user")[:5]
         data = [
             {
                 "action": log.action,
@@ -144,22 +257,134 @@ class AuditLogViewSet(viewsets.ReadOnlyModelViewSet):
         ]
         return Response(data, status=status.HTTP_200_OK)
 
+    @action(detail=False, methods=["get"], url_path="state")
+    def object_state(self, request):
+        """
+        Rebuilds the state of an object at a point in time by replaying its audit entries.
+        GET /api/logs/state/?model=Room&object_id=<id>&at=2025-07-25T10:00:00
+        """
+        model_name = request.query_params.get("model")
+        object_id = request.query_params.get("object_id")
+        at = request.query_params.get("at")
+
+        if not model_name or not object_id:
+            return Response({"error": "model and object_id are required."}, status=status.HTTP_400_BAD_REQUEST)
+
+        if at:
+            at = parse_datetime(at)
+            if at is None:
+                return Response({"error": "Invalid 'at' datetime."}, status=status.HTTP_400_BAD_REQUEST)
+            if timezone.is_naive(at):
+                at = timezone.make_aware(at)
+        else:
+            at = timezone.now()
+
+        # Visibility is checked once on the object; the replay then needs every entry,
+        # including updates made by users the caller cannot see
+        visible = self.get_queryset().filter(model_name=model_name, object_id=object_id).exists()
+        entries = list(
+            AuditLog.objects
+            .filter(model_name=model_name, object_id=object_id, timestamp__lte=at)
+            .order_by("timestamp", "id")
+            .values_list("action", "new_data", "changes")
+        )
+        if not entries or entries[0][0] != "create":
+            # The base snapshot was archived: read back to the object's create entry
+            archived = self.archived_history(model_name, object_id, at)
+            predicate = self.get_archive_predicate()
+            visible = visible or any(predicate is None or predicate(record) for record in archived)
+            entries = [(record["action"], record["new_data"], record["changes"]) for record in archived] + entries
+
+        if not entries or not visible:
+            return Response({"error": "No audit history found for this object."}, status=status.HTTP_404_NOT_FOUND)
+
+        state = replay_audit_entries(entries)
+        return Response({
+            "model": model_name,
+            "object_id": object_id,
+            "at": at,
+            "exists": state is not None,
+            "state": state,
+            "replayed_entries": len(entries),
+        }, status=status.HTTP_200_OK)
+
+    @staticmethod
+    def archived_history(model_name, object_id, at):
+        """
+        Archived entries of one object up to `at`, oldest first, starting at its
+        newest archived create entry (the base snapshot for a replay).
+        """
+        first_day = first_archived_day()
+        end = min(at, hot_window_start())
+        if first_day is None or timezone.localdate(end) < first_day:
+            return []
+
+        start = timezone.make_aware(datetime.datetime.combine(first_day, datetime.time.min))
+        records = []
+        for record in iter_archived_logs(
+            start, end, lambda record: record["model_name"] == model_name and record["object_id"] == str(object_id)
+        ):
+            records.append(record)
+            if record["action"] == "create":
+                break
+        records.reverse()
+        return records
+
     @action(detail=False, methods=["get"], url_path="system-health", permission_classes=[])
     def system_health(self, request):
         """
         Returns current system health information for dashboard display.
+        Served from the background sampler's ring buffer, so it never blocks.
         """
-        cpu_usage = psutil.cpu_percent(interval=1)
-        memory = psutil.virtual_memory()
-        disk = psutil.disk_usage("/")
+        health_sampler.ensure_started()
+        sample = health_sampler.latest()
+        if sample is None:
+            return Response({
+                "server_status": "Starting",
+                "detail": f"First sample in {health_sampler.interval}s.",
+                "uptime": timesince(boot_time()),
+            }, status=status.HTTP_200_OK)
 
         health_data = {
-            "server_status": "Online" if cpu_usage < 90 else "High Load",
-            "database": "Healthy",  # Optionally, add a DB connection check
+            "server_status": "Online" if sample["cpu"] < 90 else "High Load",
+            "database": "Healthy" if sample["db_ok"] else "Unavailable",
+            "cache": "Healthy" if sample["cache_ok"] else "Unavailable",
             "ai_services": "Active",  # For AI/ML modules, can be checked via API ping
-            "uptime": timesince(timezone.now() - timezone.timedelta(seconds=psutil.boot_time())),
-            "cpu_usage": f"{cpu_usage}%",
-            "memory_usage": f"{memory.percent}%",
-            "disk_usage": f"{disk.percent}%",
+            "uptime": timesince(boot_time()),
+            "cpu_usage": f"{sample['cpu']}%",
+            "memory_usage": f"{sample['memory']}%",
+            "disk_usage": f"{sample['disk']}%",
+            "db_latency_ms": sample["db_latency_ms"],
+            "cache_latency_ms": sample["cache_latency_ms"],
+            "sampled_at": datetime.datetime.fromtimestamp(sample["time"], tz=datetime.timezone.utc),
+            "trends": health_sampler.trends(),
         }
         return Response(health_data, status=status.HTTP_200_OK)
+
+
+class EndpointProfileViewSet(viewsets.ViewSet):
+    """
+    Staff-only view of the per-endpoint profile collected by
+    EndpointProfilingMiddleware (enable with ENDPOINT_PROFILING=True).
+    Figures are per worker process.
+    - GET  /api/profiling/        → histograms per endpoint
+    - GET  /api/profiling/dump/   → same data as a downloadable JSON file
+    - POST /api/profiling/reset/  → start a fresh profile
+    """
+    permission_classes = [IsAdminUser]
+
+    def list(self, request):
+        return Response(profiler.snapshot(), status=status.HTTP_200_OK)
+
+    @action(detail=False, methods=["get"], url_path="dump")
+    def dump(self, request):
+        snapshot = profiler.snapshot()
+        response = HttpResponse(json.dumps(snapshot, indent=2, cls=DjangoJSONEncoder), content_type="application/json")
+        filename = f"endpoint-profile-{timezone.now():%Y%m%d-%H%M%S}.json"
+        response["Content-Disposition"] = f'attachment; filename="{filename}"'
+        return response
+
+    @action(detail=False, methods=["post"], url_path="reset")
+    def reset(self, request):
+        profiler.reset()
+        return Response({"message": "Profile reset."}, status=status.HTTP_200_OK)
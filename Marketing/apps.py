@@ -4,3 +4,8 @@ from django.apps import AppConfig
 class MarketingConfig(AppConfig):
     default_auto_field = 'django.db.models.BigAutoField'
     name = 'Marketing'
+
+    audited_models = {
+        'Campaign': (),
+        'Promotion': (),
+    }
@@ -4,3 +4,13 @@ from django.apps import AppConfig
 class RestaurantConfig(AppConfig):
     default_auto_field = 'django.db.models.BigAutoField'
     name = 'Restaurant'
+
+    audited_models = {
+        'MenuCategory': (),
+        'MenuItem': (),
+        'Table': (),
+        'RestaurantOrder': (),
+        'OrderItem': (),
+        'TableReservation': (),
+        'DiscountRule': (),
+    }
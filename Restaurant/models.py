@@ -1,6 +1,8 @@
 import uuid
 from django.db import models
 from django.utils.text import slugify
+from MBP.sequences import next_after, next_code
+from MBP.slugs import unique_slug
 from Hotel.models import Hotel
 from decimal import Decimal, ROUND_HALF_UP
 from django.contrib.auth import get_user_model
@@ -19,13 +21,7 @@ class MenuCategory(models.Model):
 
     def save(self, *args, **kwargs):
         if not self.slug:
-            base_slug = slugify(self.name)
-            counter = 1
-            new_slug = base_slug
-            while MenuCategory.objects.filter(slug=new_slug).exists():
-                counter += 1
-                new_slug = f"{base_slug}-{counter}"
-            self.slug = new_slug
+            self.slug = unique_slug(self, slugify(self.name), start=2)
         super().save(*args, **kwargs)
 
 
@@ -44,13 +40,7 @@ class MenuItem(models.Model):
 
     def save(self, *args, **kwargs):
         if not self.slug:
-            base_slug = slugify(self.name)
-            counter = 1
-            new_slug = base_slug
-            while MenuItem.objects.filter(slug=new_slug).exists():
-                counter += 1
-                new_slug = f"{base_slug}-{counter}"
-            self.slug = new_slug
+            self.slug = unique_slug(self, slugify(self.name), start=2)
         super().save(*args, **kwargs)
 
 
@@ -65,31 +55,28 @@ class Table(models.Model):
     hotel = models.ForeignKey(Hotel, on_delete=models.CASCADE, related_name='tables')
     number = models.CharField(max_length=10)
     slug = models.SlugField(unique=True, blank=True)
-    table_code = models.CharField(max_length=10, unique=True, blank=True)
+    table_code = models.CharField(max_length=10, blank=True)
     capacity = models.PositiveIntegerField()
     status = models.CharField(max_length=20, choices=STATUS_CHOICES, default='available')
 
+    class Meta:
+        constraints = [
+            models.UniqueConstraint(fields=['hotel', 'table_code'], name='unique_table_code_per_hotel'),
+        ]
+
     def __str__(self):
         return f"Table {self.number} - {self.hotel.name}"
 
     def save(self, *args, **kwargs):
         if not self.table_code:
-            last_table = Table.objects.order_by('-table_code').first()
-            if last_table and last_table.table_code.startswith('T'):
-                last_number = int(last_table.table_code[1:])
-                new_number = last_number + 1
-            else:
-                new_number = 1
-            self.table_code = f"T{new_number:02d}"  # e.g., T01, T02, T10
+            # Numbered per hotel: T01, T02, T10
+            self.table_code = next_code(
+                'table_code', 'T{n:02d}', scope=self.hotel_id,
+                initial=lambda: next_after(Table.objects.filter(hotel_id=self.hotel_id), 'table_code', 'T'),
+            )
 
         if not self.slug:
-            base_slug = slugify(f"{self.hotel.name}-{self.number}")
-            counter = 1
-            new_slug = base_slug
-            while Table.objects.filter(slug=new_slug).exists():
-                counter += 1
-                new_slug = f"{base_slug}-{counter}"
-            self.slug = new_slug
+            self.slug = unique_slug(self, slugify(f"{self.hotel.name}-{self.number}"), start=2)
 
         super().save(*args, **kwargs)
 
@@ -226,13 +213,8 @@ class TableReservation(models.Model):
 
     def save(self, *args, **kwargs):
         if not self.slug:
-            base_slug = slugify(f"{self.full_name}-{self.reservation_date}-{self.reservation_time}")
-            counter = 1
-            new_slug = base_slug
-            while TableReservation.objects.filter(slug=new_slug).exists():
-                counter += 1
-                new_slug = f"{base_slug}-{counter}"
-            self.slug = new_slug
+            base = f"{self.full_name}-{self.reservation_date}-{self.reservation_time}"
+            self.slug = unique_slug(self, slugify(base), start=2)
         super().save(*args, **kwargs)
         
 class DiscountRule(models.Model):
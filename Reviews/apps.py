@@ -4,3 +4,9 @@ from django.apps import AppConfig
 class ReviewsConfig(AppConfig):
     default_auto_field = 'django.db.models.BigAutoField'
     name = 'Reviews'
+
+    audited_models = {
+        'HotelReview': (),
+        'RestaurantReview': (),
+        'ServiceReview': (),
+    }
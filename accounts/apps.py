@@ -4,3 +4,11 @@ from django.apps import AppConfig
 class AccountsConfig(AppConfig):
     default_auto_field = 'django.db.models.BigAutoField'
     name = 'accounts'
+
+    audited_models = {
+        'User': ('password', 'last_login'),
+        'Profile': (),
+    }
+
+    def ready(self):
+        import accounts.signals
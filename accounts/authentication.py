@@ -0,0 +1,164 @@
+import time
+
+from django.conf import settings
+from django.core.cache import cache
+from django.db import transaction
+from django.utils.translation import gettext_lazy as _
+from rest_framework_simplejwt.authentication import JWTAuthentication
+from rest_framework_simplejwt.exceptions import AuthenticationFailed, InvalidToken
+from rest_framework_simplejwt.settings import api_settings
+
+from Hotel.models import Hotel
+from MBP.models import Role
+from MBP.permissions import get_permission_version
+from staff.models import Staff
+from .models import User
+from .revocation import is_access_token_revoked
+
+USER_SNAPSHOT_TIMEOUT = 15 * 60
+
+# Loaded on the snapshot user; any other field is fetched lazily on first access
+SNAPSHOT_USER_FIELDS = (
+    'id', 'email', 'full_name', 'slug', 'role_id', 'created_by_id',
+    'is_active', 'is_staff', 'is_superuser', 'is_email_verified', 'is_phone_verified',
+)
+
+
+# user_id -> (version, read_at, snapshot): this worker's copies, trusted for SHARED_VERSION_REFRESH seconds
+_local_snapshots = {}
+LOCAL_SNAPSHOT_LIMIT = 10000
+
+
+def user_snapshot_key(user_id, version=None):
+    # Role changes bump the permission version, which retires every snapshot at once
+    return f'accounts:user_snapshot:{get_permission_version() if version is None else version}:{user_id}'
+
+
+def invalidate_user_snapshot(*user_ids):
+    """
+    Drops the snapshots now and again once the current transaction commits: a request
+    rebuilding one in between would otherwise cache the uncommitted, old state.
+    Other workers drop their local copies within SHARED_VERSION_REFRESH seconds.
+    """
+    user_ids = [str(user_id) for user_id in user_ids if user_id]
+
+    def drop():
+        version = get_permission_version()
+        for user_id in user_ids:
+            _local_snapshots.pop(user_id, None)
+        cache.delete_many([user_snapshot_key(user_id, version) for user_id in user_ids])
+
+    drop()
+    transaction.on_commit(drop)
+
+
+def get_user_snapshot(user_id):
+    """
+    The identity snapshot of a user: this worker's copy while it is fresh, then the
+    shared cache, then one query. A warm snapshot costs no query and no cache call.
+    """
+    user_id = str(user_id)
+    version = get_permission_version()
+    local = _local_snapshots.get(user_id)
+    if local and local[0] == version and time.monotonic() - local[1] < settings.SHARED_VERSION_REFRESH:
+        return local[2]
+
+    key = user_snapshot_key(user_id, version)
+    snapshot = cache.get(key)
+    if snapshot is None:
+        snapshot = build_user_snapshot(user_id, version)
+        if snapshot is None:
+            return None
+        cache.set(key, snapshot, USER_SNAPSHOT_TIMEOUT)
+
+    if len(_local_snapshots) >= LOCAL_SNAPSHOT_LIMIT:
+        _local_snapshots.clear()
+    _local_snapshots[user_id] = (version, time.monotonic(), snapshot)
+    return snapshot
+
+
+def build_user_snapshot(user_id, version=None):
+    """
+    Reads everything request handling needs about a user's identity in one query.
+    """
+    row = (
+        User.objects.filter(pk=user_id)
+        .values(
+            *SNAPSHOT_USER_FIELDS,
+            'role__name', 'role__slug', 'hotel__id', 'staff_profile__id', 'staff_profile__hotel_id',
+        )
+        .first()
+    )
+    if row is None:
+        return None
+    return {
+        'user': {field: row[field] for field in SNAPSHOT_USER_FIELDS},
+        'role': {'id': row['role_id'], 'name': row['role__name'], 'slug': row['role__slug']} if row['role_id'] else None,
+        'hotel_id': row['hotel__id'],
+        'staff_id': row['staff_profile__id'],
+        'staff_hotel_id': row['staff_profile__hotel_id'],
+        'version': get_permission_version() if version is None else version,
+    }
+
+
+def _partial(model, **values):
+    # Builds an instance as if loaded with .only(*values); other fields stay deferred
+    names = [field.attname for field in model._meta.concrete_fields if field.attname in values]
+    return model.from_db('default', names, [values[name] for name in names])
+
+
+def user_from_snapshot(snapshot):
+    """
+    Rebuilds a User with its role, hotel and staff profile relations already cached,
+    so `user.role`, `hasattr(user, 'hotel')` and `user.staff_profile.hotel` cost no queries.
+    """
+    user = _partial(User, **snapshot['user'])
+
+    role = snapshot['role']
+    User.role.field.set_cached_value(user, _partial(Role, **role) if role else None)
+
+    hotel = _partial(Hotel, id=snapshot['hotel_id'], owner_id=user.pk) if snapshot['hotel_id'] else None
+    User.hotel.related.set_cached_value(user, hotel)
+
+    staff = None
+    if snapshot['staff_id']:
+        staff = _partial(Staff, id=snapshot['staff_id'], user_id=user.pk, hotel_id=snapshot['staff_hotel_id'])
+        staff_hotel = _partial(Hotel, id=snapshot['staff_hotel_id']) if snapshot['staff_hotel_id'] else None
+        Staff.hotel.field.set_cached_value(staff, staff_hotel)
+        Staff.user.field.set_cached_value(staff, user)
+    User.staff_profile.related.set_cached_value(user, staff)
+    return user
+
+
+class CachedJWTAuthentication(JWTAuthentication):
+    """
+    JWTAuthentication that resolves the user from a cached identity snapshot
+    (id, role, hotel id, staff hotel id, flags) instead of querying on every request.
+    Snapshots are dropped when the user, their role, hotel or staff record changes.
+    Revoked access tokens are rejected through the per-worker revocation filter.
+    """
+
+    def get_validated_token(self, raw_token):
+        validated_token = super().get_validated_token(raw_token)
+        if is_access_token_revoked(validated_token.get(api_settings.JTI_CLAIM)):
+            raise InvalidToken(_("Token has been revoked"))
+        return validated_token
+
+    def get_user(self, validated_token):
+        if api_settings.CHECK_REVOKE_TOKEN:
+            # The revoke claim is checked against the password hash, which is not snapshotted
+            return super().get_user(validated_token)
+
+        try:
+            user_id = validated_token[api_settings.USER_ID_CLAIM]
+        except KeyError:
+            raise InvalidToken(_("Token contained no recognizable user identification"))
+
+        snapshot = get_user_snapshot(user_id)
+        if snapshot is None:
+            raise AuthenticationFailed(_("User not found"), code="user_not_found")
+
+        user = user_from_snapshot(snapshot)
+        if api_settings.CHECK_USER_IS_ACTIVE and not user.is_active:
+            raise AuthenticationFailed(_("User is inactive"), code="user_inactive")
+        return user
@@ -0,0 +1,193 @@
+import datetime
+import os
+from concurrent.futures import ProcessPoolExecutor
+
+from django.conf import settings
+from django.contrib.auth.hashers import make_password
+from django.db import transaction
+from django.utils.text import slugify
+from rest_framework import serializers
+
+from Hotel.models import Hotel
+from MBP.models import Role
+from MBP.slugs import allocate_slugs
+from staff.models import Staff
+from . import hierarchy
+from .models import User
+
+# Below this many passwords a process pool costs more than it saves
+PARALLEL_HASH_THRESHOLD = 16
+
+
+class BulkUserRowSerializer(serializers.Serializer):
+    email = serializers.EmailField()
+    full_name = serializers.CharField(max_length=100, required=False, allow_blank=True, default='')
+    phone = serializers.CharField(max_length=15, required=False, allow_blank=True, allow_null=True, default=None)
+    password = serializers.CharField(required=False, allow_blank=True, default='')
+    role_slug = serializers.SlugField(required=False, allow_blank=True, default='')
+    hotel_slug = serializers.SlugField(required=False, allow_blank=True, default='')
+    designation = serializers.CharField(max_length=100, required=False, allow_blank=True, default='')
+    department = serializers.CharField(max_length=100, required=False, allow_blank=True, default='')
+    joining_date = serializers.DateField(required=False, allow_null=True, default=None)
+    is_email_verified = serializers.BooleanField(required=False, default=False)
+
+
+def _ensure_django():
+    # Process pool initializer: forked workers are ready already, spawned ones are not
+    from django.apps import apps
+
+    if not apps.ready:
+        import django
+
+        django.setup()
+
+
+def hash_passwords(passwords, parallel=False):
+    """
+    Hashes raw passwords, across CPU cores when `parallel`; blank passwords become unusable ones.
+    Only offline callers (the import_users command) should ask for the process pool.
+    """
+    hashed = [None] * len(passwords)
+    pending = [(index, raw) for index, raw in enumerate(passwords) if raw]
+    for index, raw in enumerate(passwords):
+        if not raw:
+            hashed[index] = make_password(None)
+
+    workers = settings.BULK_IMPORT_HASH_WORKERS or os.cpu_count() or 1
+    if not parallel or workers == 1 or len(pending) < PARALLEL_HASH_THRESHOLD:
+        for index, raw in pending:
+            hashed[index] = make_password(raw)
+        return hashed
+
+    with ProcessPoolExecutor(max_workers=workers, initializer=_ensure_django) as pool:
+        results = pool.map(make_password, [raw for _index, raw in pending], chunksize=max(1, len(pending) // (workers * 4)))
+        for (index, _raw), value in zip(pending, results):
+            hashed[index] = value
+    return hashed
+
+
+class UserImporter:
+    """
+    Validates, hashes and inserts user rows in batches. Rows with errors are
+    reported and skipped; the valid ones of each batch are committed together.
+    """
+
+    def __init__(self, created_by=None, batch_size=None, dry_run=False, parallel_hashing=False):
+        self.created_by = created_by if created_by and created_by.is_authenticated else None
+        self.batch_size = batch_size or settings.BULK_IMPORT_BATCH_SIZE
+        self.dry_run = dry_run
+        self.parallel_hashing = parallel_hashing
+        self.created = 0
+        self.staff_created = 0
+        self.errors = []
+        # Accepted so far across batches, so a dry run still catches duplicates between them
+        self.seen_emails = set()
+        self.seen_phones = set()
+
+    def run(self, rows):
+        for start in range(0, len(rows), self.batch_size):
+            self.import_batch(rows[start:start + self.batch_size], first_row=start + 1)
+        return {
+            'created': self.created,
+            'staff_created': self.staff_created,
+            'failed': len(self.errors),
+            'dry_run': self.dry_run,
+            'errors': sorted(self.errors, key=lambda error: error['row']),
+        }
+
+    def validate_batch(self, rows, first_row):
+        valid = []
+        for number, row in enumerate(rows, start=first_row):
+            serializer = BulkUserRowSerializer(data=row)
+            if serializer.is_valid():
+                data = serializer.validated_data
+                data['email'] = User.objects.normalize_email(data['email'])
+                data['phone'] = data['phone'] or None
+                valid.append((number, data))
+            else:
+                self.errors.append({'row': number, 'errors': serializer.errors})
+
+        # Uniqueness and lookups for the whole batch, one query each
+        emails = {data['email'] for _number, data in valid}
+        phones = {data['phone'] for _number, data in valid if data['phone']}
+        taken_emails = self.seen_emails | set(User.objects.filter(email__in=emails).values_list('email', flat=True))
+        taken_phones = self.seen_phones | set(User.objects.filter(phone__in=phones).values_list('phone', flat=True))
+        roles = {role.slug: role for role in Role.objects.filter(slug__in={d['role_slug'] for _n, d in valid})}
+        hotels = {hotel.slug: hotel for hotel in Hotel.objects.filter(slug__in={d['hotel_slug'] for _n, d in valid})}
+
+        accepted = []
+        for number, data in valid:
+            errors = {}
+            if data['email'] in taken_emails:
+                errors['email'] = ["A user with this email already exists."]
+            if data['phone'] and data['phone'] in taken_phones:
+                errors['phone'] = ["A user with this phone number already exists."]
+            if data['role_slug'] and data['role_slug'] not in roles:
+                errors['role_slug'] = ["Invalid role slug."]
+            if data['hotel_slug'] and data['hotel_slug'] not in hotels:
+                errors['hotel_slug'] = ["Invalid hotel slug."]
+            if errors:
+                self.errors.append({'row': number, 'errors': errors})
+                continue
+            # Later duplicates inside the file collide with this row
+            taken_emails.add(data['email'])
+            self.seen_emails.add(data['email'])
+            if data['phone']:
+                taken_phones.add(data['phone'])
+                self.seen_phones.add(data['phone'])
+            data['role'] = roles.get(data['role_slug'])
+            data['hotel'] = hotels.get(data['hotel_slug'])
+            accepted.append(data)
+        return accepted
+
+    def import_batch(self, rows, first_row):
+        accepted = self.validate_batch(rows, first_row)
+        if self.dry_run:
+            self.created += len(accepted)
+            self.staff_created += sum(1 for data in accepted if data['hotel'])
+            return
+        if not accepted:
+            return
+
+        passwords = hash_passwords([data['password'] for data in accepted], parallel=self.parallel_hashing)
+        slugs = allocate_slugs(
+            User, [slugify(data['full_name'] or data['email'].split('@')[0]) for data in accepted]
+        )
+
+        users = []
+        for data, password, slug in zip(accepted, passwords, slugs):
+            users.append(User(
+                email=data['email'],
+                full_name=data['full_name'],
+                phone=data['phone'],
+                password=password,
+                slug=slug,
+                role=data['role'],
+                created_by=self.created_by,
+                is_email_verified=data['is_email_verified'],
+                is_phone_verified=True,
+                # Same rule as User.save()
+                is_active=data['is_email_verified'],
+            ))
+
+        with transaction.atomic():
+            User.objects.bulk_create(users)
+            # bulk_create skips post_save, so the closure rows are added here
+            hierarchy.add_users(users, self.created_by.pk if self.created_by else None)
+
+            staff_rows = [(user, data) for user, data in zip(users, accepted) if data['hotel']]
+            staff_slugs = allocate_slugs(Staff, [slugify(user.full_name or str(user.id)) for user, _data in staff_rows])
+            Staff.objects.bulk_create([
+                Staff(
+                    user=user,
+                    hotel=data['hotel'],
+                    slug=slug,
+                    designation=data['designation'] or None,
+                    department=data['department'] or None,
+                    joining_date=data['joining_date'] or datetime.date.today(),
+                )
+                for (user, data), slug in zip(staff_rows, staff_slugs)
+            ])
+
+        self.created += len(users)
+        self.staff_created += len(staff_rows)
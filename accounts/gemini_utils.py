@@ -1,16 +1,180 @@
-import google.generativeai as genai
+import hashlib
+import re
+import threading
+import time
+from collections import OrderedDict
+
 from django.conf import settings
+from django.utils.module_loading import import_string
+
+
+class GenerationError(Exception):
+    """The backend failed to produce text."""
+
+
+class GenerationBusy(GenerationError):
+    """No generation slot (or coalesced result) became available in time."""
+
+
+class GeminiBackend:
+    """
+    Google Gemini backend. The SDK is configured once and the model object is reused.
+    """
+
+    def __init__(self, model_name="gemini-1.5-flash"):  # lightweight & fast
+        import google.generativeai as genai
+
+        genai.configure(api_key=settings.GEMINI_API_KEY)
+        self.model = genai.GenerativeModel(model_name)
+
+    def generate(self, prompt, timeout):
+        response = self.model.generate_content(prompt, request_options={"timeout": timeout})
+        return response.text.strip()
+
+
+class StubBackend:
+    """
+    Deterministic local backend for tests and benchmarks (GEMINI_BACKEND=accounts.gemini_utils.StubBackend).
+    """
+
+    def __init__(self, delay=None):
+        self.delay = settings.GEMINI_STUB_DELAY if delay is None else delay
+        self.calls = 0
+
+    def generate(self, prompt, timeout):
+        self.calls += 1
+        if self.delay:
+            time.sleep(min(self.delay, timeout))
+        return f"Stub response for: {prompt[:80]}"
+
+
+class TTLCache:
+    """
+    Thread-safe LRU cache whose entries also expire after `ttl` seconds.
+    """
+
+    def __init__(self, maxsize, ttl):
+        self.maxsize = maxsize
+        self.ttl = ttl
+        self._data = OrderedDict()
+        self._lock = threading.Lock()
+
+    def get(self, key):
+        with self._lock:
+            item = self._data.get(key)
+            if item is None:
+                return None
+            expires_at, value = item
+            if expires_at < time.monotonic():
+                del self._data[key]
+                return None
+            self._data.move_to_end(key)
+            return value
+
+    def set(self, key, value):
+        with self._lock:
+            self._data[key] = (time.monotonic() + self.ttl, value)
+            self._data.move_to_end(key)
+            while len(self._data) > self.maxsize:
+                self._data.popitem(last=False)
+
+    def clear(self):
+        with self._lock:
+            self._data.clear()
+
+
+class _InFlight:
+    def __init__(self):
+        self.done = threading.Event()
+        self.result = None
+        self.error = None
+
+
+class GenerationService:
+    """
+    Wraps a backend with a prompt cache, single-flight coalescing of identical
+    in-flight prompts and a bounded number of concurrent upstream calls.
+    """
+
+    def __init__(self, backend=None):
+        self._backend = backend
+        self._backend_lock = threading.Lock()
+        self.cache = TTLCache(settings.GEMINI_CACHE_SIZE, settings.GEMINI_CACHE_TTL)
+        self.slots = threading.BoundedSemaphore(settings.GEMINI_MAX_CONCURRENCY)
+        self._in_flight = {}
+        self._in_flight_lock = threading.Lock()
+
+    @property
+    def backend(self):
+        # Built on first use so importing this module never loads the SDK
+        if self._backend is None:
+            with self._backend_lock:
+                if self._backend is None:
+                    self._backend = import_string(settings.GEMINI_BACKEND)()
+        return self._backend
+
+    @staticmethod
+    def normalize(prompt):
+        return re.sub(r"\s+", " ", prompt).strip()
+
+    def cache_key(self, prompt):
+        return hashlib.sha256(prompt.encode()).hexdigest()
+
+    def generate(self, prompt):
+        prompt = self.normalize(prompt)
+        key = self.cache_key(prompt)
+
+        cached = self.cache.get(key)
+        if cached is not None:
+            return cached
+
+        with self._in_flight_lock:
+            flight = self._in_flight.get(key)
+            leader = flight is None
+            if leader:
+                flight = self._in_flight[key] = _InFlight()
+
+        if not leader:
+            # An identical prompt is already being generated: wait for its result
+            if not flight.done.wait(settings.GEMINI_REQUEST_TIMEOUT + settings.GEMINI_QUEUE_TIMEOUT):
+                raise GenerationBusy("Timed out waiting for an identical request.")
+            if flight.error:
+                raise flight.error
+            return flight.result
+
+        try:
+            flight.result = self._call_backend(prompt)
+            self.cache.set(key, flight.result)
+            return flight.result
+        except GenerationError as e:
+            flight.error = e
+            raise
+        finally:
+            with self._in_flight_lock:
+                self._in_flight.pop(key, None)
+            flight.done.set()
+
+    def _call_backend(self, prompt):
+        if not self.slots.acquire(timeout=settings.GEMINI_QUEUE_TIMEOUT):
+            raise GenerationBusy("Too many generation requests in progress, try again shortly.")
+        try:
+            return self.backend.generate(prompt, timeout=settings.GEMINI_REQUEST_TIMEOUT)
+        except GenerationError:
+            raise
+        except Exception as e:
+            raise GenerationError(str(e)) from e
+        finally:
+            self.slots.release()
+
+
+generation_service = GenerationService()
 
-# Configure Gemini with your API key
-genai.configure(api_key=settings.GEMINI_API_KEY)
 
 def generate_text(prompt: str) -> str:
     """
     Generates short text from Gemini AI based on the prompt.
     """
     try:
-        model = genai.GenerativeModel("gemini-1.5-flash")  # lightweight & fast
-        response = model.generate_content(prompt)
-        return response.text.strip()
-    except Exception as e:
+        return generation_service.generate(prompt)
+    except GenerationError as e:
         return f"Error: {str(e)}"
@@ -0,0 +1,92 @@
+from django.db import transaction
+
+from .models import User, UserClosure
+
+
+def add_user(user):
+    """
+    Links a newly created user under its creator: a self row plus one row per ancestor of the creator.
+    """
+    links = [UserClosure(ancestor_id=user.pk, descendant_id=user.pk, depth=0)]
+    if user.created_by_id:
+        links += [
+            UserClosure(ancestor_id=ancestor_id, descendant_id=user.pk, depth=depth + 1)
+            for ancestor_id, depth in UserClosure.objects.filter(
+                descendant_id=user.created_by_id
+            ).values_list('ancestor_id', 'depth')
+        ]
+    UserClosure.objects.bulk_create(links, ignore_conflicts=True)
+
+
+def add_users(users, created_by_id):
+    """
+    Bulk variant of add_user for users inserted with bulk_create under one creator.
+    """
+    ancestors = []
+    if created_by_id:
+        ancestors = list(UserClosure.objects.filter(descendant_id=created_by_id).values_list('ancestor_id', 'depth'))
+    links = []
+    for user in users:
+        links.append(UserClosure(ancestor_id=user.pk, descendant_id=user.pk, depth=0))
+        links += [
+            UserClosure(ancestor_id=ancestor_id, descendant_id=user.pk, depth=depth + 1)
+            for ancestor_id, depth in ancestors
+        ]
+    UserClosure.objects.bulk_create(links, batch_size=1000)
+
+
+def subtree(user_id):
+    return UserClosure.objects.filter(ancestor_id=user_id)
+
+
+def would_create_cycle(user_id, new_parent_id):
+    return bool(new_parent_id) and subtree(user_id).filter(descendant_id=new_parent_id).exists()
+
+
+@transaction.atomic
+def move_user(user_id, new_parent_id):
+    """
+    Re-parents a user's whole subtree: drops the links from its old ancestors,
+    then links every new ancestor to every subtree member.
+    """
+    subtree_ids = subtree(user_id).values('descendant_id')
+    UserClosure.objects.filter(descendant_id__in=subtree_ids).exclude(ancestor_id__in=subtree_ids).delete()
+
+    if not new_parent_id:
+        return
+    members = list(subtree(user_id).values_list('descendant_id', 'depth'))
+    ancestors = list(UserClosure.objects.filter(descendant_id=new_parent_id).values_list('ancestor_id', 'depth'))
+    UserClosure.objects.bulk_create([
+        UserClosure(ancestor_id=ancestor_id, descendant_id=member_id, depth=ancestor_depth + member_depth + 1)
+        for ancestor_id, ancestor_depth in ancestors
+        for member_id, member_depth in members
+    ])
+
+
+def detach_children(user_id):
+    """
+    Before a user is deleted: created_by is SET_NULL on their children without
+    signals, so their subtrees are cut loose from this user and its ancestors here.
+    """
+    strict_descendants = subtree(user_id).filter(depth__gt=0).values('descendant_id')
+    ancestors = UserClosure.objects.filter(descendant_id=user_id).values('ancestor_id')
+    UserClosure.objects.filter(descendant_id__in=strict_descendants, ancestor_id__in=ancestors).delete()
+
+
+@transaction.atomic
+def rebuild_closure():
+    """
+    Recomputes the whole table from User.created_by in memory. Returns the number of rows written.
+    """
+    parents = dict(User.objects.values_list('pk', 'created_by_id'))
+    links = []
+    for user_id in parents:
+        ancestor_id, depth, seen = user_id, 0, set()
+        while ancestor_id and ancestor_id not in seen:
+            seen.add(ancestor_id)
+            links.append(UserClosure(ancestor_id=ancestor_id, descendant_id=user_id, depth=depth))
+            ancestor_id, depth = parents.get(ancestor_id), depth + 1
+
+    UserClosure.objects.all().delete()
+    UserClosure.objects.bulk_create(links, batch_size=1000)
+    return len(links)
@@ -0,0 +1,50 @@
+import time
+
+from django.core.management.base import BaseCommand, CommandError
+
+from accounts.bulk_import import UserImporter
+from accounts.models import User
+from MBP.utils import parse_rows
+
+
+class Command(BaseCommand):
+    help = 'Bulk import users (and Staff rows for rows with a hotel_slug) from a CSV or JSON file'
+
+    def add_arguments(self, parser):
+        parser.add_argument('path', help='CSV with a header row, or a JSON array of row objects')
+        parser.add_argument('--created-by', help='Email of the user the imported accounts are created under')
+        parser.add_argument('--batch-size', type=int, default=None, help='Rows validated and inserted per batch')
+        parser.add_argument('--dry-run', action='store_true', help='Validate only, write nothing')
+
+    def handle(self, *args, **options):
+        created_by = None
+        if options['created_by']:
+            try:
+                created_by = User.objects.get(email=options['created_by'])
+            except User.DoesNotExist:
+                raise CommandError(f"No user with email {options['created_by']}")
+
+        try:
+            with open(options['path'], 'rb') as f:
+                rows = parse_rows(f.read(), options['path'])
+        except (OSError, ValueError, UnicodeDecodeError) as e:
+            raise CommandError(f"Could not read {options['path']}: {e}")
+
+        start = time.perf_counter()
+        result = UserImporter(
+            created_by=created_by, batch_size=options['batch_size'], dry_run=options['dry_run'],
+            parallel_hashing=True,
+        ).run(rows)
+        elapsed = time.perf_counter() - start
+
+        for error in result['errors']:
+            messages = '; '.join(
+                f"{field}: {' '.join(str(message) for message in field_errors)}"
+                for field, field_errors in error['errors'].items()
+            )
+            self.stderr.write(f"Row {error['row']}: {messages}")
+        verb = 'Validated' if options['dry_run'] else 'Imported'
+        self.stdout.write(self.style.SUCCESS(
+            f"{verb} {result['created']} users ({result['staff_created']} staff) from {len(rows)} rows "
+            f"in {elapsed:.2f}s; {result['failed']} rows rejected."
+        ))
@@ -0,0 +1,11 @@
+from django.core.management.base import BaseCommand
+
+from accounts.hierarchy import rebuild_closure
+
+
+class Command(BaseCommand):
+    help = 'Rebuild the UserClosure table from User.created_by (entrypoint.sh runs it on every deploy)'
+
+    def handle(self, *args, **options):
+        rows = rebuild_closure()
+        self.stdout.write(self.style.SUCCESS(f"Wrote {rows} user closure rows."))
@@ -1,9 +1,23 @@
 from django.contrib.auth.models import AbstractBaseUser, PermissionsMixin, BaseUserManager
 from django.db import models
+from django.db.models.functions import Upper
 from django.utils.text import slugify
+from MBP.slugs import unique_slug
 import uuid
 
 class UserManager(BaseUserManager):
+    def managed_by(self, user, include_self=False):
+        """
+        Users in `user`'s created_by subtree at any depth, through one indexed join on UserClosure.
+        Direct children (and `user` itself with include_self) are matched on their own columns
+        too, so a missing closure row never hides them.
+        """
+        subtree = self.filter(ancestor_links__ancestor=user, ancestor_links__depth__gte=1).values('pk')
+        scope = models.Q(pk__in=subtree) | models.Q(created_by=user)
+        if include_self:
+            scope |= models.Q(pk=user.pk)
+        return self.filter(scope)
+
     def create_user(self, email, password=None, **extra_fields):
         if not email:
             raise ValueError("The Email field must be set")
@@ -47,13 +61,7 @@ class User(AbstractBaseUser, PermissionsMixin):
     
     def save(self, *args, **kwargs):
         if not self.slug:
-            base_slug = slugify(self.full_name or self.email.split('@')[0])
-            slug = base_slug
-            count = 1
-            while User.objects.filter(slug=slug).exists():
-                slug = f"{base_slug}-{count}"
-                count += 1
-            self.slug = slug
+            self.slug = unique_slug(self, slugify(self.full_name or self.email.split('@')[0]))
             
         self.is_active = self.is_email_verified and self.is_phone_verified
         super().save(*args, **kwargs)
@@ -61,6 +69,10 @@ class User(AbstractBaseUser, PermissionsMixin):
     class Meta:
         verbose_name = "User"
         verbose_name_plural = "Users"
+        indexes = [
+            # Case-insensitive address lookups filter on UPPER(email) (e.g. the audit log ?user= filter)
+            models.Index(Upper('email'), name='user_email_upper_idx'),
+        ]
 
 
 class Profile(models.Model):
@@ -79,4 +91,37 @@ class Profile(models.Model):
         super().save(*args, **kwargs)
 
     def __str__(self):
-        return self.user.full_name
\ No newline at end of file
+        return self.user.full_name
+
+
+class RevokedAccessToken(models.Model):
+    """
+    Access tokens revoked before expiry (logout). Rows past expires_at are purged daily.
+    """
+    jti = models.CharField(max_length=255, unique=True)
+    expires_at = models.DateTimeField(db_index=True)
+    created_at = models.DateTimeField(auto_now_add=True)
+
+    def __str__(self):
+        return self.jti
+
+
+class UserClosure(models.Model):
+    """
+    Closure table of the created_by tree: one row per (ancestor, descendant) pair,
+    including each user's own depth-0 row. Maintained by accounts.hierarchy.
+    """
+    ancestor = models.ForeignKey(User, on_delete=models.CASCADE, related_name='descendant_links')
+    descendant = models.ForeignKey(User, on_delete=models.CASCADE, related_name='ancestor_links')
+    depth = models.PositiveIntegerField()
+
+    class Meta:
+        constraints = [
+            models.UniqueConstraint(fields=['ancestor', 'descendant'], name='user_closure_unique_pair'),
+        ]
+        indexes = [
+            models.Index(fields=['ancestor', 'depth'], name='user_closure_ancestor_idx'),
+        ]
+
+    def __str__(self):
+        return f"{self.ancestor_id} → {self.descendant_id} ({self.depth})"
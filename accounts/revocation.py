@@ -0,0 +1,134 @@
+import datetime
+import hashlib
+import math
+import threading
+import time
+
+from django.conf import settings
+from django.core.cache import cache
+from django.db import transaction
+from django.utils import timezone
+
+from MBP.versions import SharedVersion
+from .models import RevokedAccessToken
+
+BLOOM_FALSE_POSITIVE_RATE = 0.01
+BLOOM_MIN_BITS = 8192
+
+# Changed on every revocation; workers rebuild their filter when it moves
+REVOCATION_GENERATION_KEY = 'accounts:revocation:generation'
+
+
+def revoked_cache_key(jti):
+    return f"blacklisted_{jti}"
+
+
+class BloomFilter:
+    """
+    Fixed-size bloom filter over strings, using double hashing of one blake2b digest.
+    """
+
+    def __init__(self, capacity):
+        capacity = max(capacity, 1)
+        bits = -capacity * math.log(BLOOM_FALSE_POSITIVE_RATE) / math.log(2) ** 2
+        self.size = max(BLOOM_MIN_BITS, int(bits))
+        self.hashes = max(1, round(self.size / capacity * math.log(2)))
+        self.bits = bytearray((self.size + 7) // 8)
+
+    def _positions(self, value):
+        digest = hashlib.blake2b(value.encode(), digest_size=16).digest()
+        h1 = int.from_bytes(digest[:8], 'little')
+        h2 = int.from_bytes(digest[8:], 'little') | 1
+        return [(h1 + i * h2) % self.size for i in range(self.hashes)]
+
+    def add(self, value):
+        for position in self._positions(value):
+            self.bits[position >> 3] |= 1 << (position & 7)
+
+    def __contains__(self, value):
+        return all(self.bits[position >> 3] & (1 << (position & 7)) for position in self._positions(value))
+
+
+class RevocationFilter:
+    """
+    Per-worker bloom filter of revoked access-token JTIs.
+    Rebuilt from RevokedAccessToken when the shared revocation generation changes
+    (any worker revoked a token) and at least every ACCESS_TOKEN_REVOCATION_REFRESH
+    seconds; revocations made in this worker are added immediately. The generation
+    is a SharedVersion, so requests only reach the cache once per SHARED_VERSION_REFRESH.
+    """
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._bloom = None
+        self._built_at = 0.0
+        self._generation = None
+        self.generation = SharedVersion(REVOCATION_GENERATION_KEY)
+
+    def refresh(self):
+        jtis = list(
+            RevokedAccessToken.objects.filter(expires_at__gt=timezone.now()).values_list('jti', flat=True)
+        )
+        # Headroom so tokens revoked before the next rebuild keep the error rate down
+        bloom = BloomFilter(len(jtis) * 2)
+        for jti in jtis:
+            bloom.add(jti)
+        self._bloom = bloom
+        self._built_at = time.monotonic()
+
+    def _stale(self, generation):
+        return (
+            self._bloom is None
+            or generation != self._generation
+            or time.monotonic() - self._built_at >= settings.ACCESS_TOKEN_REVOCATION_REFRESH
+        )
+
+    def _current(self):
+        generation = self.generation.get()
+        if self._stale(generation):
+            with self._lock:
+                if self._stale(generation):
+                    self.refresh()
+                    self._generation = generation
+        return self._bloom
+
+    def add(self, jti):
+        self._current().add(jti)
+
+    def might_be_revoked(self, jti):
+        return jti in self._current()
+
+
+revocation_filter = RevocationFilter()
+
+
+def revoke_access_token(token):
+    """
+    Revokes an access token until it expires: stored for the filter rebuilds, cached for exact checks.
+    """
+    jti = token['jti']
+    expires_at = datetime.datetime.fromtimestamp(token['exp'], tz=datetime.timezone.utc)
+    RevokedAccessToken.objects.get_or_create(jti=jti, defaults={'expires_at': expires_at})
+    cache.set(revoked_cache_key(jti), True, timeout=max(1, (expires_at - timezone.now()).total_seconds()))
+    revocation_filter.add(jti)
+    # Other workers pick the row up on their next generation check
+    transaction.on_commit(revocation_filter.generation.bump)
+
+
+def is_access_token_revoked(jti):
+    """
+    Cheap on the common path: only bloom filter hits pay for the exact cache / DB lookup.
+    """
+    if not jti or not revocation_filter.might_be_revoked(jti):
+        return False
+    revoked = cache.get(revoked_cache_key(jti))
+    if revoked is None:
+        revoked = RevokedAccessToken.objects.filter(jti=jti, expires_at__gt=timezone.now()).exists()
+        # False positives are cached too, so a colliding token hits the DB once per refresh window
+        cache.set(revoked_cache_key(jti), revoked, timeout=settings.ACCESS_TOKEN_REVOCATION_REFRESH)
+    return revoked
+
+
+def purge_expired_revocations():
+    deleted, _ = RevokedAccessToken.objects.filter(expires_at__lte=timezone.now()).delete()
+    return deleted
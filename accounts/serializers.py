@@ -29,7 +29,7 @@ class RegisterUserSerializer(serializers.ModelSerializer):
         user.is_active = False
         user.is_email_verified = False
         user.is_phone_verified = True
-        user.role = Role.objects.get_or_create(name="Customer")
+        user.role, _ = Role.objects.get_or_create(name="Customer")
         user.created_by = None
         user.save()
         return user
@@ -0,0 +1,75 @@
+from django.db.models.signals import post_init, pre_save, post_save, pre_delete, post_delete
+from django.dispatch import receiver
+
+from Hotel.models import Hotel
+from staff.models import Staff
+from . import hierarchy
+from .authentication import invalidate_user_snapshot
+from .models import User
+
+_UNKNOWN = object()
+
+
+@receiver(post_save, sender=User)
+@receiver(post_delete, sender=User)
+def invalidate_user(sender, instance, **kwargs):
+    invalidate_user_snapshot(instance.pk)
+
+
+@receiver(pre_save, sender=Hotel)
+@receiver(pre_save, sender=Staff)
+def remember_previous_user(sender, instance, **kwargs):
+    # A hotel or staff record moved to another user leaves the previous user's snapshot stale
+    field = 'owner_id' if sender is Hotel else 'user_id'
+    instance._previous_snapshot_user_id = (
+        sender.objects.filter(pk=instance.pk).values_list(field, flat=True).first()
+        if not instance._state.adding else None
+    )
+
+
+@receiver(post_save, sender=Hotel)
+@receiver(post_delete, sender=Hotel)
+def invalidate_hotel_owner(sender, instance, **kwargs):
+    invalidate_user_snapshot(instance.owner_id, getattr(instance, '_previous_snapshot_user_id', None))
+
+
+@receiver(post_save, sender=Staff)
+@receiver(post_delete, sender=Staff)
+def invalidate_staff_user(sender, instance, **kwargs):
+    invalidate_user_snapshot(instance.user_id, getattr(instance, '_previous_snapshot_user_id', None))
+
+
+@receiver(post_init, sender=User)
+def remember_created_by(sender, instance, **kwargs):
+    # Deferred (e.g. .only()) loads leave it unknown, and check_reparent falls back to a SELECT
+    instance._initial_created_by_id = instance.__dict__.get('created_by_id', _UNKNOWN)
+
+
+@receiver(pre_save, sender=User)
+def check_reparent(sender, instance, update_fields=None, **kwargs):
+    instance._closure_reparented = False
+    if instance._state.adding or (update_fields is not None and 'created_by' not in update_fields):
+        return
+    initial = getattr(instance, '_initial_created_by_id', _UNKNOWN)
+    if update_fields is None and initial is not _UNKNOWN and initial == instance.created_by_id:
+        return
+    # created_by is being written and may have changed: confirm against the stored value
+    previous = User.objects.filter(pk=instance.pk).values_list('created_by_id', flat=True).first()
+    if previous != instance.created_by_id:
+        if hierarchy.would_create_cycle(instance.pk, instance.created_by_id):
+            raise ValueError(f"{instance.email} cannot be created by one of their own managed users.")
+        instance._closure_reparented = True
+
+
+@receiver(post_save, sender=User)
+def update_closure(sender, instance, created, **kwargs):
+    if created:
+        hierarchy.add_user(instance)
+    elif getattr(instance, '_closure_reparented', False):
+        hierarchy.move_user(instance.pk, instance.created_by_id)
+    instance._initial_created_by_id = instance.created_by_id
+
+
+@receiver(pre_delete, sender=User)
+def detach_managed_users(sender, instance, **kwargs):
+    hierarchy.detach_children(instance.pk)
@@ -0,0 +1,11 @@
+from celery import shared_task
+
+from .revocation import purge_expired_revocations
+
+
+@shared_task
+def purge_expired_revoked_tokens():
+    """
+    Deletes revocation rows whose access tokens have expired anyway.
+    """
+    return f"Purged {purge_expired_revocations()} expired revoked tokens."
@@ -1,3 +1,174 @@
-from django.test import TestCase
+import time
+from contextlib import ExitStack
+from unittest import mock
 
-# Create your tests here.
+from django.db import connection
+
+from django.core.cache import cache
+from django.test import TestCase, override_settings
+from django.test.utils import CaptureQueriesContext
+from django.urls import reverse
+from rest_framework.test import APIClient
+from rest_framework_simplejwt.exceptions import AuthenticationFailed
+
+from .authentication import CachedJWTAuthentication
+from MBP.models import AuditLog, Role
+from MBP.tests import grant, make_user
+from MBP.tokens import PermissionRefreshToken
+from .hierarchy import rebuild_closure
+from .models import User, UserClosure
+from .revocation import RevocationFilter, revoke_access_token
+
+
+class RevocationTests(TestCase):
+    def setUp(self):
+        cache.clear()
+
+    @override_settings(SHARED_VERSION_REFRESH=5, ACCESS_TOKEN_REVOCATION_REFRESH=300)
+    def test_revocation_reaches_other_workers_before_the_refresh_interval(self):
+        # A second worker's filter, built before the token is revoked
+        other_worker = RevocationFilter()
+        self.assertFalse(other_worker.might_be_revoked('jti-1'))
+
+        with self.captureOnCommitCallbacks(execute=True):
+            revoke_access_token({'jti': 'jti-1', 'exp': int(time.time()) + 3600})
+
+        # Seen at the next generation check, long before the 300 s rebuild
+        other_worker.generation._read_at -= 5
+        self.assertTrue(other_worker.might_be_revoked('jti-1'))
+
+    def test_authenticated_request_makes_no_cache_round_trip(self):
+        role = Role.objects.create(name='Reader')
+        grant(role, 'AuditLog', 'r')
+        user = make_user('reader@example.com', role=role)
+        client = APIClient()
+        client.credentials(HTTP_AUTHORIZATION=f'Bearer {PermissionRefreshToken.for_user(user).access_token}')
+        self.assertEqual(client.get('/api/logs/').status_code, 200)
+
+        shared = [
+            mock.patch(f'{module}.cache', wraps=cache)
+            for module in ('MBP.versions', 'MBP.permissions', 'accounts.authentication', 'accounts.revocation')
+        ]
+        with CaptureQueriesContext(connection) as queries, ExitStack() as stack:
+            mocks = [stack.enter_context(patch) for patch in shared]
+            self.assertEqual(client.get('/api/logs/').status_code, 200)
+
+        self.assertEqual([m.mock_calls for m in mocks], [[]] * len(mocks))
+        # No cache table, revocation, identity or permission query: only the view's own
+        tables = ('"hms_cache"', '"accounts_revokedaccesstoken"', '"MBP_role', '"MBP_appmodel"')
+        self.assertEqual([q['sql'] for q in queries if any(table in q['sql'] for table in tables)], [])
+
+
+class UserSnapshotTests(TestCase):
+    def setUp(self):
+        cache.clear()
+        self.user = User.objects.create_user(email='guest@example.com', password=None, is_email_verified=True)
+        self.token = {'user_id': str(self.user.pk)}
+
+    def test_warm_snapshot_costs_no_query(self):
+        authentication = CachedJWTAuthentication()
+        authentication.get_user(self.token)
+        with self.assertNumQueries(0), mock.patch('accounts.authentication.cache') as shared_cache:
+            user = authentication.get_user(self.token)
+            self.assertIsNone(user.role)
+        self.assertEqual(user.pk, self.user.pk)
+        self.assertEqual(shared_cache.mock_calls, [])
+
+    def test_deactivated_user_is_rejected_once_committed(self):
+        authentication = CachedJWTAuthentication()
+        self.assertEqual(authentication.get_user(self.token).pk, self.user.pk)
+
+        with self.captureOnCommitCallbacks(execute=True):
+            self.user.is_email_verified = False
+            self.user.save()
+
+        with self.assertRaises(AuthenticationFailed):
+            authentication.get_user(self.token)
+
+
+class GeminiTextTests(TestCase):
+    def test_non_string_prompt_is_rejected(self):
+        client = APIClient()
+        for prompt in (['a', 'list'], {'nested': 'prompt'}, 42, '   '):
+            response = client.post(reverse('gemini-generate'), {'prompt': prompt}, format='json')
+            self.assertEqual(response.status_code, 400, prompt)
+
+
+class ClosureScopeTests(TestCase):
+    def setUp(self):
+        cache.clear()
+        self.role = Role.objects.create(name='Manager')
+        grant(self.role, 'User', 'r')
+        grant(self.role, 'AuditLog', 'r')
+        self.admin = make_user('admin@example.com', role=self.role)
+        self.sub_admin = make_user('sub@example.com', role=self.role, created_by=self.admin)
+        self.clerk = make_user('clerk@example.com', role=self.role, created_by=self.sub_admin)
+        self.outsider = make_user('outsider@example.com', role=self.role)
+        self.client = APIClient()
+
+    def visible_emails(self, user):
+        self.client.force_authenticate(user)
+        response = self.client.get('/api/users/')
+        self.assertEqual(response.status_code, 200)
+        rows = response.data['results'] if isinstance(response.data, dict) else response.data
+        return sorted(row['email'] for row in rows)
+
+    def test_whole_subtree_is_visible(self):
+        self.assertEqual(self.visible_emails(self.admin), ['clerk@example.com', 'sub@example.com'])
+        self.assertEqual(self.visible_emails(self.sub_admin), ['clerk@example.com'])
+        self.assertEqual(self.visible_emails(self.clerk), [])
+
+    def test_reparenting_moves_the_subtree(self):
+        self.sub_admin.created_by = self.outsider
+        self.sub_admin.save()
+        self.assertEqual(self.visible_emails(self.admin), [])
+        self.assertEqual(self.visible_emails(self.outsider), ['clerk@example.com', 'sub@example.com'])
+
+        self.admin.created_by = self.clerk
+        self.admin.save()
+        self.outsider.created_by = self.clerk
+        with self.assertRaises(ValueError):
+            self.outsider.save()
+
+    def test_missing_closure_rows_do_not_hide_own_records(self):
+        UserClosure.objects.all().delete()
+        log = AuditLog.objects.create(user=self.sub_admin, action='login')
+
+        self.assertEqual(self.visible_emails(self.sub_admin), ['clerk@example.com'])
+        response = self.client.get('/api/logs/')
+        self.assertEqual([row['id'] for row in response.data['results']], [log.pk])
+
+        rebuild_closure()
+        self.assertEqual(self.visible_emails(self.admin), ['clerk@example.com', 'sub@example.com'])
+
+    def test_saving_without_changing_created_by_skips_the_lookup(self):
+        self.clerk.full_name = 'Clerk'
+        with CaptureQueriesContext(connection) as queries:
+            self.clerk.save()
+        self.assertFalse([q for q in queries if q['sql'].startswith('SELECT "accounts_user"."created_by_id"')])
+
+
+@override_settings(
+    BULK_IMPORT_MAX_ROWS=20, BULK_IMPORT_HASH_WORKERS=4,
+    PASSWORD_HASHERS=['django.contrib.auth.hashers.MD5PasswordHasher'],
+)
+class BulkImportViewTests(TestCase):
+    def setUp(self):
+        cache.clear()
+        self.client = APIClient()
+        self.client.force_authenticate(User.objects.create_superuser(email='root@example.com', password=None))
+
+    def rows(self, count):
+        return [{'email': f'user{n}@example.com', 'password': 'Secret-123'} for n in range(count)]
+
+    def test_passwords_are_hashed_in_process(self):
+        with mock.patch('accounts.bulk_import.ProcessPoolExecutor', side_effect=AssertionError('forked a pool')):
+            response = self.client.post('/api/users/bulk-import/', {'rows': self.rows(20)}, format='json')
+        self.assertEqual(response.status_code, 201)
+        self.assertEqual(response.data['created'], 20)
+        self.assertTrue(User.objects.get(email='user7@example.com').check_password('Secret-123'))
+
+    def test_rows_over_the_cap_are_rejected(self):
+        response = self.client.post('/api/users/bulk-import/', {'rows': self.rows(21)}, format='json')
+        self.assertEqual(response.status_code, 400)
+        self.assertFalse(User.objects.filter(email='user0@example.com').exists())
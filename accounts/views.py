@@ -6,12 +6,16 @@ from rest_framework.permissions import IsAuthenticated
 from MBP.permissions import HasModelPermission
 from MBP.models import Role, RoleModelPermission
 from accounts.serializers import UserSerializer, RegisterUserSerializer
+from accounts.bulk_import import UserImporter
+from rest_framework.parsers import MultiPartParser, JSONParser
 from rest_framework.views import APIView
 from django.shortcuts import get_object_or_404
-from MBP.utils import log_audit
+from MBP.utils import log_audit, parse_rows
 from rest_framework.permissions import AllowAny
 from MBP.views import ProtectedModelViewSet
-from django.core.mail import send_mail
+from django.db import transaction
+from django.db.models import Q
+from Communication.outbox import queue_email
 from django.conf import settings
 import random
 from django.contrib.auth import get_user_model
@@ -19,6 +23,7 @@ from django.contrib.auth import get_user_model
 User = get_user_model()
 
 from rest_framework_simplejwt.tokens import RefreshToken
+from MBP.tokens import PermissionRefreshToken
 from rest_framework.throttling import UserRateThrottle
 
 from allauth.socialaccount.providers.google.views import GoogleOAuth2Adapter
@@ -39,6 +44,7 @@ class UserViewSet(ProtectedModelViewSet):
 
         self.permission_code = {
             'create': 'c',
+            'bulk_import': 'c',
             'update': 'u',
             'partial_update': 'u',
             'destroy': 'd',
@@ -48,9 +54,45 @@ class UserViewSet(ProtectedModelViewSet):
 
     def get_queryset(self):
         user = self.request.user
+        queryset = User.objects.select_related('role', 'created_by').order_by('-date_joined')
         if user.is_superuser:
-            return User.objects.all().order_by('-date_joined')
-        return User.objects.filter(created_by=user).order_by('-date_joined')
+            return queryset
+        # Every user in the created_by subtree, at any depth; direct children even without closure rows
+        return queryset.filter(Q(created_by=user) | Q(pk__in=User.objects.managed_by(user).values('pk')))
+
+    @action(detail=False, methods=['post'], url_path='bulk-import', parser_classes=[MultiPartParser, JSONParser])
+    def bulk_import(self, request):
+        """
+        Creates many users (and Staff rows for those with a hotel_slug) in one call.
+        Send a CSV/JSON `file` upload or a JSON body {"rows": [...]}; add dry_run=true to only validate.
+        Invalid rows are reported by row number and skipped. Passwords are hashed in this
+        process, so at most BULK_IMPORT_MAX_ROWS rows are accepted; use import_users for more.
+        """
+        upload = request.FILES.get('file')
+        try:
+            if upload:
+                rows = parse_rows(upload.read(), upload.name)
+            else:
+                rows = parse_rows(request.data.get('rows', []))
+        except (ValueError, UnicodeDecodeError) as e:
+            return Response({"error": f"Could not read rows: {e}"}, status=status.HTTP_400_BAD_REQUEST)
+        if len(rows) > settings.BULK_IMPORT_MAX_ROWS:
+            return Response(
+                {"error": f"At most {settings.BULK_IMPORT_MAX_ROWS} rows per request; use the import_users command for larger files."},
+                status=status.HTTP_400_BAD_REQUEST,
+            )
+
+        dry_run = str(request.data.get('dry_run', '')).lower() in ('1', 'true', 'yes')
+        result = UserImporter(created_by=request.user, dry_run=dry_run).run(rows)
+
+        if result['created'] and not dry_run:
+            log_audit(
+                request=request,
+                action="create",
+                model_name="User",
+                details=f"Bulk imported {result['created']} users ({result['staff_created']} staff), {result['failed']} rows rejected.",
+            )
+        return Response(result, status=status.HTTP_201_CREATED if result['created'] and not dry_run else status.HTTP_200_OK)
 
     @action(detail=True, methods=['patch'], url_path='assign-role', permission_classes=[HasModelPermission])
     def assign_role(self, request, slug=None):
@@ -90,7 +132,17 @@ class RegisterView(APIView):
     def post(self, request):
         serializer = RegisterUserSerializer(data=request.data, context={"request": request})
         if serializer.is_valid():
-            user = serializer.save()
+            with transaction.atomic():
+                user = serializer.save()
+
+                # ✅ Queue email verification (sent by the outbox worker once committed)
+                verification_link = f"http://127.0.0.1:8000/api/verify-email/{user.slug}/"
+                queue_email(
+                    subject="Verify your email",
+                    message=f"Hello {user.full_name},\n\nClick here to verify your email: {verification_link}",
+                    from_email=settings.DEFAULT_FROM_EMAIL,
+                    recipient_list=[user.email],
+                )
 
             # # ✅ Generate OTP for phone
             # otp = str(random.randint(100000, 999999))
@@ -99,16 +151,6 @@ class RegisterView(APIView):
             # cache.set(f"otp_{user.phone}", otp, timeout=300)
             # print(f"DEBUG: OTP for {user.phone} is {otp}")  # Replace with Twilio SMS later
 
-            # ✅ Send email verification
-            verification_link = f"http://127.0.0.1:8000/api/verify-email/{user.slug}/"
-            send_mail(
-                subject="Verify your email",
-                message=f"Hello {user.full_name},\n\nClick here to verify your email: {verification_link}",
-                from_email=settings.DEFAULT_FROM_EMAIL,
-                recipient_list=[user.email],
-                fail_silently=False,
-            )
-
             # 🔐 Audit log
             log_audit(
                 request=request,
@@ -188,7 +230,7 @@ class LoginView(APIView):
 
         # Step 1: Check if user exists
         try:
-            user = User.objects.get(email=email)
+            user = User.objects.select_related("role").get(email=email)
         except User.DoesNotExist:
             return Response(
                 {"error": "Invalid credentials"},
@@ -223,8 +265,8 @@ class LoginView(APIView):
                 status=status.HTTP_403_FORBIDDEN
             )
 
-        # Step 6: Issue JWT tokens
-        refresh = RefreshToken.for_user(user)
+        # Step 6: Issue JWT tokens (access token carries the role's permission bitmap)
+        refresh = PermissionRefreshToken.for_user(user)
 
         # Step 7: Audit log
         log_audit(
@@ -239,11 +281,13 @@ class LoginView(APIView):
         role = user.role
         accessible_models = []
         if role:
-            role_perms = RoleModelPermission.objects.filter(role=role)
-            for rp in role_perms:
+            role_perms = RoleModelPermission.objects.filter(role=role).values_list(
+                "model__name", "permission_type__code"
+            )
+            for model_name, code in role_perms:
                 accessible_models.append({
-                    "model_name": rp.model.name,
-                    "permission": rp.permission_type.code
+                    "model_name": model_name,
+                    "permission": code
                 })
 
         # Step 9: Return response
@@ -262,6 +306,7 @@ class LoginView(APIView):
                 
 from rest_framework_simplejwt.tokens import TokenError, AccessToken
 from django.core.cache import cache
+from accounts.revocation import revoke_access_token
 import datetime
 
 
@@ -280,14 +325,8 @@ class LogoutView(APIView):
             token = RefreshToken(refresh_token)
             token.blacklist()
 
-            # Blacklist access token by adding its jti to cache
-            access = AccessToken(access_token)
-            jti = access['jti']
-            exp = access['exp']
-
-            # Calculate expiry time from token
-            expiry_time = datetime.datetime.fromtimestamp(exp) - datetime.datetime.now()
-            cache.set(f"blacklisted_{jti}", True, timeout=expiry_time.total_seconds())
+            # Revoke the access token for the rest of its lifetime
+            revoke_access_token(AccessToken(access_token))
 
             log_audit(
                 request=request,
@@ -387,15 +426,22 @@ class LogoutView(APIView):
 from rest_framework.views import APIView
 from rest_framework.response import Response
 from rest_framework.permissions import AllowAny
-from .gemini_utils import generate_text
+from .gemini_utils import generation_service, GenerationBusy, GenerationError
 
 class GeminiTextAPIView(APIView):
     permission_classes = [AllowAny]
 
     def post(self, request):
         prompt = request.data.get("prompt", "")
-        if not prompt:
+        if not isinstance(prompt, str):
+            return Response({"error": "Prompt must be a string"}, status=400)
+        if not prompt.strip():
             return Response({"error": "Prompt is required"}, status=400)
-        
-        generated_text = generate_text(prompt)
+
+        try:
+            generated_text = generation_service.generate(prompt)
+        except GenerationBusy as e:
+            return Response({"error": str(e)}, status=status.HTTP_503_SERVICE_UNAVAILABLE)
+        except GenerationError as e:
+            return Response({"error": f"Error: {str(e)}"}, status=status.HTTP_502_BAD_GATEWAY)
         return Response({"result": generated_text})
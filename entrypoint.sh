@@ -6,8 +6,17 @@ python manage.py makemigrations  # Removed --noinput
 echo "✅ Applying database migrations..."
 python manage.py migrate --noinput
 
+echo "✅ Creating cache table..."
+python manage.py createcachetable
+
+echo "✅ Rebuilding user closure table..."
+python manage.py rebuild_user_closure
+
+echo "✅ Rebuilding room-night inventory..."
+python manage.py rebuild_room_nights
+
 echo "✅ Populating app models..."
-python manage.py populate_app_models || echo "⚠️ populate_app_models failed (maybe already populated)"
+python manage.py populate_app_models --seed-permissions || echo "⚠️ populate_app_models failed"
 
 echo "🚀 Starting Gunicorn server..."
 exec gunicorn HMS.wsgi:application --bind 0.0.0.0:8000
@@ -4,6 +4,13 @@ from django.apps import AppConfig
 class StaffConfig(AppConfig):
     default_auto_field = 'django.db.models.BigAutoField'
     name = 'staff'
+
+    audited_models = {
+        'Staff': (),
+        'Attendance': (),
+        'Payroll': (),
+        'Leave': (),
+    }
     
     def ready(self):
         import staff.signals
@@ -2,6 +2,7 @@ import uuid
 from django.db import models
 from django.conf import settings
 from django.utils.text import slugify
+from MBP.slugs import unique_slug
 from decimal import Decimal
 from Hotel.models import Hotel
 from datetime import datetime, date
@@ -41,13 +42,7 @@ class Staff(models.Model):
 
     def save(self, *args, **kwargs):
         if not self.slug:
-            base_slug = slugify(self.user.full_name or str(self.user.id))
-            slug = base_slug
-            num = 1
-            while Staff.objects.filter(slug=slug).exists():
-                slug = f"{base_slug}-{num}"
-                num += 1
-            self.slug = slug
+            self.slug = unique_slug(self, slugify(self.user.full_name or str(self.user.id)))
         super().save(*args, **kwargs)
 
     def __str__(self):
@@ -163,13 +158,7 @@ class Leave(models.Model):
 
     def save(self, *args, **kwargs):
         if not self.slug:
-            base_slug = slugify(f"{self.staff.user.full_name}-{self.start_date}-{self.end_date}")
-            counter = 1
-            new_slug = base_slug
-            while Leave.objects.filter(slug=new_slug).exists():
-                counter += 1
-                new_slug = f"{base_slug}-{counter}"
-            self.slug = new_slug
+            self.slug = unique_slug(self, slugify(f"{self.staff.user.full_name}-{self.start_date}-{self.end_date}"), start=2)
         super().save(*args, **kwargs)
 
     def __str__(self):
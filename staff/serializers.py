@@ -4,7 +4,8 @@ from datetime import time
 from django.contrib.auth import get_user_model
 from Hotel.models import Hotel
 User = get_user_model()
-from django.core.mail import send_mail
+from django.db import transaction
+from Communication.outbox import queue_email
 from django.conf import settings
 
 
@@ -109,6 +110,7 @@ class StaffSerializer(serializers.ModelSerializer):
         staff = Staff.objects.create(user=user, hotel=hotel, **validated_data)
         return staff
 
+    @transaction.atomic
     def update(self, instance, validated_data):
         user_slug = validated_data.pop('user_slug', None)
         hotel_slug = validated_data.pop('hotel_slug', None)
@@ -139,14 +141,13 @@ class StaffSerializer(serializers.ModelSerializer):
 
         user.save()
 
-        # ✅ Send verification email if email changed
+        # ✅ Queue verification email if email changed (sent by the outbox worker once committed)
         if email_changed:
-            send_mail(
+            queue_email(
                 subject="Verify Your Email",
                 message=f"Hi {user.full_name},\n\nPlease verify your new email address.",
                 from_email=settings.DEFAULT_FROM_EMAIL,
                 recipient_list=[user.email],
-                fail_silently=True,
             )
 
         if hotel_slug: